@@ -107,7 +107,7 @@ CREATE TABLE IF NOT EXISTS activities (
 );
 
 CREATE INDEX idx_activities_user_id ON activities(user_id);
-CREATE INDEX idx_activities_created_at ON activities(created_at DESC);
+CREATE INDEX idx_activities_created_at_id ON activities(created_at DESC, id DESC);
 CREATE INDEX idx_activities_iid ON activities(iid);
 CREATE INDEX idx_activities_type ON activities(activity_type);
 CREATE INDEX idx_activities_mission ON activities(special_mission_id) WHERE special_mission_id IS NOT NULL;
@@ -0,0 +1,4 @@
+-- Migration: 004
+-- Keyset pagination of activity lists orders by (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_activities_created_at_id ON activities(created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_activities_created_at;
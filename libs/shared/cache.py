@@ -0,0 +1,300 @@
+"""Shared read cache for db-service, the Discord bot and the web dashboard.
+
+Values are JSON documents stored under namespaced, versioned keys::
+
+    {prefix}:v{CACHE_SCHEMA_VERSION}:{namespace}:g{generation}:{key}
+
+Invalidating a namespace bumps its generation (so every service stops
+reading the old entries at once) and publishes the namespace on
+``{prefix}:invalidate``. Each process keeps a short-lived local copy of hot
+entries and drops it when the invalidation message arrives.
+
+Backends: ``redis`` (shared between processes, needs the ``redis`` package)
+and ``memory`` (single process; tests and local runs). Cache failures never
+fail a read: the loader is called instead.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Protocol
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCHEMA_VERSION = 1
+
+# Namespaces shared by all services; a write to the underlying tables invalidates the namespace.
+CHALLENGES = "challenges"
+ACTIVITY_RULES = "activity_rules"
+RANKINGS = "rankings"
+# Prefix of per-user namespaces, see user_stats_namespace().
+USER_STATS = "user_stats"
+
+
+def user_stats_namespace(discord_id: str) -> str:
+    """Namespace of one user's dashboard stats; invalidated by writes to that user's activities."""
+    return f"{USER_STATS}:{discord_id}"
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> str | None:
+        ...
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        ...
+
+    def incr(self, key: str) -> int:
+        ...
+
+    def publish(self, channel: str, message: str) -> None:
+        ...
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        """Calls ``handler(message)`` for every message published on ``channel`` (also by this process)."""
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class InMemoryCacheBackend:
+    """Process-local backend with the same semantics as the Redis one."""
+
+    def __init__(self) -> None:
+        self._values: dict[str, tuple[str, float]] = {}
+        self._handlers: dict[str, list[Callable[[str], None]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._values[key]
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + ttl_seconds)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._values.get(key)
+            value = int(entry[0]) + 1 if entry is not None else 1
+            self._values[key] = (str(value), float("inf"))
+            return value
+
+    def publish(self, channel: str, message: str) -> None:
+        for handler in list(self._handlers.get(channel, [])):
+            handler(message)
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def close(self) -> None:
+        self._handlers.clear()
+
+
+class RedisCacheBackend:
+    """Redis backend; the subscription runs in a daemon thread with its own connection."""
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("SHARED_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self._client = redis.Redis.from_url(url, decode_responses=True, socket_timeout=1.0)
+        self._pubsub: Any = None
+
+    def get(self, key: str) -> str | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        self._client.set(key, value, ex=ttl_seconds)
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(key))
+
+    def publish(self, channel: str, message: str) -> None:
+        self._client.publish(channel, message)
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        if self._pubsub is None:
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: lambda message: handler(message["data"])})
+        # redis-py reconnects and resubscribes inside the worker thread.
+        self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def close(self) -> None:
+        if self._pubsub is not None:
+            self._pubsub.close()
+        self._client.close()
+
+
+class SharedCache:
+    """Namespaced read-through cache with generation-based invalidation."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        prefix: str = "szczypior",
+        ttl_seconds: int = 300,
+        local_ttl_seconds: float = 5.0,
+    ) -> None:
+        self._backend = backend
+        self._prefix = prefix
+        self._ttl_seconds = ttl_seconds
+        self._local_ttl_seconds = local_ttl_seconds
+        self._local: dict[tuple[str, str], tuple[Any, float]] = {}
+        self._generations: dict[str, int] = {}
+        self._listeners: list[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        backend.subscribe(self.channel, self._on_invalidate)
+
+    @property
+    def channel(self) -> str:
+        return f"{self._prefix}:invalidate"
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self._prefix}:v{CACHE_SCHEMA_VERSION}:{namespace}:generation"
+
+    def _key(self, namespace: str, generation: int, key: str) -> str:
+        return f"{self._prefix}:v{CACHE_SCHEMA_VERSION}:{namespace}:g{generation}:{key}"
+
+    def _generation(self, namespace: str) -> int:
+        with self._lock:
+            generation = self._generations.get(namespace)
+        if generation is None:
+            generation = int(self._backend.get(self._generation_key(namespace)) or 0)
+            with self._lock:
+                self._generations.setdefault(namespace, generation)
+        return generation
+
+    def version(self, *namespaces: str) -> str:
+        """
+        Token that changes whenever one of the namespaces is invalidated (HTTP ETags).
+        A backend that is not shared never sees other services' writes, so there the
+        token also rolls over every ``ttl_seconds``, like the cached entries.
+        """
+        parts = [f"{namespace}.{self._generation(namespace)}" for namespace in namespaces]
+        if not isinstance(self._backend, RedisCacheBackend):
+            parts.append(f"t{int(time.time() // self._ttl_seconds)}")
+        return "-".join(parts)
+
+    def get_or_load(self, namespace: str, key: str, loader: Callable[[], Any], ttl_seconds: int | None = None) -> Any:
+        """Returns the cached JSON value or stores ``loader()``; the loader result must be JSON-serializable."""
+        now = time.monotonic()
+        with self._lock:
+            local = self._local.get((namespace, key))
+        if local is not None and local[1] > now:
+            self.hits += 1
+            return local[0]
+
+        try:
+            generation = self._generation(namespace)
+            raw = self._backend.get(self._key(namespace, generation, key))
+        except Exception:
+            logger.warning("Shared cache read failed", exc_info=True, extra={"namespace": namespace, "key": key})
+            return loader()
+
+        if raw is not None:
+            value = json.loads(raw)
+            self.hits += 1
+        else:
+            self.misses += 1
+            value = loader()
+            try:
+                self._backend.set(
+                    self._key(namespace, generation, key),
+                    json.dumps(value, default=str),
+                    ttl_seconds or self._ttl_seconds,
+                )
+            except Exception:
+                logger.warning("Shared cache write failed", exc_info=True, extra={"namespace": namespace, "key": key})
+        self._remember(namespace, key, generation, value, now)
+        return value
+
+    def _remember(self, namespace: str, key: str, generation: int, value: Any, now: float) -> None:
+        with self._lock:
+            # An invalidation that arrived while loading already moved the generation on.
+            if self._generations.get(namespace) == generation:
+                self._local[(namespace, key)] = (value, now + self._local_ttl_seconds)
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Call after the write is committed; all services drop the namespaces' entries."""
+        for namespace in namespaces:
+            self._forget(namespace)
+            try:
+                self._backend.incr(self._generation_key(namespace))
+                self._backend.publish(self.channel, namespace)
+            except Exception:
+                logger.warning("Shared cache invalidation failed", exc_info=True, extra={"namespace": namespace})
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Registers ``listener(namespace)`` for invalidations (local caches derived from cached data)."""
+        self._listeners.append(listener)
+
+    def _on_invalidate(self, namespace: str) -> None:
+        self._forget(namespace)
+        for listener in list(self._listeners):
+            try:
+                listener(namespace)
+            except Exception:
+                logger.warning("Shared cache listener failed", exc_info=True, extra={"namespace": namespace})
+
+    def _forget(self, namespace: str) -> None:
+        with self._lock:
+            self._generations.pop(namespace, None)
+            for cached in [cached for cached in self._local if cached[0] == namespace]:
+                del self._local[cached]
+
+    def get_stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "local_entries": len(self._local)}
+
+    def close(self) -> None:
+        self._backend.close()
+
+
+def shared_cache_from_env() -> SharedCache:
+    """SHARED_CACHE_BACKEND=redis|memory (default: redis when REDIS_URL is set, otherwise memory)."""
+    redis_url = os.getenv("REDIS_URL", "").strip()
+    backend_name = os.getenv("SHARED_CACHE_BACKEND", "redis" if redis_url else "memory").strip().lower()
+    if backend_name not in {"redis", "memory"}:
+        raise ValueError(f"Unsupported SHARED_CACHE_BACKEND: {backend_name!r}")
+    backend: CacheBackend | None = None
+    if backend_name == "redis":
+        try:
+            backend = RedisCacheBackend(redis_url or "redis://localhost:6379/0")
+        except RuntimeError:
+            logger.warning("Redis cache backend unavailable, using in-memory cache", exc_info=True)
+    if backend is None:
+        backend = InMemoryCacheBackend()
+    shared = isinstance(backend, RedisCacheBackend)
+    return SharedCache(
+        backend,
+        prefix=os.getenv("SHARED_CACHE_PREFIX", "szczypior"),
+        # Without Redis other services' writes are never seen here, so entries must expire soon.
+        ttl_seconds=int(os.getenv("SHARED_CACHE_TTL_SECONDS", "300" if shared else "30")),
+        local_ttl_seconds=float(os.getenv("SHARED_CACHE_LOCAL_TTL_SECONDS", "5")),
+    )
+
+
+_shared_cache: SharedCache | None = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = shared_cache_from_env()
+    return _shared_cache
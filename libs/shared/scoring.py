@@ -0,0 +1,176 @@
+"""Points scoring shared by the Discord bot, db-service and the web dashboard.
+
+A challenge's rules (activity types with base points and bonuses, plus the
+challenge's ``points_rules``) are compiled once into an immutable
+:class:`CompiledPointsRules`: aliases are resolved, bonus names become
+booleans and numeric settings are parsed. Scoring an activity against it is
+plain arithmetic, with nothing re-parsed per call.
+
+Formula (kept identical in db-service's SQL re-scoring)::
+
+    base      = int(distance_km * base_points)
+    weight    = int(base * (multiplier - 1))       if weight_kg >= min_weight_kg
+    elevation = (elevation_m // meters_step) * points_per_step
+    total     = base + weight + elevation          (at least 1 point)
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from libs.shared.constants import ACTIVITY_TYPES, POINTS_BONUSES
+
+ACTIVITY_TYPE_ALIASES: dict[str, str] = {
+    "running_terrain": "bieganie_teren",
+    "running_treadmill": "bieganie_bieznia",
+    "swimming": "plywanie",
+    "cycling": "rower",
+    "walking": "spacer",
+    "other_cardio": "cardio",
+}
+
+WEIGHT_BONUS = "obciazenie"
+ELEVATION_BONUS = "przewyzszenie"
+
+
+def normalize_bonus_name(value: Any) -> str:
+    """``"Obciążenie "`` -> ``"obciazenie"``; rules written with or without diacritics match."""
+    normalized = unicodedata.normalize("NFD", str(value))
+    return "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn").strip().lower()
+
+
+def _to_float(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float(default)
+
+
+def _to_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return int(default)
+
+
+def challenge_points_rules(challenge_rules: Any) -> Mapping[str, Any] | None:
+    """The ``points_rules`` section of a challenge's ``rules`` JSON, if it is a dict."""
+    if not isinstance(challenge_rules, Mapping):
+        return None
+    points_rules = challenge_rules.get("points_rules")
+    return points_rules if isinstance(points_rules, Mapping) else None
+
+
+@dataclass(frozen=True, slots=True)
+class ActivityScoring:
+    activity_type: str
+    display_name: str
+    base_points: int
+    min_distance: float
+    # Already combined with the challenge's settings (multiplier > 1, meters_step > 0).
+    weight_bonus: bool
+    elevation_bonus: bool
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPointsRules:
+    activities: Mapping[str, ActivityScoring]
+    min_weight_kg: float
+    weight_multiplier: float
+    meters_step: int
+    points_per_step: int
+
+    def get(self, activity_type: str) -> ActivityScoring | None:
+        """Rules for a canonical type or one of its aliases."""
+        return self.activities.get(activity_type)
+
+    def score(
+        self,
+        activity_type: str,
+        distance_km: float,
+        weight_kg: float | None = None,
+        elevation_m: float | None = None,
+        *,
+        enforce_min_distance: bool = True,
+    ) -> dict[str, int]:
+        """Points breakdown; raises ValueError for an unknown type or a too short distance."""
+        activity = self.activities.get(activity_type)
+        if activity is None:
+            raise ValueError(f"Unknown activity type: {activity_type}")
+        if enforce_min_distance and distance_km < activity.min_distance:
+            raise ValueError(f"Minimal distance for {activity.display_name}: {activity.min_distance} km")
+
+        base_points = int(distance_km * activity.base_points)
+        weight_bonus_points = 0
+        if activity.weight_bonus and weight_kg and weight_kg >= self.min_weight_kg:
+            weight_bonus_points = int(base_points * (self.weight_multiplier - 1))
+        elevation_bonus_points = 0
+        if activity.elevation_bonus and elevation_m and elevation_m > 0:
+            elevation_bonus_points = int(elevation_m // self.meters_step) * self.points_per_step
+
+        total_points = base_points + weight_bonus_points + elevation_bonus_points
+        if total_points < 1:
+            base_points = 1
+            total_points = 1
+        return {
+            "base_points": base_points,
+            "weight_bonus_points": weight_bonus_points,
+            "elevation_bonus_points": elevation_bonus_points,
+            "total_points": total_points,
+        }
+
+
+def compile_points_rules(
+    activity_types: Mapping[str, Mapping[str, Any]] | None = None,
+    points_rules: Mapping[str, Any] | None = None,
+    *,
+    defaults: Mapping[str, Any] | None = None,
+) -> CompiledPointsRules:
+    """Compiles activity type rules (``ACTIVITY_TYPES`` when empty) and a challenge's ``points_rules``.
+
+    ``defaults`` fills settings missing from ``points_rules`` (``POINTS_BONUSES`` by default).
+    """
+    defaults = defaults if isinstance(defaults, Mapping) else POINTS_BONUSES
+    points_rules = points_rules if isinstance(points_rules, Mapping) else {}
+    weight_raw = points_rules.get("weight_bonus") if isinstance(points_rules.get("weight_bonus"), Mapping) else {}
+    elevation_raw = (
+        points_rules.get("elevation_bonus") if isinstance(points_rules.get("elevation_bonus"), Mapping) else {}
+    )
+    weight_defaults = defaults.get("weight_bonus", {})
+    elevation_defaults = defaults.get("elevation_bonus", {})
+
+    min_weight_kg = _to_float(weight_raw.get("min_weight_kg"), _to_float(weight_defaults.get("min_weight_kg"), 5))
+    weight_multiplier = _to_float(
+        weight_raw.get("distance_points_multiplier"),
+        _to_float(weight_defaults.get("distance_points_multiplier"), 1.5),
+    )
+    meters_step = _to_int(elevation_raw.get("meters_step"), _to_int(elevation_defaults.get("meters_step"), 50))
+    points_per_step = _to_int(
+        elevation_raw.get("points_per_step"), _to_int(elevation_defaults.get("points_per_step"), 500)
+    )
+
+    activities: dict[str, ActivityScoring] = {}
+    for activity_type, info in (activity_types or ACTIVITY_TYPES).items():
+        bonuses = {normalize_bonus_name(bonus) for bonus in info.get("bonuses") or []}
+        activities[activity_type] = ActivityScoring(
+            activity_type=activity_type,
+            display_name=info.get("display_name") or activity_type,
+            base_points=_to_int(info.get("base_points"), 0),
+            min_distance=_to_float(info.get("min_distance"), 0.0),
+            weight_bonus=WEIGHT_BONUS in bonuses and weight_multiplier > 1,
+            elevation_bonus=ELEVATION_BONUS in bonuses and meters_step > 0,
+        )
+    for alias, activity_type in ACTIVITY_TYPE_ALIASES.items():
+        if activity_type in activities:
+            activities.setdefault(alias, activities[activity_type])
+
+    return CompiledPointsRules(
+        activities=MappingProxyType(activities),
+        min_weight_kg=min_weight_kg,
+        weight_multiplier=weight_multiplier,
+        meters_step=meters_step,
+        points_per_step=points_per_step,
+    )
@@ -4,20 +4,42 @@ from sqlalchemy.orm import Session
 
 from app.api.auth import require_api_key
 from app.db.session import get_db
-from app.schemas.activity import ActivityCreate, ActivityRead, ActivityUpdate, UserRankingRead
+from app.schemas.activity import (
+    ActivityBatchCreate,
+    ActivityBatchItemRead,
+    ActivityCreate,
+    ActivityRead,
+    ActivityUpdate,
+    UserRankingRead,
+)
 from app.schemas.activity_rule import ActivityRulePatchPayload, ActivityRulePayload, ActivityRuleRead
 from app.schemas.challenge import ChallengeCreate, ChallengeParticipantCreate, ChallengeParticipantRead, ChallengeRead
 from app.schemas.event import AirsoftEventCreate, AirsoftEventRead, EventRegistrationCreate, EventRegistrationRead
 from app.schemas.mission import MissionRead
+from app.schemas.rescore import ChallengeRescoreReport
 from app.schemas.user import UserRead, UserUpsert
 from app.services.activity_manager import ActivityManager
 from app.services.challenges_manager import ChallengesManager
 from app.services.events_manager import EventsManager
+from app.services.rescore_manager import RescoreManager
 from app.services.users_manager import UsersManager
+from libs.shared.cache import ACTIVITY_RULES, CHALLENGES, RANKINGS, get_shared_cache
 
 router = APIRouter(dependencies=[Depends(require_api_key)])
 
 
+def _cached_rows(namespace: str, key: str, schema: type, load) -> list[dict] | None:
+    """Odczyt przez wspólny cache; wiersze zapisywane są jako JSON schematu odpowiedzi (None = brak zasobu)."""
+
+    def load_rows() -> list[dict] | None:
+        rows = load()
+        if rows is None:
+            return None
+        return [schema.model_validate(row).model_dump(mode="json") for row in rows]
+
+    return get_shared_cache().get_or_load(namespace, f"db:{key}", load_rows)
+
+
 # ── Health ─────────────────────────────────────────────────────────────────
 
 @router.get("/health")
@@ -63,6 +85,11 @@ def create_activity(payload: ActivityCreate, db: Session = Depends(get_db)) -> A
         raise HTTPException(status_code=409, detail=str(exc)) from exc
 
 
+@router.post("/activities/batch", response_model=list[ActivityBatchItemRead])
+def create_activities_batch(payload: ActivityBatchCreate, db: Session = Depends(get_db)) -> list[ActivityBatchItemRead]:
+    return [ActivityBatchItemRead.model_validate(item) for item in ActivityManager(db).create_activities(payload.activities)]
+
+
 @router.get("/users/{discord_id}/history", response_model=list[ActivityRead])
 def user_history(discord_id: str, limit: int = 20, db: Session = Depends(get_db)) -> list[ActivityRead]:
     return ActivityManager(db).get_user_history(discord_id=discord_id, limit=limit)
@@ -93,7 +120,7 @@ def update_activity(activity_iid: str, payload: ActivityUpdate, db: Session = De
 
 @router.get("/rankings", response_model=list[UserRankingRead])
 def rankings(limit: int = 10, db: Session = Depends(get_db)) -> list[UserRankingRead]:
-    return [UserRankingRead(**row) for row in ActivityManager(db).get_rankings(limit=limit)]
+    return _cached_rows(RANKINGS, f"rankings:{limit}", UserRankingRead, lambda: ActivityManager(db).get_rankings(limit=limit))
 
 
 # ── Missions ───────────────────────────────────────────────────────────────
@@ -164,7 +191,7 @@ def user_event_registrations(discord_id: str, db: Session = Depends(get_db)) ->
 
 @router.get("/challenges/active", response_model=list[ChallengeRead])
 def list_active_challenges(db: Session = Depends(get_db)) -> list[ChallengeRead]:
-    return ChallengesManager(db).get_active_challenges()
+    return _cached_rows(CHALLENGES, "active", ChallengeRead, ChallengesManager(db).get_active_challenges)
 
 
 @router.post("/challenges", response_model=ChallengeRead)
@@ -174,16 +201,27 @@ def create_challenge(payload: ChallengeCreate, db: Session = Depends(get_db)) ->
 
 @router.get("/challenges", response_model=list[ChallengeRead])
 def list_challenges(active_only: bool = False, db: Session = Depends(get_db)) -> list[ChallengeRead]:
-    return ChallengesManager(db).list_challenges(active_only=active_only)
+    return _cached_rows(
+        CHALLENGES,
+        f"list:{active_only}",
+        ChallengeRead,
+        lambda: ChallengesManager(db).list_challenges(active_only=active_only),
+    )
 
 
 @router.get("/challenges/{challenge_id}/activity-rules", response_model=list[ActivityRuleRead])
 def get_challenge_activity_rules(challenge_id: int, db: Session = Depends(get_db)) -> list[ActivityRuleRead]:
     manager = ChallengesManager(db)
-    challenge = manager.get_challenge(challenge_id)
-    if not challenge:
+
+    def load() -> list | None:
+        if not manager.get_challenge(challenge_id):
+            return None
+        return manager.list_activity_rules(challenge_id)
+
+    rules = _cached_rows(ACTIVITY_RULES, f"challenge:{challenge_id}", ActivityRuleRead, load)
+    if rules is None:
         raise HTTPException(status_code=404, detail="Challenge not found")
-    return manager.list_activity_rules(challenge_id)
+    return rules
 
 
 @router.post("/challenges/{challenge_id}/activity-rules", response_model=list[ActivityRuleRead])
@@ -231,6 +269,21 @@ def patch_challenge_activity_rules(
         raise HTTPException(status_code=400, detail=detail) from exc
 
 
+@router.post("/challenges/{challenge_id}/rescore", response_model=ChallengeRescoreReport)
+def rescore_challenge(
+    challenge_id: int,
+    dry_run: bool = True,
+    rematch_missions: bool = False,
+    db: Session = Depends(get_db),
+) -> ChallengeRescoreReport:
+    try:
+        return RescoreManager(db).rescore_challenge(
+            challenge_id, dry_run=dry_run, rematch_missions=rematch_missions
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
 @router.get("/challenges/{challenge_id}", response_model=ChallengeRead)
 def get_challenge(challenge_id: int, db: Session = Depends(get_db)) -> ChallengeRead:
     challenge = ChallengesManager(db).get_challenge(challenge_id)
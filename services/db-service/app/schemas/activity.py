@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, Field
 
@@ -46,6 +47,17 @@ class ActivityRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ActivityBatchCreate(BaseModel):
+    activities: list[ActivityCreate] = Field(min_length=1, max_length=200)
+
+
+class ActivityBatchItemRead(BaseModel):
+    iid: str
+    status: Literal["created", "duplicate", "rejected"]
+    activity: ActivityRead | None = None
+    detail: str | None = None
+
+
 class ActivityUpdate(BaseModel):
     activity_type: str | None = None
     distance_km: float | None = Field(default=None, gt=0)
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+
+
+class ActivityPointsSnapshot(BaseModel):
+    base_points: int
+    weight_bonus_points: int
+    elevation_bonus_points: int
+    special_mission_id: int | None
+    mission_bonus_points: int
+    total_points: int
+
+
+class ActivityRescoreDiff(BaseModel):
+    activity_id: int
+    iid: str
+    user_id: int
+    activity_type: str
+    before: ActivityPointsSnapshot
+    after: ActivityPointsSnapshot
+
+
+class ChallengeRescoreReport(BaseModel):
+    challenge_id: int
+    dry_run: bool
+    rematch_missions: bool
+    scanned: int
+    changed: int
+    skipped_unknown_type: int
+    batches: int
+    points_before: int
+    points_after: int
+    changes: list[ActivityRescoreDiff]
+    changes_truncated: bool
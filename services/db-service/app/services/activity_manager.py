@@ -6,6 +6,7 @@ from app.db.models import Activity, SpecialMission, User
 from app.schemas.activity import ActivityCreate
 from app.schemas.user import UserUpsert
 from app.services.users_manager import UsersManager
+from libs.shared.cache import RANKINGS, get_shared_cache, user_stats_namespace
 
 
 class ActivityManager:
@@ -13,13 +14,10 @@ class ActivityManager:
         self.db = db
         self._users = UsersManager(db)
 
-    def create_activity(self, payload: ActivityCreate) -> Activity:
-        user = self._users.upsert_user(
-            UserUpsert(discord_id=payload.discord_id, display_name=payload.display_name)
-        )
-
-        row = Activity(
-            user_id=user.id,
+    @staticmethod
+    def _build_activity(payload: ActivityCreate, user_id: int) -> Activity:
+        return Activity(
+            user_id=user_id,
             iid=payload.iid,
             activity_type=payload.activity_type,
             distance_km=payload.distance_km,
@@ -42,6 +40,13 @@ class ActivityManager:
             ai_comment=payload.ai_comment,
         )
 
+    def create_activity(self, payload: ActivityCreate) -> Activity:
+        user = self._users.upsert_user(
+            UserUpsert(discord_id=payload.discord_id, display_name=payload.display_name)
+        )
+
+        row = self._build_activity(payload, user_id=user.id)
+
         self.db.add(row)
         try:
             self.db.commit()
@@ -49,9 +54,67 @@ class ActivityManager:
             self.db.rollback()
             raise ValueError("Activity with this IID already exists") from exc
 
+        get_shared_cache().invalidate(RANKINGS, user_stats_namespace(payload.discord_id))
         self.db.refresh(row)
         return row
 
+    def create_activities(self, payloads: list[ActivityCreate]) -> list[dict]:
+        """
+        Zapisuje paczkę aktywności jednym commitem (outbox bota).
+        Istniejące iid są zwracane jako "duplicate", więc ponowna wysyłka tej
+        samej paczki jest bezpieczna.
+        """
+        unique: dict[str, ActivityCreate] = {}
+        for payload in payloads:
+            unique.setdefault(payload.iid, payload)
+
+        existing = {
+            activity.iid: activity
+            for activity in self.db.query(Activity).filter(Activity.iid.in_(list(unique))).all()
+        }
+
+        users: dict[str, User] = {}
+        created: dict[str, Activity] = {}
+        for iid, payload in unique.items():
+            if iid in existing:
+                continue
+            if payload.discord_id not in users:
+                users[payload.discord_id] = self._users.upsert_user(
+                    UserUpsert(discord_id=payload.discord_id, display_name=payload.display_name)
+                )
+            created[iid] = self._build_activity(payload, user_id=users[payload.discord_id].id)
+
+        if created:
+            self.db.add_all(created.values())
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # A concurrent writer won the race for some iid; fall back to one-by-one.
+                self.db.rollback()
+                return [self._create_one_for_batch(payload) for payload in unique.values()]
+            get_shared_cache().invalidate(RANKINGS, *(user_stats_namespace(discord_id) for discord_id in users))
+            for row in created.values():
+                self.db.refresh(row)
+
+        results = []
+        for iid in unique:
+            if iid in created:
+                results.append({"iid": iid, "status": "created", "activity": created[iid]})
+            else:
+                results.append({"iid": iid, "status": "duplicate", "activity": existing[iid]})
+        return results
+
+    def _create_one_for_batch(self, payload: ActivityCreate) -> dict:
+        try:
+            return {"iid": payload.iid, "status": "created", "activity": self.create_activity(payload)}
+        except ValueError as exc:
+            # create_activity maps every IntegrityError to "already exists"; only a
+            # row that is really there is a duplicate (FK/CHECK failures are not).
+            existing = self.get_activity_by_iid(payload.iid)
+            if existing is not None:
+                return {"iid": payload.iid, "status": "duplicate", "activity": existing}
+            return {"iid": payload.iid, "status": "rejected", "activity": None, "detail": str(exc.__cause__ or exc)}
+
     def get_user_history(self, discord_id: str, limit: int = 20) -> list[Activity]:
         return (
             self.db.query(Activity)
@@ -92,6 +155,7 @@ class ActivityManager:
 
         self.db.add(activity)
         self.db.commit()
+        get_shared_cache().invalidate(RANKINGS, user_stats_namespace(activity.user.discord_id))
         self.db.refresh(activity)
         return activity
 
@@ -100,8 +164,10 @@ class ActivityManager:
         activity = self.get_activity_by_iid(activity_iid)
         if not activity:
             return False
+        discord_id = activity.user.discord_id
         self.db.delete(activity)
         self.db.commit()
+        get_shared_cache().invalidate(RANKINGS, user_stats_namespace(discord_id))
         return True
 
     def get_rankings(self, limit: int = 10) -> list[dict]:
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from app.db.models import ActivityRule, Challenge, ChallengeParticipant, User
 from app.schemas.activity_rule import ActivityRulePatchPayload, ActivityRulePayload
 from app.schemas.challenge import ChallengeCreate, ChallengeParticipantCreate
+from libs.shared.cache import ACTIVITY_RULES, CHALLENGES, RANKINGS, get_shared_cache
 from libs.shared.constants import ACTIVITY_TYPES
 
 
@@ -13,6 +14,11 @@ class ChallengesManager:
     def __init__(self, db: Session):
         self.db = db
 
+    @staticmethod
+    def _invalidate_cache() -> None:
+        """Po commicie: bot, dashboard i pozostałe repliki przestają czytać stare challenge i reguły."""
+        get_shared_cache().invalidate(CHALLENGES, ACTIVITY_RULES)
+
     @staticmethod
     def _default_activity_rules_payload() -> list[ActivityRulePayload]:
         return [
@@ -58,6 +64,7 @@ class ChallengesManager:
         self.db.flush()
         self._create_activity_rule_records(challenge.id, payload.activity_rules)
         self.db.commit()
+        self._invalidate_cache()
         self.db.refresh(challenge)
         return challenge
 
@@ -83,6 +90,7 @@ class ChallengesManager:
 
         self._create_activity_rule_records(challenge_id, payloads)
         self.db.commit()
+        self._invalidate_cache()
         return self.list_activity_rules(challenge_id)
 
     def replace_activity_rules(
@@ -102,6 +110,7 @@ class ChallengesManager:
         self.db.flush()
         self._create_activity_rule_records(challenge_id, payloads)
         self.db.commit()
+        self._invalidate_cache()
         return self.list_activity_rules(challenge_id)
 
     def patch_activity_rules(
@@ -132,6 +141,7 @@ class ChallengesManager:
                 setattr(target, field_name, field_value)
 
         self.db.commit()
+        self._invalidate_cache()
         return self.list_activity_rules(challenge_id)
 
     def get_challenge(self, challenge_id: int) -> Challenge | None:
@@ -163,6 +173,9 @@ class ChallengesManager:
             return False
         self.db.delete(challenge)
         self.db.commit()
+        self._invalidate_cache()
+        # activities.challenge_id is SET NULL, so per-challenge and global rankings change too.
+        get_shared_cache().invalidate(RANKINGS)
         return True
 
     def add_participant(self, payload: ChallengeParticipantCreate) -> ChallengeParticipant:
@@ -0,0 +1,266 @@
+"""
+Przeliczanie punktów wszystkich aktywności challenge'u po zmianie reguł lub misji.
+
+Punkty liczone są w bazie tym samym wzorem co `libs.shared.scoring`: reguły
+challenge'u są kompilowane raz (`compile_points_rules`) i trafiają do zapytania jako
+stałe, a każda partia id to jeden SELECT różnic i jeden UPDATE ... FROM, bez
+ładowania aktywności do Pythona.
+"""
+
+from sqlalchemy import Float, Integer, and_, bindparam, case, cast, func, literal, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import Activity, ActivityRule, Challenge, SpecialMission, User
+from libs.shared.cache import RANKINGS, get_shared_cache, user_stats_namespace
+from libs.shared.scoring import CompiledPointsRules, challenge_points_rules, compile_points_rules
+
+POINT_COLUMNS = (
+    "base_points",
+    "weight_bonus_points",
+    "elevation_bonus_points",
+    "special_mission_id",
+    "mission_bonus_points",
+    "total_points",
+)
+
+
+class RescoreManager:
+    def __init__(self, db: Session, batch_size: int = 1000, max_reported_changes: int = 500):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_reported_changes = max_reported_changes
+
+    def _compiled_rules(self, challenge: Challenge) -> CompiledPointsRules:
+        """Reguły challenge'u; bez wpisów w activity_rules bot używa ACTIVITY_TYPES."""
+        rules = self.db.query(ActivityRule).filter(ActivityRule.challenge_id == challenge.id).all()
+        activity_types = {
+            rule.activity_type: {
+                "display_name": rule.display_name,
+                "base_points": rule.base_points,
+                "min_distance": rule.min_distance,
+                "bonuses": rule.bonuses or [],
+            }
+            for rule in rules
+        }
+        return compile_points_rules(activity_types or None, challenge_points_rules(challenge.rules))
+
+    @staticmethod
+    def _mission_choice(challenge_id: int):
+        """
+        Misja dopasowana do każdej aktywności challenge'u (aktywna w chwili created_at,
+        zgodny typ, minimalny dystans i czas). Limit max_completions_per_user liczony
+        jest w kolejności created_at w obrębie challenge'u; przy kilku pasujących
+        misjach wygrywa ta z największym bonusem.
+        """
+        activity = aliased(Activity, name="mission_activity")
+        mission = SpecialMission
+        candidates = (
+            select(
+                activity.id.label("activity_id"),
+                mission.id.label("mission_id"),
+                mission.bonus_points.label("bonus_points"),
+                mission.max_completions_per_user.label("max_completions"),
+                func.row_number()
+                .over(partition_by=(activity.user_id, mission.id), order_by=(activity.created_at, activity.id))
+                .label("completion"),
+            )
+            .join(
+                mission,
+                and_(
+                    mission.is_active.is_(True),
+                    mission.valid_from <= activity.created_at,
+                    mission.valid_until >= activity.created_at,
+                    or_(mission.activity_type_filter.is_(None), mission.activity_type_filter == activity.activity_type),
+                    or_(mission.min_distance_km.is_(None), activity.distance_km >= mission.min_distance_km),
+                    or_(mission.min_time_minutes.is_(None), activity.time_minutes >= mission.min_time_minutes),
+                ),
+            )
+            .where(activity.challenge_id == challenge_id)
+            .subquery("mission_candidates")
+        )
+        ranked = (
+            select(
+                candidates.c.activity_id,
+                candidates.c.mission_id,
+                candidates.c.bonus_points,
+                func.row_number()
+                .over(
+                    partition_by=candidates.c.activity_id,
+                    order_by=(candidates.c.bonus_points.desc(), candidates.c.mission_id),
+                )
+                .label("pick"),
+            )
+            .where(or_(candidates.c.max_completions.is_(None), candidates.c.completion <= candidates.c.max_completions))
+            .subquery("mission_ranked")
+        )
+        return select(ranked.c.activity_id, ranked.c.mission_id, ranked.c.bonus_points).where(ranked.c.pick == 1).subquery(
+            "mission_choice"
+        )
+
+    def _scored_query(self, challenge_id: int, rules: CompiledPointsRules, rematch_missions: bool):
+        activity = aliased(Activity, name="scored_activity")
+        # Aliases are resolved by the bot before saving, so only canonical types are stored.
+        scorings = [scoring for activity_type, scoring in rules.activities.items() if activity_type == scoring.activity_type]
+        rate = case(
+            {scoring.activity_type: scoring.base_points for scoring in scorings},
+            value=activity.activity_type,
+            else_=None,
+        )
+        weight_types = [scoring.activity_type for scoring in scorings if scoring.weight_bonus]
+        elevation_types = [scoring.activity_type for scoring in scorings if scoring.elevation_bonus]
+
+        # Float arithmetic + FLOOR mirrors Python's int(distance_km * rate) for positive values.
+        base = cast(func.floor(cast(activity.distance_km, Float) * rate), Integer)
+        weight_bonus = case(
+            (
+                and_(
+                    activity.activity_type.in_(weight_types),
+                    activity.weight_kg > 0,
+                    activity.weight_kg >= rules.min_weight_kg,
+                ),
+                cast(func.floor(cast(base, Float) * literal(rules.weight_multiplier - 1, Float)), Integer),
+            ),
+            else_=0,
+        )
+        elevation_bonus = case(
+            (
+                and_(activity.activity_type.in_(elevation_types), activity.elevation_m > 0),
+                (activity.elevation_m // max(rules.meters_step, 1)) * rules.points_per_step,
+            ),
+            else_=0,
+        )
+        if rematch_missions:
+            choice = self._mission_choice(challenge_id)
+            mission_id = choice.c.mission_id
+            mission_bonus = func.coalesce(choice.c.bonus_points, 0)
+            join_target, join_on = choice, choice.c.activity_id == activity.id
+        else:
+            # Keep the assigned mission but pick up its current bonus; manual bonuses without a mission stay.
+            mission_id = activity.special_mission_id
+            mission_bonus = func.coalesce(SpecialMission.bonus_points, activity.mission_bonus_points)
+            join_target, join_on = SpecialMission, SpecialMission.id == activity.special_mission_id
+
+        computed = (
+            select(
+                activity.id.label("activity_id"),
+                activity.iid,
+                activity.user_id,
+                activity.activity_type,
+                *(getattr(activity, column).label(f"old_{column}") for column in POINT_COLUMNS),
+                base.label("base"),
+                weight_bonus.label("new_weight_bonus_points"),
+                elevation_bonus.label("new_elevation_bonus_points"),
+                mission_id.label("new_special_mission_id"),
+                mission_bonus.label("new_mission_bonus_points"),
+            )
+            .outerjoin(join_target, join_on)
+            .where(
+                activity.challenge_id == challenge_id,
+                rate.is_not(None),
+                activity.id >= bindparam("batch_start"),
+                activity.id < bindparam("batch_end"),
+            )
+            .subquery("computed")
+        )
+        raw_total = computed.c.base + computed.c.new_weight_bonus_points + computed.c.new_elevation_bonus_points
+        new_values = {
+            "base_points": case((raw_total < 1, 1), else_=computed.c.base),
+            "weight_bonus_points": computed.c.new_weight_bonus_points,
+            "elevation_bonus_points": computed.c.new_elevation_bonus_points,
+            "special_mission_id": computed.c.new_special_mission_id,
+            "mission_bonus_points": computed.c.new_mission_bonus_points,
+            "total_points": case((raw_total < 1, 1), else_=raw_total) + computed.c.new_mission_bonus_points,
+        }
+        return select(
+            computed.c.activity_id,
+            computed.c.iid,
+            computed.c.user_id,
+            computed.c.activity_type,
+            *(computed.c[f"old_{column}"] for column in POINT_COLUMNS),
+            *(value.label(f"new_{column}") for column, value in new_values.items()),
+        ).where(
+            or_(*(computed.c[f"old_{column}"].is_distinct_from(value) for column, value in new_values.items()))
+        )
+
+    def rescore_challenge(self, challenge_id: int, *, dry_run: bool = True, rematch_missions: bool = False) -> dict:
+        """
+        Przelicza punkty aktywności challenge'u partiami po id (commit po każdej partii).
+        dry_run=True zwraca tylko raport różnic. Aktywności typu spoza reguł są pomijane.
+        Po zapisie unieważnia rankingi (user_rankings to widok liczony z activities)
+        i statystyki użytkowników, których punkty się zmieniły.
+        """
+        challenge = self.db.query(Challenge).filter(Challenge.id == challenge_id).first()
+        if not challenge:
+            raise ValueError(f"Challenge with id={challenge_id} not found")
+
+        rules = self._compiled_rules(challenge)
+        scored = self._scored_query(challenge_id, rules, rematch_missions)
+
+        target = scored.subquery("rescored")
+        rescore = (
+            update(Activity)
+            .where(Activity.id == target.c.activity_id)
+            .values({column: target.c[f"new_{column}"] for column in POINT_COLUMNS})
+            .execution_options(synchronize_session=False)
+        )
+
+        known_type = Activity.activity_type.in_(list(rules.activities))
+        scanned, skipped, points_before, first_id, last_id = self.db.execute(
+            select(
+                func.count(Activity.id),
+                func.coalesce(func.sum(case((known_type, 0), else_=1)), 0),
+                func.coalesce(func.sum(Activity.total_points), 0),
+                func.min(Activity.id),
+                func.max(Activity.id),
+            ).where(Activity.challenge_id == challenge_id)
+        ).one()
+
+        changes: list[dict] = []
+        changed_user_ids: set[int] = set()
+        changed = 0
+        points_delta = 0
+        batches = 0
+        if first_id is not None:
+            for batch_start in range(first_id, last_id + 1, self.batch_size):
+                params = {"batch_start": batch_start, "batch_end": batch_start + self.batch_size}
+                rows = self.db.execute(scored, params).mappings().all()
+                batches += 1
+                if not rows:
+                    continue
+                changed += len(rows)
+                for row in rows:
+                    changed_user_ids.add(row["user_id"])
+                    points_delta += row["new_total_points"] - row["old_total_points"]
+                    if len(changes) < self.max_reported_changes:
+                        changes.append(
+                            {
+                                "activity_id": row["activity_id"],
+                                "iid": row["iid"],
+                                "user_id": row["user_id"],
+                                "activity_type": row["activity_type"],
+                                "before": {column: row[f"old_{column}"] for column in POINT_COLUMNS},
+                                "after": {column: row[f"new_{column}"] for column in POINT_COLUMNS},
+                            }
+                        )
+                if not dry_run:
+                    self.db.execute(rescore, params)
+                    self.db.commit()
+
+        if not dry_run and changed:
+            self.db.expire_all()
+            discord_ids = self.db.scalars(select(User.discord_id).where(User.id.in_(changed_user_ids))).all()
+            get_shared_cache().invalidate(RANKINGS, *(user_stats_namespace(discord_id) for discord_id in discord_ids))
+
+        return {
+            "challenge_id": challenge_id,
+            "dry_run": dry_run,
+            "rematch_missions": rematch_missions,
+            "scanned": scanned,
+            "changed": changed,
+            "skipped_unknown_type": skipped,
+            "batches": batches,
+            "points_before": points_before,
+            "points_after": points_before + points_delta,
+            "changes": changes,
+            "changes_truncated": changed > len(changes),
+        }
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from app.db.models import User
 from app.schemas.user import UserUpsert
+from libs.shared.cache import RANKINGS, get_shared_cache, user_stats_namespace
 
 
 class UsersManager:
@@ -13,11 +14,15 @@ class UsersManager:
     def upsert_user(self, payload: UserUpsert) -> User:
         existing = self.db.query(User).filter(User.discord_id == payload.discord_id).first()
         if existing:
+            # The ranking shows display names and avatars; other fields do not make it stale.
+            ranking_changed = (existing.display_name, existing.avatar_url) != (payload.display_name, payload.avatar_url)
             existing.display_name = payload.display_name
             existing.username = payload.username
             existing.avatar_url = payload.avatar_url
             self.db.add(existing)
             self.db.commit()
+            if ranking_changed:
+                get_shared_cache().invalidate(RANKINGS)
             self.db.refresh(existing)
             return existing
 
@@ -31,6 +36,8 @@ class UsersManager:
         )
         self.db.add(created)
         self.db.commit()
+        # The players ranking lists users without activities too.
+        get_shared_cache().invalidate(RANKINGS)
         self.db.refresh(created)
         return created
 
@@ -43,6 +50,7 @@ class UsersManager:
             return False
         self.db.delete(user)
         self.db.commit()
+        get_shared_cache().invalidate(RANKINGS, user_stats_namespace(discord_id))
         return True
 
     def list_users(self) -> list[User]:
@@ -0,0 +1,163 @@
+"""Cache wynikow ekstrakcji LLM adresowany trescia wiadomosci."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Iterable
+from urllib import parse
+
+from ai.schemas import ActivityParams
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message_text(text: str | None) -> str:
+    """Normalizuje tekst tak, aby edycje bialych znakow i wielkosci liter dawaly ten sam klucz."""
+    normalized = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", normalized).strip().lower()
+
+
+def image_url_digest(url: str | None) -> str:
+    """Zastepczy identyfikator zalacznika, gdy nie udalo sie pobrac bajtow obrazu.
+
+    Discord CDN podpisuje URL-e parametrami ex/is/hm, ktore zmieniaja sie przy
+    kazdym pobraniu wiadomosci, wiec do klucza trafia tylko sciezka.
+    """
+    if not url:
+        return ""
+    return hashlib.sha256(parse.urlsplit(url).path.encode("utf-8")).hexdigest()
+
+
+def prompt_version(messages: Iterable[Any]) -> str:
+    """Skrot tresci promptu; kazda zmiana w ai/prompts.py daje nowa wersje."""
+    payload = json.dumps(list(messages), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def build_extraction_cache_key(
+    *,
+    text: str | None,
+    image_digest: str,
+    prompt_version: str,
+    model: str,
+) -> str:
+    raw = "\x1f".join((normalize_message_text(text), image_digest, prompt_version, model))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """LRU w pamieci z opcjonalnym trwalym magazynem SQLite."""
+
+    def __init__(self, max_entries: int = 512, sqlite_path: str | None = None) -> None:
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, ActivityParams] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+
+        if sqlite_path:
+            try:
+                self._connection = sqlite3.connect(sqlite_path, check_same_thread=False)
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                    "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._connection.commit()
+            except sqlite3.Error:
+                logger.warning(
+                    "Could not open extraction cache database, using memory only",
+                    exc_info=True,
+                    extra={"sqlite_path": sqlite_path},
+                )
+                self._connection = None
+
+    @classmethod
+    def from_env(cls) -> "ExtractionCache":
+        return cls(
+            max_entries=int(os.getenv("AI_EXTRACTION_CACHE_SIZE", "512")),
+            sqlite_path=os.getenv("AI_EXTRACTION_CACHE_PATH") or None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> ActivityParams | None:
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+
+            cached = self._load_from_disk(key)
+            if cached is None:
+                self.misses += 1
+                return None
+
+            self._remember(key, cached)
+            self.hits += 1
+            return cached
+
+    def set(self, key: str, params: ActivityParams) -> None:
+        with self._lock:
+            self._remember(key, params)
+            if self._connection is None:
+                return
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO extraction_cache (key, payload, created_at) VALUES (?, ?, ?)",
+                    (key, params.model_dump_json(), time.time()),
+                )
+                self._connection.commit()
+            except sqlite3.Error:
+                logger.warning("Could not persist extraction cache entry", exc_info=True)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _remember(self, key: str, params: ActivityParams) -> None:
+        self._entries[key] = params
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key: str) -> ActivityParams | None:
+        if self._connection is None:
+            return None
+        try:
+            row = self._connection.execute(
+                "SELECT payload FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            logger.warning("Could not read extraction cache entry", exc_info=True)
+            return None
+        if row is None:
+            return None
+        try:
+            return ActivityParams.model_validate_json(row[0])
+        except ValueError:
+            return None
+
+
+_extraction_cache: ExtractionCache | None = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _extraction_cache
+    if _extraction_cache is None:
+        _extraction_cache = ExtractionCache.from_env()
+    return _extraction_cache
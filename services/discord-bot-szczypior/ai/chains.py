@@ -1,31 +1,138 @@
-from dataclasses import field
-from venv import logger
-import json
+import logging
+import os
+from typing import Any, Awaitable, Callable
 
-from discord import Activity
-from pydantic import BaseModel, Field
-from datetime import datetime
+from pydantic import ValidationError
 
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
 
+from ai.cache import build_extraction_cache_key, prompt_version
+from ai.history import summarize_history
 from ai.models import get_chat_model
-from ai.prompts import build_activity_text_only_analyze_prompt, build_activity_text_only_analyze_prompt, build_message_and_picture_analyze_prompt, build_progress_comment_prompt
+from ai.schemas import ActivityParams, ActivityWithComment
+from ai.prompts import (
+    build_activity_text_only_analyze_prompt,
+    build_activity_with_comment_prompt,
+    build_message_and_picture_analyze_prompt,
+    build_progress_comment_prompt,
+    get_activity_text_only_analyze_prompt_messages,
+    get_activity_with_comment_prompt_messages,
+    get_message_and_picture_analyze_prompt_messages,
+)
 
 from libs.shared.schemas.activity import ActivityRead
+from utils.resilience import CircuitOpenError, get_circuit_breaker
 
+logger = logging.getLogger(__name__)
 
 
 
 
-class ActivityParams(BaseModel):
-    activity_type: str
-    distance_km: float = Field(gt=0)
-    weight_kg: float | None = None
-    elevation_m: int | None = None
-    time_minutes: int | None = None
-    pace: str | None = None
-    heart_rate_avg: int | None = None
-    calories: int | None = None
+
+EXTRACTION_MODEL = "gpt-4o-mini"
+EXTRACTION_FALLBACK_MODEL = "gemini-3.1-flash-lite"
+
+TEXT_ONLY_PROMPT_VERSION = prompt_version(get_activity_text_only_analyze_prompt_messages())
+MESSAGE_AND_PICTURE_PROMPT_VERSION = prompt_version(get_message_and_picture_analyze_prompt_messages())
+COMBINED_TEXT_ONLY_PROMPT_VERSION = prompt_version(get_activity_with_comment_prompt_messages(with_picture=False))
+COMBINED_PICTURE_PROMPT_VERSION = prompt_version(get_activity_with_comment_prompt_messages(with_picture=True))
+
+
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "60"))
+
+
+def model_provider(model_name: str) -> str:
+    return "openai" if model_name.startswith("gpt-") else "google"
+
+
+def _is_provider_failure(exc: Exception) -> bool:
+    # Malformed structured output is the model's answer, not a provider outage.
+    return not isinstance(exc, (OutputParserException, ValidationError))
+
+
+async def _ainvoke_with_fallbacks(
+    operation: str,
+    model_names: list[str],
+    build_chain: Callable[[Any], Runnable],
+    inputs: dict[str, Any],
+    temperature: float | None = None,
+    on_partial: Callable[[str], Awaitable[None]] | None = None,
+) -> Any:
+    """Odpowiednik `with_fallbacks`, ktory pomija dostawcow z otwartym breakerem.
+
+    Z `on_partial` lancuch tekstowy jest strumieniowany (`astream`), a callback
+    dostaje narastajacy tekst; po przejsciu na model zapasowy tekst zaczyna sie od nowa.
+    """
+    last_error: Exception | None = None
+    for model_name in model_names:
+        breaker = get_circuit_breaker(
+            f"llm:{model_provider(model_name)}",
+            failure_threshold=LLM_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout_seconds=LLM_BREAKER_COOLDOWN_SECONDS,
+        )
+        if not breaker.allow():
+            logger.info(
+                "Skipping model with open circuit breaker",
+                extra={"operation": operation, "model": model_name, "breaker": breaker.name},
+            )
+            last_error = last_error or CircuitOpenError(breaker.name, breaker.retry_after_seconds())
+            continue
+        try:
+            chain = build_chain(get_chat_model(model_name, temperature=temperature))
+            if on_partial is None:
+                result = await chain.ainvoke(inputs)
+            else:
+                result = await _astream_text(chain, inputs, on_partial)
+        except Exception as exc:
+            (breaker.record_failure if _is_provider_failure(exc) else breaker.record_success)()
+            logger.warning(
+                "LLM call failed, trying next model",
+                exc_info=True,
+                extra={"operation": operation, "model": model_name},
+            )
+            last_error = exc
+            continue
+        except BaseException:
+            # Cancelled mid-call: no verdict on the provider, but a half-open probe must be freed.
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+    raise last_error or RuntimeError(f"No models configured for {operation}")
+
+
+async def _astream_text(
+    chain: Runnable,
+    inputs: dict[str, Any],
+    on_partial: Callable[[str], Awaitable[None]],
+) -> str:
+    parts: list[str] = []
+    async for chunk in chain.astream(inputs):
+        if not chunk:
+            continue
+        parts.append(chunk)
+        await on_partial("".join(parts))
+    return "".join(parts)
+
+
+def extraction_cache_key(user_message: str, image_digest: str = "", combined: bool = False) -> str:
+    """Klucz cache dla ekstrakcji; uwzglednia wersje promptu i lancuch modeli.
+
+    `combined` to ekstrakcja z promptu laczonego z komentarzem - inny prompt, wiec inny klucz.
+    """
+    if combined:
+        version = COMBINED_PICTURE_PROMPT_VERSION if image_digest else COMBINED_TEXT_ONLY_PROMPT_VERSION
+    else:
+        version = MESSAGE_AND_PICTURE_PROMPT_VERSION if image_digest else TEXT_ONLY_PROMPT_VERSION
+    return build_extraction_cache_key(
+        text=user_message,
+        image_digest=image_digest,
+        prompt_version=version,
+        model=f"{EXTRACTION_MODEL}>{EXTRACTION_FALLBACK_MODEL}",
+    )
 
 
 async def analyze_message_and_picture(
@@ -34,77 +141,94 @@ async def analyze_message_and_picture(
     activities_context: str | None = None,
 ) -> ActivityParams:
 
-    openai = get_chat_model('gpt-4o-mini')
-    gemini = get_chat_model("gemini-3.1-flash-lite")
     prompt = build_message_and_picture_analyze_prompt()
-    llm = openai.with_fallbacks([gemini])
-    structured_data = llm.with_structured_output(ActivityParams)
-    chain = prompt | structured_data
-    return await chain.ainvoke(
+    return await _ainvoke_with_fallbacks(
+        "analyze_message_and_picture",
+        [EXTRACTION_MODEL, EXTRACTION_FALLBACK_MODEL],
+        lambda llm: prompt | llm.with_structured_output(ActivityParams),
         {
             "user_message": user_message,
             "picture_url": picture_url,
             "activities_context": activities_context or "",
-        }
+        },
     )
 
 
 async def analyze_message_only(user_message: str) -> ActivityParams:
  
-    openai = get_chat_model('gpt-4o-mini')
-    gemini = get_chat_model("gemini-3.1-flash-lite")
     prompt = build_activity_text_only_analyze_prompt()
-    llm = openai.with_fallbacks([gemini])
-    structured_data = llm.with_structured_output(ActivityParams)
-    chain = prompt | structured_data
-    return await chain.ainvoke(
+    return await _ainvoke_with_fallbacks(
+        "analyze_message_only",
+        [EXTRACTION_MODEL, EXTRACTION_FALLBACK_MODEL],
+        lambda llm: prompt | llm.with_structured_output(ActivityParams),
         {
             "user_message": user_message,
-        }
+        },
     )
 
 
 
 
+async def analyze_activity_with_comment(
+    user_message: str,
+    user_display_name: str,
+    history_digest: str,
+    minimum_distances: str,
+    picture_url: str | None = None,
+    comment_style: str = "usmc_drill_sergeant",
+) -> ActivityWithComment:
+    """Ekstrakcja i komentarz w jednym wywolaniu structured output (tryb `combined`)."""
+    prompt = build_activity_with_comment_prompt(with_picture=bool(picture_url))
+    inputs = {
+        "user_message": user_message,
+        "user_display_name": user_display_name,
+        "comment_style": comment_style,
+        "historic_activities": history_digest,
+        "minimum_distances": minimum_distances,
+    }
+    if picture_url:
+        inputs["picture_url"] = picture_url
+    return await _ainvoke_with_fallbacks(
+        "analyze_activity_with_comment",
+        [EXTRACTION_MODEL, EXTRACTION_FALLBACK_MODEL],
+        lambda llm: prompt | llm.with_structured_output(ActivityWithComment),
+        inputs,
+        # Between the extraction default (0.2) and the comment chain (0.7).
+        temperature=0.5,
+    )
+
+
 async def generate_activity_comment(
     new_activity: ActivityParams,
     historic_activities: list[ActivityRead],
     user_display_name: str,
     meets_minimum_distance_rule: bool = True,
     comment_style: str = "usmc_drill_sergeant",
+    history_digest: str | None = None,
+    on_partial: Callable[[str], Awaitable[None]] | None = None,
 ) -> str:
-    openai = get_chat_model("gpt-4o-mini", temperature=0.7)
-    gemini = get_chat_model("gemini-3.1-flash-lite", temperature=0.7)
-
-    llm = openai.with_fallbacks([gemini])
-
     prompt = build_progress_comment_prompt()
 
-    chain = prompt | llm | StrOutputParser()
+    new_activity_json = new_activity.model_dump_json(exclude_none=True)
 
-    new_activity_json = new_activity.model_dump_json(indent=2)
-
-    historic_activities_json = (
-        json.dumps(
-            [
-                activity.model_dump(mode="json")
-                for activity in historic_activities
-            ],
-            ensure_ascii=False,
-            indent=2,
-        )
-        if historic_activities
-        else "No activity history available"
-    )
+    # Full ActivityRead JSON was thousands of tokens of repeated keys; the digest
+    # carries the same signal (totals, trend, bests, last rows) in a few lines.
+    if history_digest is None:
+        history_digest = summarize_history(historic_activities)
 
-    comment = await chain.ainvoke(
+    comment = await _ainvoke_with_fallbacks(
+        "generate_activity_comment",
+        ["gpt-4o-mini", "gemini-3.1-flash-lite"],
+        lambda llm: prompt | llm | StrOutputParser(),
         {
             "user_display_name": user_display_name,
             "comment_style": comment_style,
             "new_activity": new_activity_json,
-            "historic_activities": historic_activities_json,
+            "historic_activities": history_digest,
             "meets_minimum_distance_rule": meets_minimum_distance_rule,
-        }
+        },
+        temperature=0.7,
+        on_partial=on_partial,
     )
 
     return comment.strip()
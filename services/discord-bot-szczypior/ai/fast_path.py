@@ -0,0 +1,389 @@
+"""Deterministyczna ekstrakcja aktywnosci z tekstu bez wywolania LLM."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping
+
+from pydantic import ValidationError
+
+from ai.schemas import ActivityParams
+from libs.shared.constants import ACTIVITY_KEYWORDS
+from utils.calculations import _parse_time_to_minutes
+
+logger = logging.getLogger(__name__)
+
+
+FAST_PATH_ENABLED = os.getenv("AI_FAST_PATH_ENABLED", "true").strip().lower() not in {"0", "false", "no"}
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("AI_FAST_PATH_MIN_CONFIDENCE", "0.8"))
+
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+
+_PACE_RE = re.compile(r"(?:tempo\s*[:=]?\s*)?\b(\d{1,2})[:'’](\d{2})\s*(?:min)?\s*/\s*km\b|\btempo\s*[:=]?\s*(\d{1,2})[:'’](\d{2})\b")
+_KM_RE = re.compile(_NUMBER + r"\s*(?:km|kilometr\w*)\b")
+_MILES_RE = re.compile(_NUMBER + r"\s*(?:mi|mil\w*|miles?)\b")
+_ELEVATION_RE = re.compile(
+    r"(?:przewy[zż]\w*|elev\w*|podej\w*|\bd\+)\s*[:=]?\s*\+?(\d+)\s*m\b"
+    r"|\+(\d+)\s*m\b"
+    r"|(\d+)\s*m\s*(?:przewy[zż]\w*|elev\w*|w\s+g[oó]r[eę]|d\+|up\b)"
+)
+_METERS_RE = re.compile(r"(\d+)\s*(?:m|metr\w*)\b")
+_FEET_RE = re.compile(r"\d+\s*(?:ft|feet|st[oó]p)\b")
+_WEIGHT_RE = re.compile(_NUMBER + r"\s*kg\b")
+_WEIGHT_HINT_RE = re.compile(r"obci[aą][zż]\w*|plecak\w*|kamizel\w*|weighted|vest|backpack|ruck\w*")
+_NO_WEIGHT_RE = re.compile(r"\bbez\s+obci[aą][zż]\w*")
+_HEART_RATE_RE = re.compile(r"(?:\bhr|puls\w*|t[eę]tn\w*)\s*[:=]?\s*(\d{2,3})\b|\b(\d{2,3})\s*bpm\b")
+_CALORIES_RE = re.compile(r"(\d{2,5})\s*(?:kcal|kalori\w*|cal)\b")
+_CLOCK_RE = re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b")
+_HOURS_RE = re.compile(r"\b(\d{1,2})\s*(?:h|godz\w*)\s*(?:(\d{1,2})\s*(?:min\w*|m)\b)?")
+_MINUTES_RE = re.compile(r"\b(\d{1,3})\s*min\w*\b")
+_LEFTOVER_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+_MILES_TO_KM = 1.609344
+_MAX_PLAUSIBLE_DISTANCE_KM = 300.0
+# min/km: ~60 km/h on a bike down to a slow loaded march.
+_PLAUSIBLE_PACE_RANGE = (1.0, 20.0)
+
+
+@dataclass(slots=True)
+class FastPathResult:
+    """Wynik ekstrakcji regulowej wraz z ocena pewnosci."""
+
+    params: ActivityParams | None
+    confidence: float
+    reasons: list[str] = field(default_factory=list)
+
+    def is_confident(self, threshold: float | None = None) -> bool:
+        limit = FAST_PATH_MIN_CONFIDENCE if threshold is None else threshold
+        return self.params is not None and self.confidence >= limit
+
+
+@dataclass(slots=True)
+class FastPathStats:
+    """Licznik trafien sciezki regulowej w biezacym procesie."""
+
+    attempts: int = 0
+    hits: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+fast_path_stats = FastPathStats()
+
+
+def _build_keyword_patterns() -> list[tuple[str, re.Pattern[str]]]:
+    keywords = ACTIVITY_KEYWORDS
+    # constants.ACTIVITY_KEYWORDS is accidentally wrapped in a tuple.
+    if isinstance(keywords, tuple) and keywords and isinstance(keywords[0], dict):
+        keywords = keywords[0]
+    patterns: list[tuple[str, re.Pattern[str]]] = []
+    for activity_type, words in keywords.items():
+        for word in words:
+            patterns.append((activity_type, re.compile(r"\b" + re.escape(word.lower()))))
+    return patterns
+
+
+_KEYWORD_PATTERNS = _build_keyword_patterns()
+
+
+def _to_number(raw: str) -> float:
+    return float(raw.replace(",", "."))
+
+
+def _blank(text: str, span: tuple[int, int]) -> str:
+    start, end = span
+    return text[:start] + " " * (end - start) + text[end:]
+
+
+def _detect_activity_types(text: str) -> set[str]:
+    matches: list[tuple[int, int, str]] = []
+    for activity_type, pattern in _KEYWORD_PATTERNS:
+        for match in pattern.finditer(text):
+            matches.append((match.start(), match.end(), activity_type))
+
+    # Drop matches nested inside a longer keyword ("rower" in "rower stacjonarny").
+    detected: set[str] = set()
+    for start, end, activity_type in matches:
+        nested = any(
+            other_start <= start and end <= other_end and (other_end - other_start) > (end - start)
+            for other_start, other_end, _ in matches
+        )
+        if not nested:
+            detected.add(activity_type)
+    return detected
+
+
+def _pace_minutes(pace: str) -> float:
+    minutes, seconds = re.split(r"[:'’]", pace.split("/")[0])
+    return int(minutes) + int(seconds) / 60
+
+
+def _plausible_pace(minutes: int, distance_km: float) -> bool:
+    low, high = _PLAUSIBLE_PACE_RANGE
+    return low <= minutes / distance_km <= high
+
+
+def _clock_minutes(
+    clock: str, distance_km: float | None, pace: str | None
+) -> tuple[int | None, str | None]:
+    """Zamienia "a:b(:c)" na minuty; "a:b" to MM:SS albo H:MM, wybor wg dystansu i tempa.
+
+    Zwraca (minuty, powod obnizenia pewnosci lub None).
+    """
+    parts = [int(part) for part in clock.split(":")]
+    if len(parts) == 3:
+        return _parse_time_to_minutes(clock), None
+
+    first, second = parts
+    as_mm_ss = first + (1 if second >= 30 else 0)
+    as_h_mm = first * 60 + second if second < 60 else None
+    if as_h_mm is None or as_h_mm == as_mm_ss:
+        return as_mm_ss, None
+    if pace is not None and distance_km:
+        expected = distance_km * _pace_minutes(pace)
+        return min((as_mm_ss, as_h_mm), key=lambda minutes: abs(minutes - expected)), None
+    if not distance_km:
+        return as_mm_ss, "ambiguous_clock"
+
+    mm_ss_ok = _plausible_pace(as_mm_ss, distance_km) if as_mm_ss else False
+    h_mm_ok = _plausible_pace(as_h_mm, distance_km)
+    if mm_ss_ok and not h_mm_ok:
+        return as_mm_ss, None
+    if h_mm_ok and not mm_ss_ok:
+        return as_h_mm, None
+    return as_mm_ss, "ambiguous_clock" if mm_ss_ok else "implausible_time"
+
+
+def extract_activity_from_text(text: str) -> FastPathResult:
+    """Parsuje dobrze sformatowany raport tekstowy i ocenia pewnosc wyniku."""
+    reasons: list[str] = []
+    if not text or not text.strip():
+        return FastPathResult(params=None, confidence=0.0, reasons=["empty"])
+
+    remaining = text.lower()
+    confidence = 0.0
+
+    activity_types = _detect_activity_types(remaining)
+    if not activity_types:
+        return FastPathResult(params=None, confidence=0.0, reasons=["no_activity_type"])
+    if len(activity_types) > 1:
+        return FastPathResult(params=None, confidence=0.0, reasons=["ambiguous_activity_type"])
+    activity_type = next(iter(activity_types))
+    confidence += 0.45
+
+    pace: str | None = None
+    pace_matches = list(_PACE_RE.finditer(remaining))
+    if pace_matches:
+        groups = pace_matches[0].groups()
+        minutes, seconds = (groups[0], groups[1]) if groups[0] else (groups[2], groups[3])
+        pace = f"{int(minutes)}:{seconds}/km"
+        if len(pace_matches) > 1:
+            confidence -= 0.2
+            reasons.append("multiple_paces")
+        for match in pace_matches:
+            remaining = _blank(remaining, match.span())
+
+    elevation_m: int | None = None
+    if _FEET_RE.search(remaining):
+        confidence -= 0.3
+        reasons.append("imperial_elevation")
+    elevation_matches = list(_ELEVATION_RE.finditer(remaining))
+    if elevation_matches:
+        elevation_m = int(next(group for group in elevation_matches[0].groups() if group))
+        for match in elevation_matches:
+            remaining = _blank(remaining, match.span())
+
+    distances: list[float] = []
+    for match in _KM_RE.finditer(remaining):
+        distances.append(_to_number(match.group(1)))
+        remaining = _blank(remaining, match.span())
+    for match in _MILES_RE.finditer(remaining):
+        distances.append(round(_to_number(match.group(1)) * _MILES_TO_KM, 2))
+        remaining = _blank(remaining, match.span())
+    if not distances:
+        for match in _METERS_RE.finditer(remaining):
+            distances.append(int(match.group(1)) / 1000)
+            remaining = _blank(remaining, match.span())
+
+    weight_kg: float | None = None
+    weight_matches = list(_WEIGHT_RE.finditer(remaining))
+    if weight_matches:
+        weight_kg = _to_number(weight_matches[0].group(1))
+        for match in weight_matches:
+            remaining = _blank(remaining, match.span())
+    elif _WEIGHT_HINT_RE.search(remaining) and not _NO_WEIGHT_RE.search(remaining):
+        # Prompt rules assume a default load when none is given; leave that to the LLM.
+        confidence -= 0.3
+        reasons.append("weight_without_value")
+
+    heart_rate_avg: int | None = None
+    hr_match = _HEART_RATE_RE.search(remaining)
+    if hr_match:
+        heart_rate_avg = int(hr_match.group(1) or hr_match.group(2))
+        remaining = _blank(remaining, hr_match.span())
+
+    calories: int | None = None
+    calories_match = _CALORIES_RE.search(remaining)
+    if calories_match:
+        calories = int(calories_match.group(1))
+        remaining = _blank(remaining, calories_match.span())
+
+    single_distance = distances[0] if len(set(distances)) == 1 else None
+    time_minutes: int | None = None
+    if clock_match := _CLOCK_RE.search(remaining):
+        time_minutes, time_reason = _clock_minutes(clock_match.group(0), single_distance, pace)
+        if time_reason:
+            confidence -= 0.3
+            reasons.append(time_reason)
+        remaining = _blank(remaining, clock_match.span())
+    elif hours_match := _HOURS_RE.search(remaining):
+        time_minutes = int(hours_match.group(1)) * 60 + int(hours_match.group(2) or 0)
+        remaining = _blank(remaining, hours_match.span())
+    elif minutes_match := _MINUTES_RE.search(remaining):
+        time_minutes = int(minutes_match.group(1))
+        remaining = _blank(remaining, minutes_match.span())
+
+    distance_km: float | None = None
+    if len(set(distances)) == 1:
+        distance_km = distances[0]
+        confidence += 0.45
+    elif len(distances) > 1:
+        reasons.append("multiple_distances")
+        return FastPathResult(params=None, confidence=0.0, reasons=reasons)
+    elif time_minutes and pace:
+        distance_km = round(time_minutes / _pace_minutes(pace), 2)
+        confidence += 0.3
+        reasons.append("distance_from_pace")
+    else:
+        reasons.append("no_distance")
+        return FastPathResult(params=None, confidence=max(confidence, 0.0), reasons=reasons)
+
+    if not 0 < distance_km <= _MAX_PLAUSIBLE_DISTANCE_KM:
+        reasons.append("implausible_distance")
+        return FastPathResult(params=None, confidence=0.0, reasons=reasons)
+
+    if time_minutes and pace and "distance_from_pace" not in reasons:
+        expected_minutes = distance_km * _pace_minutes(pace)
+        if abs(expected_minutes - time_minutes) / time_minutes <= 0.1:
+            confidence += 0.1
+        else:
+            confidence -= 0.3
+            reasons.append("inconsistent_time_pace")
+
+    leftovers = _LEFTOVER_NUMBER_RE.findall(remaining)
+    if leftovers:
+        confidence -= 0.15 * len(leftovers)
+        reasons.append("unparsed_numbers")
+
+    try:
+        params = ActivityParams(
+            activity_type=activity_type,
+            distance_km=distance_km,
+            weight_kg=weight_kg,
+            elevation_m=elevation_m,
+            time_minutes=time_minutes,
+            pace=pace,
+            heart_rate_avg=heart_rate_avg,
+            calories=calories,
+        )
+    except ValidationError:
+        reasons.append("invalid_params")
+        return FastPathResult(params=None, confidence=0.0, reasons=reasons)
+
+    return FastPathResult(params=params, confidence=round(min(max(confidence, 0.0), 1.0), 2), reasons=reasons)
+
+
+def try_fast_path(text: str, message_id: str | None = None) -> ActivityParams | None:
+    """Zwraca parametry aktywnosci, gdy regex jest wystarczajaco pewny, inaczej None."""
+    if not FAST_PATH_ENABLED:
+        return None
+
+    result = extract_activity_from_text(text)
+    fast_path_stats.attempts += 1
+    hit = result.is_confident()
+    if hit:
+        fast_path_stats.hits += 1
+
+    logger.info(
+        "Fast path extraction",
+        extra={
+            "message_id": message_id,
+            "hit": hit,
+            "confidence": result.confidence,
+            "reasons": result.reasons,
+            "hit_rate": round(fast_path_stats.hit_rate, 3),
+        },
+    )
+    return result.params if hit else None
+
+
+def _fields_match(fast: ActivityParams, expected: ActivityParams) -> dict[str, bool]:
+    def close(a: float | None, b: float | None, tolerance: float) -> bool:
+        if a is None or b is None:
+            return a is None and b is None
+        return abs(a - b) <= tolerance
+
+    return {
+        "activity_type": fast.activity_type == expected.activity_type,
+        "distance_km": close(fast.distance_km, expected.distance_km, 0.05),
+        "time_minutes": close(fast.time_minutes, expected.time_minutes, 1),
+        "weight_kg": close(fast.weight_kg, expected.weight_kg, 0.5),
+        "elevation_m": close(fast.elevation_m, expected.elevation_m, 5),
+    }
+
+
+def evaluate_fast_path(
+    samples: Iterable[tuple[str, ActivityParams | Mapping[str, Any]]],
+    threshold: float | None = None,
+) -> dict[str, Any]:
+    """Mierzy hit rate i zgodnosc z LLM na korpusie par (tekst, wynik LLM)."""
+    total = hits = accurate = 0
+    mismatches: dict[str, int] = {}
+    for text, expected_raw in samples:
+        total += 1
+        expected = (
+            expected_raw if isinstance(expected_raw, ActivityParams) else ActivityParams.model_validate(expected_raw)
+        )
+        result = extract_activity_from_text(text)
+        if not result.is_confident(threshold):
+            continue
+        hits += 1
+        checks = _fields_match(result.params, expected)
+        if all(checks.values()):
+            accurate += 1
+        for field_name, ok in checks.items():
+            if not ok:
+                mismatches[field_name] = mismatches.get(field_name, 0) + 1
+
+    return {
+        "samples": total,
+        "hits": hits,
+        "hit_rate": round(hits / total, 3) if total else 0.0,
+        "accurate_hits": accurate,
+        "accuracy": round(accurate / hits, 3) if hits else 0.0,
+        "field_mismatches": mismatches,
+    }
+
+
+def _load_corpus(path: str) -> list[tuple[str, dict[str, Any]]]:
+    # JSONL: {"content": "...", "expected": {<ActivityParams z LLM>}}
+    with open(path, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    return [(row["content"], row["expected"]) for row in rows]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage: python -m ai.fast_path <corpus.jsonl> [threshold]")
+    report = evaluate_fast_path(
+        _load_corpus(sys.argv[1]),
+        threshold=float(sys.argv[2]) if len(sys.argv) > 2 else None,
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
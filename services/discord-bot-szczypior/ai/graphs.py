@@ -1,26 +1,82 @@
 from __future__ import annotations
 
+import asyncio
+from collections import Counter
 from datetime import datetime
 import logging
+import os
+import time
 from typing import Any, Awaitable, Callable, Literal
 
 
 from langgraph.graph import StateGraph, START, END
 
+from ai.cache import ExtractionCache, get_extraction_cache, image_url_digest
 from ai.chains import (
     ActivityParams,
+    analyze_activity_with_comment,
     analyze_message_and_picture,
     analyze_message_only,
+    extraction_cache_key,
     generate_activity_comment,
 )
+from ai.fast_path import try_fast_path
+from ai.history import get_history_digest_cache, summarize_history
+from ai.progress import current_comment_progress
+from ai.images import prepare_image
 from api.api_menager import APIManager, get_user_activity_history, save_activity
+from api.outbox import get_activity_outbox
 
+from libs.shared.cache import CHALLENGES, get_shared_cache
 from libs.shared.schemas.activity import ActivityRead
 from ai.schemas import ActivityState
-from utils.calculations import build_activity_create_from_ai_response, _resolve_activity_types  
+from utils.calculations import (
+    build_activity_create_from_ai_response,
+    DEFAULT_POINTS_RULES,
+    calculate_points_breakdown,
+    _resolve_activity_types,
+    _resolve_points_rules,
+)
+from utils.metrics import STAGE_DURATION
+from utils.resilience import RetryBudget, RetryPolicy, retry_async
 logger = logging.getLogger(__name__)
 
 
+# Each attempt already walks the whole model fallback chain, so attempts are
+# spaced out and capped by a shared budget instead of hammering a failing provider.
+LLM_RETRY_POLICY = RetryPolicy(
+    max_attempts=int(os.getenv("LLM_RETRY_ATTEMPTS", "3")),
+    base_delay_seconds=float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "1.0")),
+    max_delay_seconds=float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "10")),
+)
+llm_retry_budget = RetryBudget(ratio=float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2")))
+
+# two_call: structured extraction, then a separate comment chain (default).
+# combined: one structured-output call returns the activity and the comment.
+PIPELINE_MODES = ("two_call", "combined")
+IMAGE_EXTRACTION_CONCURRENCY = int(os.getenv("AI_IMAGE_EXTRACTION_CONCURRENCY", "4"))
+BELOW_MINIMUM_DISTANCE_NOTE = "⚠️ Ta aktywność nie spełnia minimalnego dystansu i nie jest liczona."
+
+
+def resolve_pipeline_mode(raw: str | None = None) -> str:
+    mode = (raw if raw is not None else os.getenv("AI_PIPELINE_MODE", "two_call")).strip().lower()
+    if mode not in PIPELINE_MODES:
+        logger.warning("Unknown AI pipeline mode, using two_call", extra={"pipeline_mode": mode})
+        return "two_call"
+    return mode
+
+
+def meets_minimum_distance(activity_type: str, distance_km: float | None, activity_rules: dict[str, Any]) -> bool:
+    if distance_km is not None and activity_type in activity_rules:
+        return distance_km >= activity_rules[activity_type].get("min_distance", 0)
+    return True
+
+
+def _minimum_distances_context(activity_rules: dict[str, Any]) -> str:
+    lines = [f"{activity_type}: {rule.get('min_distance', 0):g}" for activity_type, rule in activity_rules.items()]
+    return "\n".join(lines) or "brak"
+
+
 def _parse_created_at(value: str | None) -> datetime:
     if not value:
         raise ValueError("created_at is required to build ActivityCreate payload")
@@ -31,14 +87,228 @@ def _build_iid(message_id: str, created_at: datetime) -> str:
     return f"{int(created_at.timestamp())}_{message_id}"
 
 
-    
-    
-def build_activity_state_graph() -> StateGraph[ActivityState]:
-    
+def _activity_params_to_state(activity: ActivityParams) -> ActivityState:
+    # Only extraction fields: the node runs in parallel with other branches and
+    # LangGraph rejects two writes to the same channel within one step.
+    return {
+        "activity_type": activity.activity_type,
+        "distance_km": activity.distance_km,
+        "weight_kg": activity.weight_kg,
+        "elevation_m": activity.elevation_m,
+        "time_minutes": activity.time_minutes,
+        "pace": activity.pace,
+        "heart_rate_avg": activity.heart_rate_avg,
+        "calories": activity.calories,
+    }
+
+
+def _activity_preview(state: ActivityState) -> str:
+    """Jednolinijkowe podsumowanie aktywnosci pokazywane, zanim powstanie komentarz."""
+    activity_type = state.get("activity_type") or ""
+    distance_km = state.get("distance_km") or 0.0
+    activity_info = (state.get("activity_rules") or {}).get(activity_type, {})
+    summary = f"{activity_info.get('emoji') or '🏅'} {activity_info.get('display_name') or activity_type}: {distance_km:g} km"
+    if not state.get("meets_minimum_distance_rule", True):
+        return f"{summary} · poniżej minimalnego dystansu"
+    try:
+        breakdown = calculate_points_breakdown(
+            activity_type=activity_type,
+            distance_km=distance_km,
+            weight_kg=state.get("weight_kg"),
+            elevation_m=state.get("elevation_m"),
+            rules=state.get("points_rules") or DEFAULT_POINTS_RULES,
+        )
+    except ValueError:
+        return summary
+    return f"{summary} · {breakdown['total_points']} pkt"
+
+
+def _timed_node(
+    name: str,
+    node: Callable[[ActivityState], Any],
+) -> Callable[[ActivityState], Awaitable[Any]]:
+    """Wraps a graph node, logs its wall-clock duration and records it as a stage metric.
+
+    Sync nodes do blocking HTTP through APIManager, so they are moved to a
+    worker thread to keep the parallel branches from stalling the event loop.
+    """
+    is_async = asyncio.iscoroutinefunction(node)
+
+    async def wrapper(state: ActivityState) -> Any:
+        started = time.perf_counter()
+        try:
+            if is_async:
+                return await node(state)
+            return await asyncio.to_thread(node, state)
+        finally:
+            elapsed = time.perf_counter() - started
+            STAGE_DURATION.observe(elapsed, stage=name)
+            logger.info(
+                "Activity graph node finished",
+                extra={
+                    "node": name,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "message_id": state.get("message_id"),
+                },
+            )
+
+    return wrapper
+
+
+async def _extract_with_picture(state: ActivityState, picture_url: str) -> ActivityParams:
+    return await retry_async(
+        lambda: analyze_message_and_picture(
+            picture_url=picture_url,
+            user_message=state["content"],
+        ),
+        operation="process_activity_with_picture_node",
+        policy=LLM_RETRY_POLICY,
+        budget=llm_retry_budget,
+    )
+
+
+async def _extract_text_only(state: ActivityState) -> ActivityParams:
+    return await retry_async(
+        lambda: analyze_message_only(
+            user_message=state["content"],
+        ),
+        operation="process_activity_text_only_node",
+        policy=LLM_RETRY_POLICY,
+        budget=llm_retry_budget,
+    )
+
+
+def _image_urls(state: ActivityState) -> list[str]:
+    image_urls = state.get("image_urls")
+    if image_urls:
+        return list(image_urls)
+    return [state["image_url"]] if state.get("image_url") else []
+
+
+async def _prepare_picture(image_url: str) -> tuple[str, str]:
+    """Zwraca (url obrazu dla modelu, digest do klucza cache)."""
+    # Downscaled inline JPEG instead of the full-size CDN original; the
+    # bytes digest makes exact re-posts hit the extraction cache.
+    prepared_image = await prepare_image(image_url)
+    if prepared_image is not None:
+        return prepared_image.data_url, prepared_image.digest
+    return image_url, image_url_digest(image_url)
+
+
+_MERGED_METRICS = ("distance_km", "weight_kg", "elevation_m", "time_minutes", "pace", "heart_rate_avg", "calories")
+
+
+def merge_activity_params(parts: list[ActivityParams]) -> ActivityParams:
+    """Laczy czesciowe ekstrakcje z kilku obrazow jednej wiadomosci w jedna aktywnosc.
+
+    Obrazy sa uszeregowane wg liczby odczytanych metryk (przy remisie wg kolejnosci
+    zalacznikow) i kazde pole bierze pierwsza niepusta wartosc z tej kolejnosci - np.
+    dystans z ekranu podsumowania zegarka, przewyzszenie ze screena mapy. Typ aktywnosci
+    wybiera wiekszosc glosow, remis rozstrzyga ta sama kolejnosc.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    ranked = sorted(
+        parts,
+        key=lambda part: -sum(getattr(part, field) is not None for field in _MERGED_METRICS),
+    )
+    votes = Counter(part.activity_type for part in parts)
+    top_votes = max(votes.values())
+    activity_type = next(part.activity_type for part in ranked if votes[part.activity_type] == top_votes)
+    merged = {
+        field: next((getattr(part, field) for part in ranked if getattr(part, field) is not None), None)
+        for field in _MERGED_METRICS
+    }
+    return ActivityParams(activity_type=activity_type, **merged)
+
+
+async def _extract_from_image(state: ActivityState, image_url: str, extraction_cache: ExtractionCache) -> ActivityParams:
+    picture_url, image_digest = await _prepare_picture(image_url)
+    cache_key = extraction_cache_key(user_message=state["content"], image_digest=image_digest)
+    cached_activity = extraction_cache.get(cache_key)
+    if cached_activity is not None:
+        logger.info("Extraction cache hit", extra={"message_id": state.get("message_id")})
+        return cached_activity
+    activity = await _extract_with_picture(state, picture_url)
+    extraction_cache.set(cache_key, activity)
+    return activity
+
+
+async def _extract_from_images(
+    state: ActivityState,
+    image_urls: list[str],
+    extraction_cache: ExtractionCache,
+) -> ActivityParams:
+    # Every attachment is extracted concurrently (bounded), so a watch summary plus a
+    # map screenshot costs the slowest image, not the sum. Each image is cached on its own.
+    semaphore = asyncio.Semaphore(max(1, IMAGE_EXTRACTION_CONCURRENCY))
+
+    async def extract_one(image_url: str) -> ActivityParams:
+        async with semaphore:
+            return await _extract_from_image(state, image_url, extraction_cache)
+
+    results = await asyncio.gather(*(extract_one(url) for url in image_urls), return_exceptions=True)
+    parts: list[ActivityParams] = []
+    for image_url, result in zip(image_urls, results):
+        if isinstance(result, ActivityParams):
+            parts.append(result)
+        elif not isinstance(result, Exception):
+            raise result
+        else:
+            logger.warning(
+                "Image extraction failed, merging the remaining images",
+                exc_info=result,
+                extra={"message_id": state.get("message_id"), "image_url": image_url},
+            )
+    if not parts:
+        raise next(result for result in results if isinstance(result, BaseException))
+    if len(image_urls) > 1:
+        logger.info(
+            "Merged extraction from multiple images",
+            extra={"message_id": state.get("message_id"), "images": len(image_urls), "extracted": len(parts)},
+        )
+    return merge_activity_params(parts)
+
+
+async def extract_activity(state: ActivityState, extraction_cache: ExtractionCache) -> ActivityState:
+    """Ekstrakcja parametrow: fast path (tylko tekst), potem cache, na koncu LLM."""
+    image_urls = _image_urls(state)
+    if image_urls:
+        return _activity_params_to_state(await _extract_from_images(state, image_urls, extraction_cache))
+
+    # The regex path is cheaper than a cache lookup and is never cached: the
+    # cache key describes the LLM prompt/model, not the fast-path rules.
+    fast_activity = try_fast_path(state["content"], message_id=state.get("message_id"))
+    if fast_activity is not None:
+        return _activity_params_to_state(fast_activity)
+
+    cache_key = extraction_cache_key(user_message=state["content"])
+    cached_activity = extraction_cache.get(cache_key)
+    if cached_activity is not None:
+        logger.info("Extraction cache hit", extra={"message_id": state.get("message_id")})
+        return _activity_params_to_state(cached_activity)
+
+    activity = await _extract_text_only(state)
+    extraction_cache.set(cache_key, activity)
+    return _activity_params_to_state(activity)
+
+
+def build_activity_state_graph(pipeline_mode: str | None = None) -> StateGraph[ActivityState]:
+    pipeline_mode = resolve_pipeline_mode(pipeline_mode)
     graph = StateGraph(ActivityState)
+    extraction_cache = get_extraction_cache()
+    history_digests = get_history_digest_cache()
+    activity_outbox = get_activity_outbox()
     api_manager: APIManager | None = None
     channel_to_challenge_cache: dict[str, int | None] = {}
 
+    def on_cache_invalidated(namespace: str) -> None:
+        # Challenge edits (db-service or dashboard) can move a channel to another challenge.
+        if namespace == CHALLENGES:
+            channel_to_challenge_cache.clear()
+
+    get_shared_cache().add_listener(on_cache_invalidated)
+
     def get_api_manager() -> APIManager | None:
         nonlocal api_manager
         if api_manager is not None:
@@ -82,116 +352,59 @@ def build_activity_state_graph() -> StateGraph[ActivityState]:
         channel_to_challenge_cache.setdefault(channel_id, None)
         return channel_to_challenge_cache[channel_id]
 
-    def image_route(
-        state: ActivityState,
-    ) -> Literal["process_activity_with_picture_node", "process_activity_text_only_node"]:
-        if state.get("image_url"):
-            return "process_activity_with_picture_node"
-        return "process_activity_text_only_node"
-    
     def  min_distance_rule_route( state: ActivityState,) -> Literal["save_activity", "end"]:
         if state.get("meets_minimum_distance_rule", True):
             return "save_activity"
         return "end"
-    async def process_activity_with_picture_node(state: ActivityState) -> ActivityState:
-        last_error: Exception | None = None
-        for attempt in range(1, 4):
-            try:
-                activity = await analyze_message_and_picture(
-                    picture_url=state.get("image_url"),
-                    user_message=state["content"],
-                )
-                break
-            except Exception as exc:
-                last_error = exc
-                logger.warning(
-                    "process_activity_with_picture_node failed",
-                    exc_info=True,
-                    extra={
-                        "attempt": attempt,
-                        "max_attempts": 3,
-                        "message_id": state.get("message_id"),
-                    },
-                )
-        else:
-            raise RuntimeError("process_activity_with_picture_node failed after 3 attempts") from last_error
-        
-        return {
-            "activity_type": activity.activity_type,
-            "distance_km": activity.distance_km,
-            "weight_kg": activity.weight_kg,
-            "elevation_m": activity.elevation_m,
-            "time_minutes": activity.time_minutes,
-            "pace": activity.pace,
-            "heart_rate_avg": activity.heart_rate_avg,
-            "calories": activity.calories,
-            "message_id": state["message_id"],
-            "author_id": state["author_id"],
-            "author_display_name": state["author_display_name"],
-            "channel_id": state["channel_id"],
-            "content": state["content"],
-            "image_url": state.get("image_url"),
-            "created_at": state.get("created_at"),
-        }
 
-    async def process_activity_text_only_node(state: ActivityState) -> ActivityState:
-        last_error: Exception | None = None
-        for attempt in range(1, 4):
-            try:
-                activity = await analyze_message_only(
-                    user_message=state["content"],
-                )
-                break
-            except Exception as exc:
-                last_error = exc
-                logger.warning(
-                    "process_activity_text_only_node failed",
-                    exc_info=True,
-                    extra={
-                        "attempt": attempt,
-                        "max_attempts": 3,
-                        "message_id": state.get("message_id"),
-                    },
-                )
-        else:
-            raise RuntimeError("process_activity_text_only_node failed after 3 attempts") from last_error
-        
-        return {
-            "activity_type": activity.activity_type,
-            "distance_km": activity.distance_km,
-            "weight_kg": activity.weight_kg,
-            "elevation_m": activity.elevation_m,
-            "time_minutes": activity.time_minutes,
-            "pace": activity.pace,
-            "heart_rate_avg": activity.heart_rate_avg,
-            "calories": activity.calories,
-            "message_id": state["message_id"],
-            "author_id": state["author_id"],
-            "author_display_name": state["author_display_name"],
-            "channel_id": state["channel_id"],
-            "content": state["content"],
-            "created_at": state.get("created_at"),
-        }
+    async def extract_activity_node(state: ActivityState) -> ActivityState:
+        # Single extraction node so the join below has a fixed set of predecessors;
+        # the picture/text split lives in extract_activity instead of on a conditional edge.
+        return await extract_activity(state, extraction_cache)
 
-    def get_activity_history_node(state: ActivityState) -> ActivityState:
-        history = get_user_activity_history(state["author_id"])
-        return {"historic_activities": history}
+    async def get_activity_history_node(state: ActivityState) -> ActivityState:
+        author_id = state["author_id"]
+        digest = history_digests.get(author_id)
+        if digest is not None:
+            return {"history_digest": digest}
+        generation = history_digests.generation(author_id)
+        history = await asyncio.to_thread(get_user_activity_history, author_id)
+        return {"historic_activities": history, "history_digest": history_digests.build(author_id, history, generation)}
+
+    async def load_activity_rules_node(state: ActivityState) -> ActivityState:
+        # Points rules are only needed up front for the streamed preview; the save
+        # node resolves them itself.
+        with_points_rules = current_comment_progress() is not None
+
+        def _load() -> ActivityState:
+            challenge_id = resolve_challenge_id(state.get("channel_id"))
+            loaded: ActivityState = {
+                "challenge_id": challenge_id,
+                "activity_rules": _resolve_activity_types(api_manager=get_api_manager(), challenge_id=challenge_id),
+            }
+            if with_points_rules:
+                loaded["points_rules"] = _resolve_points_rules(get_api_manager(), challenge_id)
+            return loaded
+
+        return await asyncio.to_thread(_load)
 
     def validate_activity_distance_rule(state: ActivityState) -> ActivityState:
         distance_km = state.get("distance_km")
         activity_type = state.get("activity_type", "").lower() if state.get("activity_type") else ""
-        activity_rules = _resolve_activity_types(api_manager=get_api_manager(), challenge_id=resolve_challenge_id(state.get("channel_id")))
-        if distance_km is not None and distance_km <= 0:
-            state["meets_minimum_distance_rule"] = False
-        if distance_km is not None and activity_type in activity_rules:
-            min_distance = activity_rules[activity_type].get("min_distance", 0)
-            state["meets_minimum_distance_rule"] = distance_km >= min_distance
-        else:
-            state["meets_minimum_distance_rule"] = True  
+        activity_rules = state.get("activity_rules")
+        if activity_rules is None:
+            activity_rules = _resolve_activity_types(
+                api_manager=get_api_manager(),
+                challenge_id=resolve_challenge_id(state.get("channel_id")),
+            )
+        state["meets_minimum_distance_rule"] = meets_minimum_distance(activity_type, distance_km, activity_rules)
         return state
     
     async def generate_comment_node(state: ActivityState) -> ActivityState:
         historic_activities = state.get("historic_activities", [])
+        progress = current_comment_progress()
+        if progress is not None:
+            await progress.preview(_activity_preview(state))
         comment = await generate_activity_comment(
             new_activity=ActivityParams(
                 activity_type=state["activity_type"],
@@ -206,14 +419,76 @@ def build_activity_state_graph() -> StateGraph[ActivityState]:
             historic_activities=historic_activities,
             user_display_name=state["author_display_name"],
             meets_minimum_distance_rule=state.get("meets_minimum_distance_rule", True),
+            history_digest=state.get("history_digest"),
+            on_partial=progress.partial if progress is not None else None,
         )
         logger.info("Generated activity comment", extra={"comment": comment})
         return {"comment": comment}
 
+    async def extract_and_comment_node(state: ActivityState) -> ActivityState:
+        # Combined mode: history and rules are already loaded, so one LLM call can
+        # return both the activity and the comment. Fast-path and cached
+        # extractions skip that call and only need the comment chain.
+        activity: ActivityParams | None = None
+        image_urls = _image_urls(state)
+        if not image_urls:
+            activity = try_fast_path(state["content"], message_id=state.get("message_id"))
+        elif len(image_urls) > 1:
+            # The combined prompt takes one picture; several images go through the
+            # per-image extraction and merge, then the comment chain.
+            activity = await _extract_from_images(state, image_urls, extraction_cache)
+        picture_url, image_digest = "", ""
+        if activity is None:
+            if image_urls:
+                picture_url, image_digest = await _prepare_picture(image_urls[0])
+            cache_key = extraction_cache_key(user_message=state["content"], image_digest=image_digest, combined=True)
+            activity = extraction_cache.get(cache_key)
+        activity_rules = state.get("activity_rules") or {}
+
+        if activity is not None:
+            activity_state: ActivityState = {**state, **_activity_params_to_state(activity)}
+            activity_state["meets_minimum_distance_rule"] = meets_minimum_distance(
+                activity.activity_type.lower(), activity.distance_km, activity_rules
+            )
+            comment_update = await generate_comment_node(activity_state)
+            return {**_activity_params_to_state(activity), "comment": comment_update["comment"]}
+
+        history_digest = state.get("history_digest") or summarize_history(state.get("historic_activities", []))
+        result = await retry_async(
+            lambda: analyze_activity_with_comment(
+                user_message=state["content"],
+                user_display_name=state["author_display_name"],
+                history_digest=history_digest,
+                minimum_distances=_minimum_distances_context(activity_rules),
+                picture_url=picture_url or None,
+            ),
+            operation="extract_and_comment_node",
+            policy=LLM_RETRY_POLICY,
+            budget=llm_retry_budget,
+        )
+        activity = result.activity()
+        extraction_cache.set(cache_key, activity)
+        activity_state = {**state, **_activity_params_to_state(activity)}
+        # The model saw the minimum distances, but only the deterministic check gates the save.
+        activity_state["meets_minimum_distance_rule"] = meets_minimum_distance(
+            activity.activity_type.lower(), activity.distance_km, activity_rules
+        )
+        comment = result.comment.strip()
+        if not activity_state["meets_minimum_distance_rule"]:
+            comment = f"{comment}\n{BELOW_MINIMUM_DISTANCE_NOTE}"
+        progress = current_comment_progress()
+        if progress is not None:
+            await progress.preview(_activity_preview(activity_state))
+            await progress.partial(comment)
+        logger.info("Generated activity with comment", extra={"comment": comment})
+        return {**_activity_params_to_state(activity), "comment": comment}
+
     def save_activity_to_db_node(state: ActivityState) -> dict[str, Any]:
         created_at = _parse_created_at(state.get("created_at"))
         iid = _build_iid(state["message_id"], created_at)
-        challenge_id = resolve_challenge_id(state.get("channel_id"))
+        challenge_id = state.get("challenge_id")
+        if challenge_id is None:
+            challenge_id = resolve_challenge_id(state.get("channel_id"))
         api = get_api_manager()
         activity_create = build_activity_create_from_ai_response(
             ai_response=state,
@@ -227,8 +502,32 @@ def build_activity_state_graph() -> StateGraph[ActivityState]:
             message_timestamp=str(int(created_at.timestamp())),
             ai_comment=state.get("comment"),
         )
-        saved_activity = save_activity(activity_create)
         comment = state.get("comment", "")
+        if activity_outbox is not None:
+            # Reply as soon as the payload is durable locally; the outbox flusher
+            # delivers it to db-service in batches, keyed by the idempotent iid.
+            try:
+                activity_outbox.enqueue(activity_create)
+            except Exception:
+                logger.warning("Could not queue activity in outbox, saving synchronously", exc_info=True)
+            else:
+                history_digests.invalidate(state["author_id"])
+                logger.info(
+                    "Activity queued in outbox",
+                    extra={"saved_activity_iid": iid, "total_points": activity_create.total_points},
+                )
+                return {
+                    "comment": comment,
+                    "status": "processed",
+                    "reaction": "✅",
+                    "reply_text": comment,
+                    "saved_activity_id": None,
+                    "saved_activity_iid": iid,
+                    "total_points": activity_create.total_points,
+                }
+
+        saved_activity = save_activity(activity_create)
+        history_digests.invalidate(state["author_id"])
         logger.info(
             "Activity saved",
             extra={
@@ -247,30 +546,36 @@ def build_activity_state_graph() -> StateGraph[ActivityState]:
             "total_points": getattr(saved_activity, "total_points", activity_create.total_points),
         }
 
-    graph.add_node("process_activity_with_picture_node", process_activity_with_picture_node)
-    graph.add_node("process_activity_text_only", process_activity_text_only_node)
-    graph.add_node("get_activity_history", get_activity_history_node)
-    graph.add_node("validate_distance_rule", validate_activity_distance_rule)
-    graph.add_node("generate_comment", generate_comment_node)
-    graph.add_node("save_activity", save_activity_to_db_node)
-    
-    graph.add_conditional_edges(
-        START,
-        image_route,
-        {
-            "process_activity_with_picture_node": "process_activity_with_picture_node",
-            "process_activity_text_only_node": "process_activity_text_only",
-        },
-    )
+    graph.add_node("get_activity_history", _timed_node("get_activity_history", get_activity_history_node))
+    graph.add_node("load_activity_rules", _timed_node("load_activity_rules", load_activity_rules_node))
+    graph.add_node("validate_distance_rule", _timed_node("validate_distance_rule", validate_activity_distance_rule))
+    graph.add_node("save_activity", _timed_node("save_activity", save_activity_to_db_node))
+    graph.add_edge(START, "get_activity_history")
+    graph.add_edge(START, "load_activity_rules")
+
+    if pipeline_mode == "combined":
+        # The single call needs history and rules in its prompt, so it waits for both.
+        graph.add_node("extract_and_comment", _timed_node("extract_and_comment", extract_and_comment_node))
+        graph.add_edge(["get_activity_history", "load_activity_rules"], "extract_and_comment")
+        graph.add_edge("extract_and_comment", "validate_distance_rule")
+        comment_source = "validate_distance_rule"
+    else:
+        graph.add_node("extract_activity", _timed_node("extract_activity", extract_activity_node))
+        graph.add_node("generate_comment", _timed_node("generate_comment", generate_comment_node))
+        # History and rules do not depend on the extraction result, so they fan out
+        # from START and run while the LLM call is in flight. The list edge is a join:
+        # validation starts only once all three branches have finished.
+        graph.add_edge(START, "extract_activity")
+        graph.add_edge(
+            ["extract_activity", "get_activity_history", "load_activity_rules"],
+            "validate_distance_rule",
+        )
+        graph.add_edge("validate_distance_rule", "generate_comment")
+        comment_source = "generate_comment"
 
-    graph.add_edge("process_activity_with_picture_node", "get_activity_history")
-    graph.add_edge("process_activity_text_only", "get_activity_history")
-    graph.add_edge("get_activity_history", "validate_distance_rule")
-    graph.add_edge("validate_distance_rule", "generate_comment")
     graph.add_conditional_edges(
-       "generate_comment",
-       min_distance_rule_route,
-       
+        comment_source,
+        min_distance_rule_route,
         {
             "save_activity": "save_activity",
             "end": END,
@@ -0,0 +1,176 @@
+"""Zwiezle podsumowanie historii aktywnosci uzytkownika do promptu komentarza."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from libs.shared.schemas.activity import ActivityRead
+
+logger = logging.getLogger(__name__)
+
+NO_HISTORY = "No activity history available"
+RECENT_ROWS = 5
+TREND_WINDOW = timedelta(days=7)
+
+
+def estimate_tokens(text: str) -> int:
+    """Przyblizona liczba tokenow (~4 znaki na token), wystarczajaca do porownan w logach."""
+    return (len(text) + 3) // 4
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _km(value: float) -> str:
+    return f"{value:.1f}"
+
+
+@dataclass(slots=True)
+class _TypeTotals:
+    count: int = 0
+    distance_km: float = 0.0
+    points: int = 0
+    best_km: float = 0.0
+    best_km_date: str = ""
+
+
+def summarize_history(activities: Iterable[ActivityRead], now: datetime | None = None) -> str:
+    """Buduje tabelaryczny skrot historii: sumy per typ z rekordami, trend 7 dni i ostatnie wpisy."""
+    history = sorted(activities, key=lambda activity: _as_utc(activity.created_at))
+    if not history:
+        return NO_HISTORY
+    now = _as_utc(now or datetime.now(timezone.utc))
+
+    totals: dict[str, _TypeTotals] = {}
+    for activity in history:
+        entry = totals.setdefault(activity.activity_type, _TypeTotals())
+        entry.count += 1
+        entry.distance_km += activity.distance_km
+        entry.points += activity.total_points
+        if activity.distance_km > entry.best_km:
+            entry.best_km = activity.distance_km
+            entry.best_km_date = _as_utc(activity.created_at).date().isoformat()
+
+    def window(start: datetime, end: datetime) -> tuple[int, float]:
+        selected = [a for a in history if start <= _as_utc(a.created_at) < end]
+        return len(selected), sum(a.distance_km for a in selected)
+
+    recent_count, recent_km = window(now - TREND_WINDOW, now + timedelta(seconds=1))
+    previous_count, previous_km = window(now - 2 * TREND_WINDOW, now - TREND_WINDOW)
+    best_points = max(history, key=lambda activity: activity.total_points)
+
+    first_day = _as_utc(history[0].created_at).date().isoformat()
+    last_day = _as_utc(history[-1].created_at).date().isoformat()
+    lines = [
+        f"aktywnosci={len(history)} okres={first_day}..{last_day} "
+        f"pkt={sum(activity.total_points for activity in history)}",
+        "typ|n|km|pkt|rekord_km",
+    ]
+    for activity_type, entry in sorted(totals.items(), key=lambda item: -item[1].points):
+        lines.append(
+            f"{activity_type}|{entry.count}|{_km(entry.distance_km)}|{entry.points}|"
+            f"{_km(entry.best_km)}@{entry.best_km_date}"
+        )
+    lines.append(
+        f"trend_7d: n={recent_count} km={_km(recent_km)} (poprzednie 7d: n={previous_count} km={_km(previous_km)})"
+    )
+    lines.append(
+        f"rekord_pkt: {best_points.total_points} ({best_points.activity_type} {_km(best_points.distance_km)} km "
+        f"@{_as_utc(best_points.created_at).date().isoformat()})"
+    )
+    lines.append("ostatnie: data|typ|km|pkt")
+    for activity in reversed(history[-RECENT_ROWS:]):
+        lines.append(
+            f"{_as_utc(activity.created_at).date().isoformat()}|{activity.activity_type}|"
+            f"{_km(activity.distance_km)}|{activity.total_points}"
+        )
+    return "\n".join(lines)
+
+
+class HistoryDigestCache:
+    """Skroty historii per uzytkownik, wazne do jego nastepnego zapisu aktywnosci.
+
+    `generation` rosnie przy kazdym `invalidate`, wiec skrot policzony z historii
+    pobranej przed zapisem nie nadpisze uniewaznienia. TTL zabezpiecza przed
+    zmianami spoza bota (np. edycja w panelu).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0) -> None:
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "HistoryDigestCache":
+        return cls(
+            max_entries=int(os.getenv("AI_HISTORY_DIGEST_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("AI_HISTORY_DIGEST_TTL_SECONDS", "600")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, discord_id: str) -> str | None:
+        with self._lock:
+            cached = self._entries.get(discord_id)
+            if cached is None or time.monotonic() - cached[1] > self._ttl_seconds:
+                self._entries.pop(discord_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(discord_id)
+            self.hits += 1
+            return cached[0]
+
+    def generation(self, discord_id: str) -> int:
+        with self._lock:
+            return self._generations.get(discord_id, 0)
+
+    def build(self, discord_id: str, activities: list[ActivityRead], generation: int) -> str:
+        """Liczy skrot i zapamietuje wynik; przy logowaniu DEBUG loguje tez oszczednosc tokenow wzgledem JSON-a."""
+        digest = summarize_history(activities)
+        if activities and logger.isEnabledFor(logging.DEBUG):
+            # Serializacja tylko do porownania w logach, wiec nie przy kazdym chybieniu cache.
+            json_chars = sum(len(activity.model_dump_json()) for activity in activities)
+            logger.debug(
+                "History digest built",
+                extra={
+                    "discord_id": discord_id,
+                    "activities": len(activities),
+                    "history_tokens_json": (json_chars + 3) // 4,
+                    "history_tokens_digest": estimate_tokens(digest),
+                },
+            )
+        with self._lock:
+            if self._generations.get(discord_id, 0) == generation:
+                self._entries[discord_id] = (digest, time.monotonic())
+                self._entries.move_to_end(discord_id)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return digest
+
+    def invalidate(self, discord_id: str) -> None:
+        with self._lock:
+            self._entries.pop(discord_id, None)
+            self._generations[discord_id] = self._generations.get(discord_id, 0) + 1
+
+
+_history_digest_cache: HistoryDigestCache | None = None
+
+
+def get_history_digest_cache() -> HistoryDigestCache:
+    global _history_digest_cache
+    if _history_digest_cache is None:
+        _history_digest_cache = HistoryDigestCache.from_env()
+    return _history_digest_cache
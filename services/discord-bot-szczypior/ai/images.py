@@ -0,0 +1,166 @@
+"""Lokalne przygotowanie zalacznikow graficznych przed ekstrakcja vision."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+import aiohttp
+from PIL import Image, ImageStat
+
+logger = logging.getLogger(__name__)
+
+
+IMAGE_MAX_SIDE = int(os.getenv("AI_IMAGE_MAX_SIDE", "1536"))
+IMAGE_JPEG_QUALITY = int(os.getenv("AI_IMAGE_JPEG_QUALITY", "85"))
+IMAGE_MAX_DOWNLOAD_BYTES = int(os.getenv("AI_IMAGE_MAX_DOWNLOAD_BYTES", str(20 * 1024 * 1024)))
+IMAGE_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("AI_IMAGE_DOWNLOAD_TIMEOUT_SECONDS", "10"))
+IMAGE_WORKERS = int(os.getenv("AI_IMAGE_WORKERS", "2"))
+
+
+@dataclass(slots=True, frozen=True)
+class PreparedImage:
+    """Obraz po przeskalowaniu i rekompresji, gotowy do wyslania inline."""
+
+    data_url: str
+    digest: str
+    input_bytes: int
+    output_bytes: int
+    width: int
+    height: int
+
+
+def _flatten_with_best_background(image: Image.Image) -> Image.Image:
+    # Same heuristic as the legacy GeminiClient: pick the backdrop with higher contrast.
+    if image.mode == "LA":
+        image = image.convert("RGBA")
+    alpha = image.split()[-1]
+    rgb = image.convert("RGB")
+
+    white_bg = Image.new("RGB", image.size, (255, 255, 255))
+    white_bg.paste(rgb, mask=alpha)
+    black_bg = Image.new("RGB", image.size, (0, 0, 0))
+    black_bg.paste(rgb, mask=alpha)
+
+    white_std = ImageStat.Stat(white_bg.convert("L")).stddev[0]
+    black_std = ImageStat.Stat(black_bg.convert("L")).stddev[0]
+    return black_bg if black_std > white_std else white_bg
+
+
+def preprocess_image_bytes(raw: bytes, max_side: int = IMAGE_MAX_SIDE, quality: int = IMAGE_JPEG_QUALITY) -> tuple[bytes, int, int]:
+    """Skaluje, splaszcza kanal alfa i koduje jako JPEG.
+
+    Funkcja modulowa (picklowalna), bo wykonuje sie w ProcessPoolExecutor.
+    Zwraca (jpeg_bytes, width, height).
+    """
+    image = Image.open(BytesIO(raw))
+    image.load()
+
+    if image.width > max_side or image.height > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    if image.mode == "P":
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA"):
+        image = _flatten_with_best_background(image)
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue(), image.width, image.height
+
+
+_http_session: aiohttp.ClientSession | None = None
+_executor: Executor | None = None
+
+
+def _get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=IMAGE_DOWNLOAD_TIMEOUT_SECONDS),
+            connector=aiohttp.TCPConnector(limit=8, ttl_dns_cache=300),
+        )
+    return _http_session
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+    if _executor is None and IMAGE_WORKERS > 0:
+        try:
+            _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        except (OSError, NotImplementedError):
+            logger.warning("Could not start image process pool, using threads", exc_info=True)
+    return _executor
+
+
+async def download_image(url: str) -> bytes:
+    """Pobiera zalacznik przez wspoldzielona pule polaczen z limitem rozmiaru."""
+    session = _get_http_session()
+    async with session.get(url) as response:
+        response.raise_for_status()
+        if (response.content_length or 0) > IMAGE_MAX_DOWNLOAD_BYTES:
+            raise ValueError(f"Image too large: {response.content_length} bytes")
+        data = bytearray()
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            data.extend(chunk)
+            if len(data) > IMAGE_MAX_DOWNLOAD_BYTES:
+                raise ValueError(f"Image too large: over {IMAGE_MAX_DOWNLOAD_BYTES} bytes")
+        return bytes(data)
+
+
+async def prepare_image(url: str) -> PreparedImage | None:
+    """Pobiera i kompresuje obraz; None oznacza powrot do przekazania samego URL."""
+    try:
+        raw = await download_image(url)
+    except Exception:
+        logger.warning("Could not download image attachment", exc_info=True, extra={"image_url": url})
+        return None
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        if executor is not None:
+            output, width, height = await loop.run_in_executor(executor, preprocess_image_bytes, raw)
+        else:
+            output, width, height = await asyncio.to_thread(preprocess_image_bytes, raw)
+    except Exception:
+        logger.warning("Could not preprocess image attachment", exc_info=True, extra={"image_url": url})
+        return None
+
+    prepared = PreparedImage(
+        data_url="data:image/jpeg;base64," + base64.b64encode(output).decode("ascii"),
+        digest=hashlib.sha256(raw).hexdigest(),
+        input_bytes=len(raw),
+        output_bytes=len(output),
+        width=width,
+        height=height,
+    )
+    logger.info(
+        "Image prepared for vision extraction",
+        extra={
+            "input_bytes": prepared.input_bytes,
+            "output_bytes": prepared.output_bytes,
+            "width": prepared.width,
+            "height": prepared.height,
+        },
+    )
+    return prepared
+
+
+async def close_image_resources() -> None:
+    """Zamyka sesje HTTP i pule procesow przy wylaczaniu bota."""
+    global _http_session, _executor
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
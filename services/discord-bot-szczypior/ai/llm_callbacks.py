@@ -0,0 +1,54 @@
+"""Adaptery LangChain dla wspoldzielonego limitera (importowane dopiero przy budowie modelu)."""
+
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from ai.rate_limiter import AsyncModelRateLimiter
+
+
+class ModelRateLimiterBinding(BaseRateLimiter):
+    """Adapter podpinany jako `rate_limiter=` modelu LangChain dla jednej nazwy modelu."""
+
+    def __init__(self, limiter: AsyncModelRateLimiter, model: str) -> None:
+        self._limiter = limiter
+        self._model = model
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        # All chains run through ainvoke; the sync path is never rate limited.
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        await self._limiter.acquire(self._model)
+        return True
+
+
+class RateLimitHeadersCallback(BaseCallbackHandler):
+    """Przekazuje naglowki limitow i zuzycie tokenow z odpowiedzi do limitera.
+
+    Limiter nie ma lockow i zyje w petli asyncio, wiec handler musi dzialac
+    inline (w petli), a nie w watku executora jak domyslny handler sync.
+    """
+
+    run_inline = True
+
+    def __init__(self, limiter: AsyncModelRateLimiter, model: str) -> None:
+        self._limiter = limiter
+        self._model = model
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is None:
+                    continue
+                headers = (message.response_metadata or {}).get("headers")
+                if isinstance(headers, Mapping):
+                    self._limiter.update_from_headers(self._model, headers)
+                usage = getattr(message, "usage_metadata", None) or {}
+                if usage.get("total_tokens"):
+                    self._limiter.record_usage(self._model, int(usage["total_tokens"]))
@@ -1,19 +1,48 @@
-from langchain_openai import ChatOpenAI
-from langchain_openrouter import ChatOpenRouter
-from langchain_google_genai import ChatGoogleGenerativeAI
+from __future__ import annotations
 
+from typing import TYPE_CHECKING, Any
 
+from ai.rate_limiter import get_llm_rate_limiter
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_openai import ChatOpenAI
+
+
+# Provider SDKs (openai, google-genai, grpc) and langchain_core are heavy; they
+# are imported on the first request for a model instead of at bot startup.
+def _openai_model(model: str, **kwargs: Any) -> ChatOpenAI:
+    from langchain_openai import ChatOpenAI
+
+    # stream_usage keeps token usage (for the TPM limiter) on streamed comment calls.
+    return ChatOpenAI(model=model, include_response_headers=True, stream_usage=True, **kwargs)
+
+
+def _google_model(model: str, **kwargs: Any) -> ChatGoogleGenerativeAI:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model=model, **kwargs)
 
 
 def get_chat_model(model_name: str, temperature: float | None = None) -> ChatOpenAI | ChatGoogleGenerativeAI:
+    from ai.llm_callbacks import ModelRateLimiterBinding, RateLimitHeadersCallback
+
+    # Every model instance shares one limiter keyed by model_name, so all chains
+    # (extraction, comments, fallbacks) draw from the same RPM/TPM budget.
+    limiter = get_llm_rate_limiter()
+    options = {
+        "temperature": temperature if temperature is not None else 0.2,
+        "rate_limiter": ModelRateLimiterBinding(limiter, model_name),
+        "callbacks": [RateLimitHeadersCallback(limiter, model_name)],
+    }
     if model_name == "gpt-4o-mini":
-        model = ChatOpenAI(model="gpt-4o-mini", temperature=temperature if temperature is not None else 0.2)
+        model = _openai_model("gpt-4o-mini", **options)
     elif model_name == "gpt-3.5-turbo":
-        model = ChatOpenAI(model="gpt-3.5-turbo", temperature=temperature if temperature is not None else 0.2)
+        model = _openai_model("gpt-3.5-turbo", **options)
     elif model_name == "gemini-3.1-flash-lite":
-        model = ChatGoogleGenerativeAI(model="models/gemini-3.1-flash-lite-preview", temperature=temperature if temperature is not None else 0.2)
+        model = _google_model("models/gemini-3.1-flash-lite-preview", **options)
     elif model_name == "gemini-1.5-pro":
-        model = ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=temperature if temperature is not None else 0.2  )
+        model = _google_model("gemini-1.5-pro", **options)
     else:
         raise ValueError(f"Unsupported model: {model_name}")
 
@@ -0,0 +1,42 @@
+"""Postep generowania odpowiedzi przekazywany z grafu AI do warstwy transportowej."""
+
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Protocol
+
+
+class CommentProgress(Protocol):
+    """Odbiorca czesciowych wynikow; implementuje go bot (np. edytowana odpowiedz Discord).
+
+    Metody nie powinny rzucac wyjatkow ani blokowac - graf wola je w trakcie
+    strumieniowania komentarza z modelu.
+    """
+
+    async def preview(self, summary: str) -> None:
+        """Podsumowanie aktywnosci znane zaraz po ekstrakcji i naliczeniu punktow."""
+        ...
+
+    async def partial(self, comment: str) -> None:
+        """Dotychczas wygenerowany tekst komentarza (narastajaco, nie przyrost)."""
+        ...
+
+
+_current_progress: contextvars.ContextVar[CommentProgress | None] = contextvars.ContextVar(
+    "ai_comment_progress", default=None
+)
+
+
+@contextmanager
+def comment_progress(progress: CommentProgress | None) -> Iterator[None]:
+    """Ustawia odbiorce postepu dla wezlow grafu w biezacym kontekscie asyncio."""
+    token = _current_progress.set(progress)
+    try:
+        yield
+    finally:
+        _current_progress.reset(token)
+
+
+def current_comment_progress() -> CommentProgress | None:
+    return _current_progress.get()
@@ -1,6 +1,6 @@
 """Szablony promptow i helpery prompt engineering."""
 
-from typing import List, Tuple
+from typing import Any, List, Tuple
 
 from langchain_core.prompts import ChatPromptTemplate
 
@@ -282,6 +282,58 @@ ACTIVITY_COMMENT_HUMAN_PROMPT = (
     "jeżeli {meets_minimum_distance_rule} True to :Wygeneruj krótki komentarz motywacyjny zgodnie z wybranym stylem i zasadami systemowymi."
 )
 
+ACTIVITY_WITH_COMMENT_SYSTEM_PROMPT = (
+    "Wykonujesz dwa zadania w jednej odpowiedzi: odczytujesz parametry aktywnosci fizycznej z wiadomosci "
+    "uzytkownika (i obrazu, jesli jest) oraz piszesz do niej komentarz. Zwracasz jeden obiekt zgodny ze schematem.\n\n"
+
+    "ZADANIE 1 - EKSTRAKCJA (pola activity_type, distance_km, weight_kg, elevation_m, time_minutes, pace, heart_rate_avg, calories):\n"
+    "- activity_type tylko jedna z wartosci: bieganie_teren, bieganie_bieznia, plywanie, rower, spacer, cardio.\n"
+    "- Mapowanie: bieg/run/trail -> bieganie_teren; bieznia/treadmill -> bieganie_bieznia; plywanie/basen/swim -> plywanie; "
+    "rower/bike/cycling -> rower; spacer/walking/hiking/marsz -> spacer; silownia/gym/fitness/pilka/crossfit/ASG -> cardio.\n"
+    "- Tekst wiadomosci ma priorytet nad obrazem; z obrazu uzupelniaj tylko wiarygodnie widoczne wartosci.\n"
+    "- distance_km w km jako float (> 0), przecinek dziesietny zamien na kropke, metry i mile przelicz na km.\n"
+    "- time_minutes laczny czas w minutach (HH:MM:SS i MM:SS przelicz i zaokraglij), pace jako string jak w danych.\n"
+    "- elevation_m w metrach jako int; weight_kg w kg, sam fakt obciazenia bez liczby to 10.0, brak obciazenia to null.\n"
+    "- Nie zgaduj brakujacych metryk - zwroc null.\n\n"
+
+    "ZADANIE 2 - KOMENTARZ (pole comment):\n"
+    "- Styl usmc_drill_sergeant: twardy, bezposredni, sarkastyczny sierzant bootcampu, mowisz do rekruta, "
+    "mozesz uzywac wulgaryzmow; roastujesz lenistwo i regres, doceniasz progres.\n"
+    "- Styl space_absurd_captain: absurdalny kapitan kosmicznej jednostki, kosmiczne porownania, przesadzony i przesmiewczy.\n"
+    "- Roastuj wynik i trening, nigdy rase, narodowosc, religie, plec, orientacje, zdrowie ani wyglad; nie groz przemoca, "
+    "nie zachecaj do ryzykownych zachowan.\n"
+    "- Oceniaj tylko na podstawie odczytanej aktywnosci i historii z kontekstu; porownaj z historia, jesli jest, "
+    "a przy ubogiej historii ocen biezace zaangazowanie.\n"
+    "- Sprawdz minimalny dystans dla typu aktywnosci z podanych regul. Jezeli aktywnosc go nie spelnia, mocno skrytykuj "
+    "uzytkownika i koniecznie napisz, ze ta aktywnosc nie jest brana pod uwage.\n"
+    "- Komentarz to zwykly tekst: 2-4 zdania, bez Markdown, list i naglowkow, maksymalnie 2-3 emoji z puli: 💀 ⚡ 🔥 💪 🎖️ 🚀 🪐. "
+    "Wskaz jeden konkretny sygnal z danych i zakoncz wezwaniem do dalszej pracy."
+)
+
+ACTIVITY_WITH_COMMENT_HUMAN_TEXT = (
+    "Wybrany styl komentarza: {comment_style}\n"
+    "Nazwa uzytkownika: {user_display_name}\n\n"
+    "Minimalne dystanse (typ: km):\n{minimum_distances}\n\n"
+    "Historia wczesniejszych aktywnosci uzytkownika:\n{historic_activities}\n\n"
+    "Wiadomosc uzytkownika:\n{user_message}"
+)
+
+ACTIVITY_WITH_COMMENT_TEXT_ONLY_PROMPT_MESSAGES = [
+    ("system", ACTIVITY_WITH_COMMENT_SYSTEM_PROMPT),
+    ("human", ACTIVITY_WITH_COMMENT_HUMAN_TEXT),
+]
+
+ACTIVITY_WITH_COMMENT_AND_PICTURE_PROMPT_MESSAGES = [
+    ("system", ACTIVITY_WITH_COMMENT_SYSTEM_PROMPT),
+    (
+        "human",
+        [
+            {"type": "text", "text": ACTIVITY_WITH_COMMENT_HUMAN_TEXT},
+            {"type": "image_url", "image_url": {"url": "{picture_url}"}},
+        ],
+    ),
+]
+
 def get_message_and_picture_analyze_prompt_messages() -> List[Tuple[str, str]]:
     return MESAGE_AND_PICTURE_ANALIZE_PROMPT_MESSAGES
 
@@ -309,3 +361,13 @@ def get_activity_text_only_analyze_prompt_messages() -> List[Tuple[str, str]]:
 
 def build_activity_text_only_analyze_prompt() -> ChatPromptTemplate:
     return ChatPromptTemplate.from_messages(ACTIVITY_TEXT_ONLY_ANALYZE_PROMPT_MESSAGES)
+
+
+def get_activity_with_comment_prompt_messages(with_picture: bool) -> List[Tuple[str, Any]]:
+    if with_picture:
+        return ACTIVITY_WITH_COMMENT_AND_PICTURE_PROMPT_MESSAGES
+    return ACTIVITY_WITH_COMMENT_TEXT_ONLY_PROMPT_MESSAGES
+
+
+def build_activity_with_comment_prompt(with_picture: bool) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(get_activity_with_comment_prompt_messages(with_picture))
@@ -0,0 +1,317 @@
+"""Asynchroniczny token bucket RPM/TPM wspoldzielony przez wszystkie chainy LLM."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Iterator, Mapping
+
+from utils.metrics import STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Nizsza wartosc = wczesniejsza obsluga. Wspolny dla kolejki AI i limitera LLM."""
+
+    LIVE = 0
+    BACKLOG = 1
+    EDIT = 2
+
+    @classmethod
+    def parse(cls, raw: Any) -> "RequestPriority":
+        """Zamienia "live"/"backlog"/"edit" (np. AIProcessingRequest.priority) na enum; domyslnie LIVE."""
+        if isinstance(raw, cls):
+            return raw
+        try:
+            return cls[str(raw or "live").upper()]
+        except KeyError:
+            return cls.LIVE
+
+
+_current_priority: contextvars.ContextVar[RequestPriority] = contextvars.ContextVar(
+    "llm_request_priority", default=RequestPriority.LIVE
+)
+
+
+@contextmanager
+def llm_priority(priority: RequestPriority) -> Iterator[None]:
+    """Ustawia priorytet dla wszystkich wywolan LLM w biezacym kontekscie asyncio."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def _parse_model_limits(raw: str) -> dict[str, int]:
+    # Same "model:limit,model:limit" format as GOOGLE_RPM in the legacy limiter.
+    limits: dict[str, int] = {}
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if ":" not in entry:
+            continue
+        model, _, value = entry.rpartition(":")
+        try:
+            limit = int(value.strip())
+        except ValueError:
+            continue
+        if model.strip() and limit > 0:
+            limits[model.strip()] = limit
+    return limits
+
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+
+
+def _parse_reset_seconds(value: str | None) -> float | None:
+    """Parsuje czasy resetu w stylu OpenAI: '1s', '6m0s', '120ms'."""
+    if not value:
+        return None
+    total = 0.0
+    matched = False
+    for number, unit in _DURATION_PART_RE.findall(value):
+        matched = True
+        total += float(number) * {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}[unit]
+    return total if matched else None
+
+
+@dataclass(slots=True)
+class _Bucket:
+    capacity: float
+    available: float
+    refill_per_second: float
+    updated_at: float
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.available
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_second if self.refill_per_second > 0 else 60.0
+
+
+@dataclass(slots=True)
+class _ModelState:
+    requests: _Bucket | None
+    tokens: _Bucket | None
+    # (priority, sequence, enqueued_at, estimated_tokens, future)
+    waiters: list[tuple[int, int, float, float, asyncio.Future[None]]] = field(default_factory=list)
+    wakeup: asyncio.TimerHandle | None = None
+    granted: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class AsyncModelRateLimiter:
+    """Limiter RPM/TPM per model z kolejka priorytetowa oczekujacych.
+
+    Dziala wylacznie w petli asyncio (bez lockow). TPM jest rozliczany z gory
+    szacunkiem `estimated_tokens`, a po odpowiedzi korygowany faktycznym zuzyciem.
+
+    Konfiguracja:
+        LLM_RPM=gpt-4o-mini:500,gemini-3.1-flash-lite:15
+        LLM_TPM=gpt-4o-mini:200000
+    """
+
+    def __init__(
+        self,
+        rpm_map: Mapping[str, int] | None = None,
+        tpm_map: Mapping[str, int] | None = None,
+        estimated_tokens: int = 1500,
+    ) -> None:
+        self._rpm_map = dict(rpm_map or {})
+        self._tpm_map = dict(tpm_map or {})
+        self._estimated_tokens = estimated_tokens
+        self._states: dict[str, _ModelState] = {}
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "AsyncModelRateLimiter":
+        return cls(
+            rpm_map=_parse_model_limits(os.getenv("LLM_RPM", "")),
+            tpm_map=_parse_model_limits(os.getenv("LLM_TPM", "")),
+            estimated_tokens=int(os.getenv("LLM_ESTIMATED_TOKENS_PER_CALL", "1500")),
+        )
+
+    @staticmethod
+    def _bucket(limit_per_minute: int | None, now: float) -> _Bucket | None:
+        if not limit_per_minute:
+            return None
+        return _Bucket(
+            capacity=float(limit_per_minute),
+            available=float(limit_per_minute),
+            refill_per_second=limit_per_minute / 60.0,
+            updated_at=now,
+        )
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._states.get(model)
+        if state is None:
+            now = time.monotonic()
+            state = _ModelState(
+                requests=self._bucket(self._rpm_map.get(model), now),
+                tokens=self._bucket(self._tpm_map.get(model), now),
+            )
+            self._states[model] = state
+        return state
+
+    async def acquire(
+        self,
+        model: str,
+        priority: RequestPriority | None = None,
+        estimated_tokens: int | None = None,
+    ) -> None:
+        """Czeka na wolny slot RPM i budzet TPM; wyzszy priorytet obslugiwany jest pierwszy."""
+        state = self._state(model)
+        if state.requests is None and state.tokens is None:
+            state.granted += 1
+            return
+
+        resolved_priority = _current_priority.get() if priority is None else priority
+        cost = float(self._estimated_tokens if estimated_tokens is None else estimated_tokens)
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            state.waiters,
+            (int(resolved_priority), next(self._sequence), time.monotonic(), cost, future),
+        )
+        self._dispatch(model)
+        await future
+
+    def _dispatch(self, model: str) -> None:
+        state = self._states[model]
+        if state.wakeup is not None:
+            state.wakeup.cancel()
+            state.wakeup = None
+
+        now = time.monotonic()
+        while state.waiters:
+            _, _, enqueued_at, cost, future = state.waiters[0]
+            if future.done():
+                heapq.heappop(state.waiters)
+                continue
+
+            wait = 0.0
+            for bucket, amount in ((state.requests, 1.0), (state.tokens, cost)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.seconds_until(amount))
+            if wait > 0:
+                state.wakeup = asyncio.get_running_loop().call_later(wait, self._dispatch, model)
+                return
+
+            heapq.heappop(state.waiters)
+            if state.requests is not None:
+                state.requests.available -= 1.0
+            if state.tokens is not None:
+                state.tokens.available -= cost
+            waited = now - enqueued_at
+            state.granted += 1
+            state.total_wait_seconds += waited
+            state.max_wait_seconds = max(state.max_wait_seconds, waited)
+            STAGE_DURATION.observe(waited, stage="llm_rate_limit_wait")
+            if waited >= 1.0:
+                logger.info(
+                    "LLM call delayed by rate limiter",
+                    extra={"model": model, "wait_seconds": round(waited, 2), "queue_depth": len(state.waiters)},
+                )
+            future.set_result(None)
+
+    def record_usage(self, model: str, total_tokens: int) -> None:
+        """Koryguje budzet TPM o roznice miedzy faktycznym zuzyciem a szacunkiem."""
+        state = self._states.get(model)
+        if state is None or state.tokens is None:
+            return
+        state.tokens.available -= total_tokens - self._estimated_tokens
+        self._reschedule_waiters(model)
+
+    def update_from_headers(self, model: str, headers: Mapping[str, Any]) -> None:
+        """Synchronizuje kubelki z naglowkami x-ratelimit-* zwroconymi przez dostawce."""
+        normalized = {str(key).lower(): value for key, value in headers.items()}
+        state = self._state(model)
+        now = time.monotonic()
+        for kind in ("requests", "tokens"):
+            limit = normalized.get(f"x-ratelimit-limit-{kind}")
+            remaining = normalized.get(f"x-ratelimit-remaining-{kind}")
+            if limit is None or remaining is None:
+                continue
+            try:
+                limit_value = float(limit)
+                remaining_value = float(remaining)
+            except (TypeError, ValueError):
+                continue
+
+            reset_seconds = _parse_reset_seconds(normalized.get(f"x-ratelimit-reset-{kind}"))
+            bucket = getattr(state, kind)
+            if bucket is None:
+                bucket = self._bucket(int(limit_value), now)
+                setattr(state, kind, bucket)
+            bucket.refill(now)
+            bucket.capacity = limit_value
+            bucket.available = min(bucket.available, remaining_value)
+            if reset_seconds:
+                # Provider tells us when the window is full again; refill at that pace.
+                bucket.refill_per_second = max(limit_value - remaining_value, 1.0) / reset_seconds
+        self._reschedule_waiters(model)
+
+    def _reschedule_waiters(self, model: str) -> None:
+        # The pending wakeup was timed against the old bucket state; recompute it
+        # so waiters are released (or held back) according to the new budget.
+        state = self._states.get(model)
+        if state is None or not state.waiters:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._dispatch(model)
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Glebokosc kolejki, dostepny budzet i czasy oczekiwania per model."""
+        stats: dict[str, dict[str, Any]] = {}
+        now = time.monotonic()
+        for model, state in self._states.items():
+            pending = [waiter for waiter in state.waiters if not waiter[4].done()]
+            by_priority: dict[str, int] = {}
+            for priority, *_ in pending:
+                name = RequestPriority(priority).name.lower()
+                by_priority[name] = by_priority.get(name, 0) + 1
+            for bucket in (state.requests, state.tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+            stats[model] = {
+                "queue_depth": len(pending),
+                "queue_depth_by_priority": by_priority,
+                "rpm_limit": state.requests.capacity if state.requests else None,
+                "requests_available": round(state.requests.available, 2) if state.requests else None,
+                "tpm_limit": state.tokens.capacity if state.tokens else None,
+                "tokens_available": round(state.tokens.available) if state.tokens else None,
+                "granted": state.granted,
+                "avg_wait_seconds": round(state.total_wait_seconds / state.granted, 3) if state.granted else 0.0,
+                "max_wait_seconds": round(state.max_wait_seconds, 3),
+            }
+        return stats
+
+
+_shared_limiter: AsyncModelRateLimiter | None = None
+
+
+def get_llm_rate_limiter() -> AsyncModelRateLimiter:
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = AsyncModelRateLimiter.from_env()
+    return _shared_limiter
@@ -1,11 +1,33 @@
 """Schematy danych wejsciowych i wyjsciowych."""
 
-from typing import NotRequired, TypedDict
+from typing import Any, NotRequired, TypedDict
+
+from pydantic import BaseModel, Field
 
 from libs.shared.schemas.activity import ActivityRead
+from libs.shared.scoring import CompiledPointsRules
+
+
+
+
+class ActivityParams(BaseModel):
+    activity_type: str
+    distance_km: float = Field(gt=0)
+    weight_kg: float | None = None
+    elevation_m: int | None = None
+    time_minutes: int | None = None
+    pace: str | None = None
+    heart_rate_avg: int | None = None
+    calories: int | None = None
+
 
+class ActivityWithComment(ActivityParams):
+    """Wynik trybu jednego wywolania: parametry aktywnosci i komentarz z jednej odpowiedzi modelu."""
 
+    comment: str = Field(min_length=1)
 
+    def activity(self) -> ActivityParams:
+        return ActivityParams.model_validate(self.model_dump(exclude={"comment"}))
 
 
 class ActivityState(TypedDict):
@@ -23,8 +45,13 @@ class ActivityState(TypedDict):
     channel_id: str
     content: str
     image_url: NotRequired[str | None]
+    image_urls: NotRequired[list[str]]
     created_at: NotRequired[str | None]
     comment: NotRequired[str]
     historic_activities: NotRequired[list[ActivityRead]]
+    history_digest: NotRequired[str]
     meets_minimum_distance_rule: NotRequired[bool]
+    challenge_id: NotRequired[int | None]
+    activity_rules: NotRequired[dict[str, Any]]
+    points_rules: NotRequired[CompiledPointsRules]
     
\ No newline at end of file
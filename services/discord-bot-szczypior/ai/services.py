@@ -3,8 +3,12 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any
 
+from ai.progress import CommentProgress, comment_progress
+from ai.rate_limiter import RequestPriority, llm_priority
+
 logger = logging.getLogger(__name__)
 
 _activity_graph = None
@@ -31,6 +35,7 @@ def _request_to_graph_state(request: Any) -> dict[str, Any]:
 			"channel_id": request.get("channel_id"),
 			"content": request.get("content") or "",
 			"image_url": image_urls[0] if image_urls else None,
+			"image_urls": list(image_urls),
 			"created_at": request.get("created_at"),
 		}
 
@@ -42,19 +47,43 @@ def _request_to_graph_state(request: Any) -> dict[str, Any]:
 		"channel_id": getattr(request, "channel_id", None),
 		"content": getattr(request, "content", "") or "",
 		"image_url": image_urls[0] if image_urls else None,
+		"image_urls": list(image_urls),
 		"created_at": getattr(request, "created_at", None),
 	}
 
 
+def _request_priority(request: Any) -> RequestPriority:
+	raw = request.get("priority") if isinstance(request, dict) else getattr(request, "priority", None)
+	return RequestPriority.parse(raw)
+
+
+def _request_progress(request: Any) -> CommentProgress | None:
+	return request.get("progress") if isinstance(request, dict) else getattr(request, "progress", None)
+
+
 async def invoke_message_analysis(request: Any) -> dict[str, Any]:
-	"""Runs the activity graph for a Discord message payload."""
+	"""Runs the activity graph for a Discord message payload.
+
+	When the request carries a `progress` sink, the comment is streamed to it
+	(activity preview first, then the growing comment text) while the graph runs.
+	"""
 	graph = _get_activity_graph()
 	state = _request_to_graph_state(request)
 
-	if hasattr(graph, "ainvoke"):
-		result = await graph.ainvoke(state)
-	else:
-		result = graph.invoke(state)
+	started = time.perf_counter()
+	# Backlog (startup sync) LLM calls queue behind live messages in the shared limiter.
+	with llm_priority(_request_priority(request)), comment_progress(_request_progress(request)):
+		if hasattr(graph, "ainvoke"):
+			result = await graph.ainvoke(state)
+		else:
+			result = graph.invoke(state)
+	logger.info(
+		"Activity graph finished",
+		extra={
+			"message_id": state.get("message_id"),
+			"duration_ms": round((time.perf_counter() - started) * 1000, 1),
+		},
+	)
 
 	if not isinstance(result, dict):
 		return {"status": "processed"}
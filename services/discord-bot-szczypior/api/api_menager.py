@@ -7,7 +7,9 @@ import os
 from typing import Any
 from urllib import error, parse, request
 
+from libs.shared.cache import ACTIVITY_RULES, CHALLENGES, RANKINGS, get_shared_cache
 from libs.shared.schemas.activity import (
+    ActivityBatchItemRead,
     ActivityCreate,
     ActivityRead,
     ActivityUpdate,
@@ -16,6 +18,19 @@ from libs.shared.schemas.activity import (
 from libs.shared.schemas.activity_rule import ActivityRuleRead
 from libs.shared.schemas.challenge import ChallengeRead
 from libs.shared.schemas.event import AirsoftEventRead
+from utils.resilience import (
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    get_circuit_breaker,
+    retry_sync,
+)
+
+_RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+# One budget for the whole process: all APIManager instances hit the same db-service.
+_db_retry_budget = RetryBudget(ratio=float(os.getenv("DB_SERVICE_RETRY_BUDGET_RATIO", "0.2")))
 
 
 class APIManagerError(Exception):
@@ -52,6 +67,17 @@ class APIManager:
                 "Brak DB_SERVICE_API_KEY. Ustaw API key, aby autoryzowac wywolania do db-service."
             )
 
+        self.retry_policy = RetryPolicy(
+            max_attempts=int(os.getenv("DB_SERVICE_RETRY_ATTEMPTS", "3")),
+            base_delay_seconds=float(os.getenv("DB_SERVICE_RETRY_BASE_DELAY_SECONDS", "0.25")),
+            max_delay_seconds=float(os.getenv("DB_SERVICE_RETRY_MAX_DELAY_SECONDS", "4")),
+        )
+        self.breaker = get_circuit_breaker(
+            "db-service",
+            failure_threshold=int(os.getenv("DB_SERVICE_BREAKER_FAILURE_THRESHOLD", "5")),
+            recovery_timeout_seconds=float(os.getenv("DB_SERVICE_BREAKER_COOLDOWN_SECONDS", "30")),
+        )
+
     def __enter__(self) -> "APIManager":
         return self
 
@@ -68,6 +94,13 @@ class APIManager:
     def close(self) -> None:
         return None
 
+    @staticmethod
+    def _is_service_failure(exc: Exception) -> bool:
+        # 4xx means db-service is up and answered; only outages trip the breaker.
+        if isinstance(exc, APIManagerHTTPError):
+            return exc.status_code >= 500
+        return isinstance(exc, APIManagerError)
+
     def _request(
         self,
         method: str,
@@ -79,7 +112,39 @@ class APIManager:
         base_url = f"{self.api_base_url}/{path.lstrip('/')}"
         query = parse.urlencode(params or {}, doseq=True)
         url = f"{base_url}?{query}" if query else base_url
+        idempotent = method.upper() in _IDEMPOTENT_METHODS
+
+        def is_retryable(exc: Exception) -> bool:
+            # POST is not retried: a timeout may still have created the activity.
+            if not idempotent:
+                return False
+            if isinstance(exc, APIManagerHTTPError):
+                return exc.status_code in _RETRYABLE_STATUS_CODES
+            return isinstance(exc, APIManagerError)
 
+        try:
+            return retry_sync(
+                lambda: self._send(method, url, json_payload),
+                operation=f"db-service {method.upper()} {path}",
+                policy=self.retry_policy,
+                breaker=self.breaker,
+                budget=_db_retry_budget,
+                retry_if=is_retryable,
+                is_failure=self._is_service_failure,
+            )
+        except CircuitOpenError as exc:
+            raise APIManagerError(f"db-service niedostepny ({url}): {exc}") from exc
+
+    def _cached_get(self, namespace: str, path: str, params: dict[str, Any] | None = None) -> Any:
+        """GET przez wspolny cache (libs.shared.cache); db-service i dashboard uniewazniaja namespace przy zapisie."""
+        query = parse.urlencode(params or {}, doseq=True)
+        return get_shared_cache().get_or_load(
+            namespace,
+            f"api:{path}?{query}",
+            lambda: self._request("GET", path, params=params),
+        )
+
+    def _send(self, method: str, url: str, json_payload: dict[str, Any] | None) -> Any:
         try:
             body = None
             headers = {self.api_key_header_name: self.api_key}
@@ -127,6 +192,15 @@ class APIManager:
         )
         return ActivityRead.model_validate(response_data)
 
+    def save_activities_batch(self, payloads: list[ActivityCreate]) -> list[ActivityBatchItemRead]:
+        """Zapisuje paczke aktywnosci; istniejace iid wracaja jako `duplicate`."""
+        response_data = self._request(
+            "POST",
+            "/activities/batch",
+            json_payload={"activities": [payload.model_dump(mode="json") for payload in payloads]},
+        )
+        return [ActivityBatchItemRead.model_validate(item) for item in (response_data or [])]
+
     def get_user_activities(self, discord_id: str, limit: int = 20) -> list[ActivityRead]:
         """Pobiera historie aktywnosci uzytkownika po `discord_id`."""
         response_data = self._request(
@@ -171,22 +245,22 @@ class APIManager:
 
     def get_rankings(self, limit: int = 10) -> list[UserRankingRead]:
         """Pobiera ranking uzytkownikow wedlug punktow."""
-        response_data = self._request("GET", "/rankings", params={"limit": limit})
+        response_data = self._cached_get(RANKINGS, "/rankings", params={"limit": limit})
         return [UserRankingRead.model_validate(item) for item in (response_data or [])]
 
     def get_active_challenges(self) -> list[ChallengeRead]:
         """Pobiera liste aktualnie aktywnych challenge'y."""
-        response_data = self._request("GET", "/challenges/active")
+        response_data = self._cached_get(CHALLENGES, "/challenges/active")
         return [ChallengeRead.model_validate(item) for item in (response_data or [])]
 
     def get_challenge(self, challenge_id: int) -> ChallengeRead:
         """Pobiera challenge po identyfikatorze."""
-        response_data = self._request("GET", f"/challenges/{challenge_id}")
+        response_data = self._cached_get(CHALLENGES, f"/challenges/{challenge_id}")
         return ChallengeRead.model_validate(response_data)
 
     def get_activity_rules(self, challenge_id: int) -> list[ActivityRuleRead]:
         """Pobiera reguly aktywnosci dla danego challenge'u."""
-        response_data = self._request("GET", f"/challenges/{challenge_id}/activity-rules")
+        response_data = self._cached_get(ACTIVITY_RULES, f"/challenges/{challenge_id}/activity-rules")
         return [ActivityRuleRead.model_validate(item) for item in (response_data or [])]
 
 
@@ -0,0 +1,336 @@
+"""Trwaly lokalny outbox zapisow aktywnosci do db-service (SQLite WAL)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+
+from libs.shared.schemas.activity import ActivityCreate
+from utils.resilience import RetryPolicy
+
+from .api_menager import APIManager, APIManagerError, APIManagerHTTPError
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_OUTBOX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "activity_outbox.sqlite3"
+)
+# Batch endpoint missing (older db-service) or a payload in the batch rejected.
+_BATCH_FALLBACK_STATUS_CODES = frozenset({404, 405, 422})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity_outbox (
+    iid TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class ActivityOutbox:
+    """Write-behind dla `ActivityCreate`.
+
+    `enqueue` zapisuje payload lokalnie (commit w WAL) i od razu wraca, wiec
+    odpowiedz na Discordzie nie czeka na db-service. Flusher w tle wysyla
+    zaleglosci paczkami na /activities/batch; iid jest kluczem idempotencji,
+    wiec ponowienie paczki po timeoucie nie tworzy duplikatow.
+
+    Bledy transportowe (timeout, 5xx, 429, otwarty breaker) sa ponawiane bez
+    limitu; po `alert_after_attempts` probach kazda kolejna nieudana proba
+    loguje blad. Status 'failed' dostaja tylko wpisy odrzucone przez db-service
+    (4xx); `requeue_failed` przywraca je do kolejki po poprawce.
+    """
+
+    def __init__(
+        self,
+        sqlite_path: str,
+        batch_size: int = 50,
+        flush_interval_seconds: float = 5.0,
+        linger_seconds: float = 0.2,
+        alert_after_attempts: int = 20,
+        api_manager_factory: Callable[[], Any] = APIManager,
+    ) -> None:
+        directory = os.path.dirname(sqlite_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(sqlite_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs the WAL on every commit: a queued activity survives a crash.
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(_SCHEMA)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS activity_outbox_due ON activity_outbox (status, next_attempt_at)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+        self._batch_size = max(1, batch_size)
+        self._flush_interval_seconds = flush_interval_seconds
+        self._linger_seconds = linger_seconds
+        self._alert_after_attempts = max(1, alert_after_attempts)
+        self._api_manager_factory = api_manager_factory
+        self._api_manager: Any = None
+        self._retry_policy = RetryPolicy(base_delay_seconds=1.0, max_delay_seconds=300.0)
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+        self.flushed = 0
+        self.batches = 0
+        self.last_error: str | None = None
+
+    @classmethod
+    def from_env(cls) -> "ActivityOutbox":
+        return cls(
+            sqlite_path=os.getenv("BOT_OUTBOX_PATH") or _DEFAULT_OUTBOX_PATH,
+            batch_size=int(os.getenv("BOT_OUTBOX_BATCH_SIZE", "50")),
+            flush_interval_seconds=float(os.getenv("BOT_OUTBOX_FLUSH_INTERVAL_SECONDS", "5")),
+            linger_seconds=float(os.getenv("BOT_OUTBOX_LINGER_SECONDS", "0.2")),
+            alert_after_attempts=int(os.getenv("BOT_OUTBOX_ALERT_AFTER_ATTEMPTS", "20")),
+        )
+
+    def enqueue(self, payload: ActivityCreate) -> None:
+        """Trwale zapisuje payload; bezpieczne z watku roboczego."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO activity_outbox (iid, payload, created_at) VALUES (?, ?, ?)",
+                (payload.iid, payload.model_dump_json(), time.time()),
+            )
+            self._connection.commit()
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def contains(self, iid: str) -> bool:
+        with self._lock:
+            # Only rows still waiting to be sent; a rejected ('failed') row is not a saved activity.
+            row = self._connection.execute(
+                "SELECT 1 FROM activity_outbox WHERE iid = ? AND status = 'pending'", (iid,)
+            ).fetchone()
+        return row is not None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        # Rows left over from a previous run are due immediately.
+        self._wake.set()
+        self._task = asyncio.create_task(self._run(), name="activity-outbox")
+        logger.info("Activity outbox started", extra=self.get_stats())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush_once()
+        except Exception:
+            logger.warning("Final outbox flush failed", exc_info=True)
+        self._loop = None
+        self._wake = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    async def _run(self) -> None:
+        assert self._wake is not None
+        while True:
+            try:
+                # asyncio.timeout rather than wait_for: wait_for can swallow a
+                # cancel that races with an already-set event, hanging stop().
+                async with asyncio.timeout(self._flush_interval_seconds):
+                    await self._wake.wait()
+                # Let a burst of saves accumulate so it goes out as one batch.
+                await asyncio.sleep(self._linger_seconds)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                while await self.flush_once() >= self._batch_size:
+                    pass
+            except Exception:
+                logger.error("Activity outbox flush failed", exc_info=True)
+
+    async def flush_once(self) -> int:
+        """Wysyla jedna paczke zaleglych wpisow; zwraca liczbe obsluzonych wierszy."""
+        rows = self._due_rows()
+        if not rows:
+            return 0
+        payloads = [ActivityCreate.model_validate_json(payload) for _, payload, _ in rows]
+        started = time.perf_counter()
+        try:
+            done, rejected = await asyncio.to_thread(self._send, payloads)
+        except APIManagerError as exc:
+            self.last_error = str(exc)
+            self._reschedule(rows, str(exc))
+            logger.warning(
+                "Activity outbox batch failed, will retry",
+                extra={"batch_size": len(rows), "error": str(exc), "pending": self._count("pending")},
+            )
+            return 0
+
+        self._complete(done, rejected)
+        self.flushed += len(done)
+        self.batches += 1
+        self.last_error = None
+        logger.info(
+            "Activity outbox batch flushed",
+            extra={
+                "batch_size": len(rows),
+                "saved": len(done),
+                "rejected": len(rejected),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            },
+        )
+        return len(rows)
+
+    def _get_api_manager(self) -> Any:
+        if self._api_manager is None:
+            self._api_manager = self._api_manager_factory()
+        return self._api_manager
+
+    def _send(self, payloads: list[ActivityCreate]) -> tuple[list[str], dict[str, str]]:
+        """Zwraca (iid zapisane lub juz istniejace, {iid: blad} odrzucone na stale)."""
+        api = self._get_api_manager()
+        try:
+            results = api.save_activities_batch(payloads)
+        except APIManagerHTTPError as exc:
+            if exc.status_code not in _BATCH_FALLBACK_STATUS_CODES:
+                raise
+        else:
+            done = [result.iid for result in results if result.status != "rejected"]
+            rejected = {
+                result.iid: result.detail or "rejected by db-service" for result in results if result.status == "rejected"
+            }
+            return done, rejected
+
+        # One-by-one isolates an invalid payload instead of blocking the whole batch.
+        done: list[str] = []
+        rejected: dict[str, str] = {}
+        for payload in payloads:
+            try:
+                api.save_activity(payload)
+                done.append(payload.iid)
+            except APIManagerHTTPError as exc:
+                if exc.status_code == 409:
+                    done.append(payload.iid)
+                elif 400 <= exc.status_code < 500 and exc.status_code != 429:
+                    rejected[payload.iid] = str(exc)
+                else:
+                    raise
+        return done, rejected
+
+    def _due_rows(self) -> list[tuple[str, str, int]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT iid, payload, attempts FROM activity_outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+                (time.time(), self._batch_size),
+            ).fetchall()
+
+    def _complete(self, done: list[str], rejected: dict[str, str]) -> None:
+        with self._lock:
+            self._connection.executemany("DELETE FROM activity_outbox WHERE iid = ?", [(iid,) for iid in done])
+            self._connection.executemany(
+                "UPDATE activity_outbox SET status = 'failed', last_error = ? WHERE iid = ?",
+                [(error_text, iid) for iid, error_text in rejected.items()],
+            )
+            self._connection.commit()
+        for iid, error_text in rejected.items():
+            logger.error("Activity rejected by db-service, kept in outbox", extra={"iid": iid, "error": error_text})
+
+    def _reschedule(self, rows: list[tuple[str, str, int]], error_text: str) -> None:
+        # Transport errors never mark a row failed: it stays pending and keeps
+        # retrying with capped backoff until db-service is reachable again.
+        now = time.time()
+        updates = []
+        overdue: list[tuple[str, int]] = []
+        for iid, _, attempts in rows:
+            attempts += 1
+            if attempts >= self._alert_after_attempts:
+                overdue.append((iid, attempts))
+            updates.append((attempts, now + self._retry_policy.delay_for(attempts), error_text, iid))
+        with self._lock:
+            self._connection.executemany(
+                "UPDATE activity_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE iid = ?",
+                updates,
+            )
+            self._connection.commit()
+        if overdue:
+            logger.error(
+                "Activity outbox rows still undelivered",
+                extra={
+                    "rows": len(overdue),
+                    "attempts": max(attempts for _, attempts in overdue),
+                    "iids": [iid for iid, _ in overdue[:10]],
+                    "error": error_text,
+                },
+            )
+
+    def requeue_failed(self, iids: list[str] | None = None) -> int:
+        """Przywraca odrzucone wpisy (wszystkie lub podane iid) do kolejki; zwraca ich liczbe."""
+        query = "UPDATE activity_outbox SET status = 'pending', attempts = 0, next_attempt_at = 0 WHERE status = 'failed'"
+        params: tuple[str, ...] = ()
+        if iids is not None:
+            if not iids:
+                return 0
+            query += f" AND iid IN ({', '.join('?' for _ in iids)})"
+            params = tuple(iids)
+        with self._lock:
+            requeued = self._connection.execute(query, params).rowcount
+            self._connection.commit()
+        if requeued:
+            logger.info("Requeued failed outbox rows", extra={"rows": requeued})
+            if self._loop is not None and self._wake is not None:
+                self._loop.call_soon_threadsafe(self._wake.set)
+        return requeued
+
+    def _count(self, status: str) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM activity_outbox WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            oldest = self._connection.execute(
+                "SELECT MIN(created_at) FROM activity_outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+        return {
+            "pending": self._count("pending"),
+            "failed": self._count("failed"),
+            "oldest_pending_age_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "last_error": self.last_error,
+        }
+
+
+_shared_outbox: ActivityOutbox | None = None
+_outbox_lock = threading.Lock()
+
+
+def get_activity_outbox() -> ActivityOutbox | None:
+    """Wspoldzielony outbox albo None, gdy wylaczony (BOT_OUTBOX_ENABLED=false)."""
+    global _shared_outbox
+    if os.getenv("BOT_OUTBOX_ENABLED", "true").lower() in {"0", "false", "no"}:
+        return None
+    with _outbox_lock:
+        if _shared_outbox is None:
+            try:
+                _shared_outbox = ActivityOutbox.from_env()
+            except (OSError, sqlite3.Error):
+                logger.warning("Could not open activity outbox, saving synchronously", exc_info=True)
+                return None
+        return _shared_outbox
@@ -0,0 +1,19 @@
+"""Nagrywanie i odtwarzanie ruchu bota do pomiarow wydajnosci bez Discorda i LLM.
+
+`python -m bench.replay <fixture.json>` odtwarza nagrane wiadomosci przez
+`DiscordMessageHandler` i skompilowany graf aktywnosci. Zamiast Discorda
+uzywane sa atrapy wiadomosci, zamiast LLM deterministyczny model z
+konfigurowalnym opoznieniem, a zamiast db-service lokalny serwer HTTP.
+`python -m bench.scoring` mierzy punktacje na skompilowanych regulach.
+"""
+
+import os
+import sys
+
+SERVICE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.abspath(os.path.join(SERVICE_ROOT, "..", ".."))
+
+# Same import roots as run.py, so `python -m bench.replay` works from the service directory.
+for _path in (SERVICE_ROOT, REPO_ROOT):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,368 @@
+"""Atrapy Discorda, modelu czatu i db-service uzywane przy odtwarzaniu nagran."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any, AsyncIterator
+
+from aiohttp import web
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from bench.fixtures import RecordedMessage, ReplayFixture, current_message_id
+from libs.shared.schemas.activity import ActivityCreate
+
+
+# --- Discord -----------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class FakeAuthor:
+    id: int
+    display_name: str
+    bot: bool = False
+
+    def __str__(self) -> str:
+        return self.display_name
+
+
+@dataclass(slots=True)
+class FakeChannel:
+    id: int
+
+
+@dataclass(slots=True)
+class FakeAttachment:
+    filename: str
+    url: str
+    content_type: str | None
+    size: int = 0
+    width: int | None = None
+    height: int | None = None
+
+
+@dataclass(slots=True)
+class FakeReaction:
+    emoji: str
+
+
+@dataclass(slots=True)
+class FakeMessageType:
+    value: int = 0
+
+
+@dataclass(slots=True)
+class DiscordRestStats:
+    """Wywolania REST, ktore bot wykonalby na Discordzie."""
+
+    reactions_added: int = 0
+    reactions_removed: int = 0
+    replies: int = 0
+    edits: int = 0
+    deletes: int = 0
+
+
+@dataclass(slots=True, eq=False)
+class FakeReply:
+    """Odpowiedz bota; edycje i usuniecie licza sie jak wywolania REST."""
+
+    parent: "FakeMessage"
+    content: str | None
+
+    async def edit(self, content: str | None = None, **kwargs: Any) -> None:
+        await self.parent._rest_call()
+        self.parent.rest_stats.edits += 1
+        self.content = content
+
+    async def delete(self) -> None:
+        await self.parent._rest_call()
+        self.parent.rest_stats.deletes += 1
+        self.parent.replies.remove(self)
+
+
+@dataclass(slots=True)
+class FakeMessage:
+    """Minimalny `discord.Message` dla DiscordMessageHandler; REST symulowany opoznieniem."""
+
+    id: int
+    author: FakeAuthor
+    channel: FakeChannel
+    content: str
+    created_at: datetime
+    attachments: list[FakeAttachment]
+    type: FakeMessageType
+    rest_latency_seconds: float = 0.0
+    rest_stats: DiscordRestStats = field(default_factory=DiscordRestStats)
+    reactions: list[FakeReaction] = field(default_factory=list)
+    replies: list[FakeReply] = field(default_factory=list)
+    guild: Any = None
+
+    @classmethod
+    def from_recorded(
+        cls,
+        recorded: RecordedMessage,
+        attachment_base_url: str,
+        rest_latency_seconds: float = 0.0,
+        rest_stats: DiscordRestStats | None = None,
+        id_offset: int = 0,
+    ) -> "FakeMessage":
+        created_at = datetime.fromisoformat(recorded.created_at)
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        attachments = [
+            FakeAttachment(
+                filename=attachment.filename,
+                # Served by the db-service stand-in as a synthetic image of the recorded size.
+                url=f"{attachment_base_url}/{attachment.width or 1080}x{attachment.height or 1920}.png"
+                f"?m={recorded.id + id_offset}&i={index}",
+                content_type=attachment.content_type,
+                size=attachment.size,
+                width=attachment.width,
+                height=attachment.height,
+            )
+            for index, attachment in enumerate(recorded.attachments)
+        ]
+        return cls(
+            id=recorded.id + id_offset,
+            author=FakeAuthor(id=recorded.author_id, display_name=recorded.author_name, bot=recorded.author_bot),
+            channel=FakeChannel(id=recorded.channel_id),
+            content=recorded.content,
+            created_at=created_at,
+            attachments=attachments,
+            type=FakeMessageType(recorded.type_value),
+            rest_latency_seconds=rest_latency_seconds,
+            rest_stats=rest_stats or DiscordRestStats(),
+        )
+
+    async def _rest_call(self) -> None:
+        if self.rest_latency_seconds > 0:
+            await asyncio.sleep(self.rest_latency_seconds)
+
+    async def add_reaction(self, emoji: str) -> None:
+        await self._rest_call()
+        self.rest_stats.reactions_added += 1
+        self.reactions.append(FakeReaction(str(emoji)))
+
+    async def remove_reaction(self, emoji: str, member: Any) -> None:
+        await self._rest_call()
+        self.rest_stats.reactions_removed += 1
+        self.reactions = [reaction for reaction in self.reactions if reaction.emoji != str(emoji)]
+
+    async def reply(self, content: str | None = None, **kwargs: Any) -> FakeReply:
+        await self._rest_call()
+        self.rest_stats.replies += 1
+        reply = FakeReply(self, content or json.dumps(getattr(kwargs.get("embed"), "to_dict", dict)()))
+        self.replies.append(reply)
+        return reply
+
+
+# --- LLM -------------------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class LatencyModel:
+    """Deterministyczne opoznienie: srednia +- jitter z ziarnistego generatora."""
+
+    mean_seconds: float = 0.0
+    jitter_seconds: float = 0.0
+    seed: int = 0
+    _random: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+
+    def next_delay(self) -> float:
+        if self.jitter_seconds <= 0:
+            return self.mean_seconds
+        return max(0.0, self.mean_seconds + self._random.uniform(-self.jitter_seconds, self.jitter_seconds))
+
+    async def wait(self) -> None:
+        delay = self.next_delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ReplayChatModel(Runnable[Any, AIMessage]):
+    """Deterministyczny model czatu odtwarzajacy odpowiedzi nagrane dla biezacej wiadomosci.
+
+    Bez nagrania zwraca stala odpowiedz, wiec wynik zalezy tylko od fixture i ziarna.
+    """
+
+    DEFAULT_EXTRACTION = {"activity_type": "bieganie_teren", "distance_km": 5.0}
+
+    def __init__(self, fixture: ReplayFixture, latency: LatencyModel, model_name: str = "replay") -> None:
+        self._fixture = fixture
+        self._latency = latency
+        self.model_name = model_name
+        self.calls = 0
+
+    def _recorded(self, kind: str) -> Any:
+        message_id = current_message_id.get()
+        return self._fixture.llm.get(message_id or "", {}).get(kind)
+
+    def invoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> AIMessage:
+        raise NotImplementedError("ReplayChatModel is async-only, like the bot's chains")
+
+    def _comment(self) -> str:
+        comment = self._recorded("comment")
+        return comment if isinstance(comment, str) else "Dobra robota, zolnierzu!"
+
+    async def ainvoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> AIMessage:
+        self.calls += 1
+        await self._latency.wait()
+        return AIMessage(content=self._comment())
+
+    async def astream(
+        self, input: Any, config: RunnableConfig | None = None, **kwargs: Any
+    ) -> AsyncIterator[AIMessageChunk]:
+        # Half the latency is time to first token, the rest is spread over the words.
+        self.calls += 1
+        delay = self._latency.next_delay()
+        words = re.findall(r"\S+\s*", self._comment()) or [""]
+        await asyncio.sleep(delay / 2)
+        for word in words:
+            yield AIMessageChunk(content=word)
+            await asyncio.sleep(delay / 2 / len(words))
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable[Any, Any]:
+        async def extract(_: Any) -> Any:
+            self.calls += 1
+            await self._latency.wait()
+            payload = dict(self._recorded("extraction") or self.DEFAULT_EXTRACTION)
+            if "comment" in schema.model_fields:
+                # Combined extraction+comment mode answers both from one call.
+                payload.setdefault("comment", self._comment())
+            return schema.model_validate(payload)
+
+        return RunnableLambda(extract)
+
+
+# --- db-service ----------------------------------------------------------------------
+
+
+class DbServiceStandIn:
+    """Lokalny serwer HTTP udajacy db-service (/api/v1) dla prawdziwego APIManager.
+
+    Odczyty (wyzwania, reguly, historia) pochodza z nagrania; zapisy aktywnosci sa
+    trzymane w pamieci, zeby deduplikacja i historia zachowywaly sie jak w db-service.
+    Serwuje tez syntetyczne obrazy zalacznikow pod /attachments/<w>x<h>.png.
+    """
+
+    API_PREFIX = "/api/v1"
+
+    def __init__(self, fixture: ReplayFixture, latency: LatencyModel) -> None:
+        self._fixture = fixture
+        self._latency = latency
+        self._activities: dict[str, dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._images: dict[tuple[int, int], bytes] = {}
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+        self.requests = 0
+
+    @property
+    def saved_activities(self) -> int:
+        return len(self._activities)
+
+    async def start(self) -> None:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_get("/attachments/{width:\\d+}x{height:\\d+}.png", self._attachment)
+        app.router.add_route("*", "/{tail:.*}", self._api)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host="127.0.0.1", port=0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _attachment(self, request: web.Request) -> web.Response:
+        size = (int(request.match_info["width"]), int(request.match_info["height"]))
+        if size not in self._images:
+            self._images[size] = await asyncio.to_thread(_synthetic_screenshot, size)
+        return web.Response(body=self._images[size], content_type="image/png")
+
+    async def _api(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await self._latency.wait()
+        path = request.path.removeprefix(self.API_PREFIX)
+        method = request.method.upper()
+
+        if method == "POST" and path == "/activities":
+            payload = ActivityCreate.model_validate(await request.json())
+            if payload.iid in self._activities:
+                return web.json_response({"detail": "Activity with this iid already exists"}, status=409)
+            return web.json_response(self._store(payload), status=201)
+        if method == "POST" and path == "/activities/batch":
+            items = []
+            for raw in (await request.json())["activities"]:
+                payload = ActivityCreate.model_validate(raw)
+                existing = self._activities.get(payload.iid)
+                status = "duplicate" if existing else "created"
+                items.append({"iid": payload.iid, "status": status, "activity": existing or self._store(payload)})
+            return web.json_response(items)
+        if method == "GET" and (match := re.fullmatch(r"/activities/([^/]+)", path)):
+            activity = self._activities.get(match.group(1))
+            if activity is None:
+                return web.json_response({"detail": "Activity not found"}, status=404)
+            return web.json_response(activity)
+        if method == "GET" and (match := re.fullmatch(r"/users/([^/]+)/history", path)):
+            recorded = self._fixture.db.get(f"GET {path}?{request.query_string}")
+            if recorded is not None:
+                return web.json_response(recorded["body"], status=recorded["status"])
+            discord_id = match.group(1)
+            limit = int(request.query.get("limit", "20"))
+            history = [activity for activity in self._activities.values() if activity["_discord_id"] == discord_id]
+            return web.json_response([_public(activity) for activity in history[-limit:]])
+
+        key = f"{method} {path}" + (f"?{request.query_string}" if request.query_string else "")
+        recorded = self._fixture.db.get(key)
+        if recorded is None:
+            return web.json_response({"detail": f"Not recorded: {key}"}, status=404)
+        return web.json_response(recorded["body"], status=recorded["status"])
+
+    def _store(self, payload: ActivityCreate) -> dict[str, Any]:
+        activity = {
+            "id": next(self._ids),
+            "iid": payload.iid,
+            "activity_type": payload.activity_type,
+            "distance_km": payload.distance_km,
+            "base_points": payload.base_points,
+            "weight_bonus_points": payload.weight_bonus_points,
+            "elevation_bonus_points": payload.elevation_bonus_points,
+            "mission_bonus_points": payload.mission_bonus_points,
+            "total_points": payload.total_points,
+            "special_mission_id": payload.special_mission_id,
+            "challenge_id": payload.challenge_id,
+            "created_at": payload.created_at.isoformat(),
+            "ai_comment": payload.ai_comment,
+            "_discord_id": payload.discord_id,
+        }
+        self._activities[payload.iid] = activity
+        return _public(activity)
+
+
+def _public(activity: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in activity.items() if not key.startswith("_")}
+
+
+def _synthetic_screenshot(size: tuple[int, int]) -> bytes:
+    # Banded gradient: compresses like a real app screenshot, unlike a flat fill.
+    from PIL import Image
+
+    width, height = size
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
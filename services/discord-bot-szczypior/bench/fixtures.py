@@ -0,0 +1,110 @@
+"""Format plikow z nagranym ruchem: wiadomosci Discord, odpowiedzi LLM i db-service."""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+FIXTURE_VERSION = 1
+
+# Message currently being handled; lets the recorder and the fake chat model
+# match LLM calls made deep inside the graph to the Discord message.
+current_message_id: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "bench_current_message_id", default=None
+)
+
+
+@dataclass(slots=True)
+class RecordedAttachment:
+    filename: str
+    content_type: str | None
+    size: int = 0
+    width: int | None = None
+    height: int | None = None
+
+
+@dataclass(slots=True)
+class RecordedMessage:
+    """Ksztalt `discord.Message` potrzebny handlerowi (bez tresci zalacznikow)."""
+
+    id: int
+    author_id: int
+    author_name: str
+    channel_id: int
+    content: str
+    created_at: str
+    author_bot: bool = False
+    type_value: int = 0
+    attachments: list[RecordedAttachment] = field(default_factory=list)
+
+    @classmethod
+    def from_discord(cls, message: Any) -> "RecordedMessage":
+        return cls(
+            id=int(message.id),
+            author_id=int(message.author.id),
+            author_name=str(message.author.display_name),
+            channel_id=int(message.channel.id),
+            content=message.content or "",
+            created_at=message.created_at.isoformat(),
+            author_bot=bool(message.author.bot),
+            type_value=int(getattr(message.type, "value", 0) or 0),
+            attachments=[
+                RecordedAttachment(
+                    filename=attachment.filename,
+                    content_type=attachment.content_type,
+                    size=int(attachment.size or 0),
+                    width=attachment.width,
+                    height=attachment.height,
+                )
+                for attachment in message.attachments
+            ],
+        )
+
+    @classmethod
+    def from_dict(cls, raw: dict[str, Any]) -> "RecordedMessage":
+        values = dict(raw)
+        values["attachments"] = [RecordedAttachment(**item) for item in raw.get("attachments", [])]
+        return cls(**values)
+
+
+@dataclass(slots=True)
+class ReplayFixture:
+    """Nagranie: wiadomosci w kolejnosci, odpowiedzi LLM per wiadomosc i odpowiedzi db-service.
+
+    - `llm[message_id]` = {"extraction": <ActivityParams>, "comment": "..."}
+    - `db["GET /challenges/active"]` = {"status": 200, "body": ...}
+    """
+
+    messages: list[RecordedMessage] = field(default_factory=list)
+    llm: dict[str, dict[str, Any]] = field(default_factory=dict)
+    db: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayFixture":
+        with open(path, encoding="utf-8") as handle:
+            raw = json.load(handle)
+        if raw.get("version") != FIXTURE_VERSION:
+            raise ValueError(f"Unsupported fixture version {raw.get('version')!r} in {path}")
+        return cls(
+            messages=[RecordedMessage.from_dict(item) for item in raw.get("messages", [])],
+            llm=dict(raw.get("llm", {})),
+            db=dict(raw.get("db", {})),
+        )
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "version": FIXTURE_VERSION,
+            "messages": [asdict(message) for message in self.messages],
+            "llm": self.llm,
+            "db": self.db,
+        }
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, ensure_ascii=False, indent=2)
+        os.replace(temporary_path, path)
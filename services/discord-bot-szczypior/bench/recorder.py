@@ -0,0 +1,124 @@
+"""Nagrywanie prawdziwego ruchu bota do pliku fixture (BOT_RECORD_FIXTURES=<sciezka>)."""
+
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+from typing import Any, Callable
+from urllib import parse
+
+from bench.fixtures import RecordedMessage, ReplayFixture, current_message_id
+
+logger = logging.getLogger(__name__)
+
+
+class FixtureRecorder:
+    """Podpina sie pod handler, chainy LLM grafu i klienta db-service i zapisuje ich ruch.
+
+    Nagrywanie jest opt-in i dziala przez podmiane atrybutow modulow, wiec nie
+    zmienia sciezki kodu, gdy jest wylaczone. `uninstall` przywraca oryginaly.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.fixture = ReplayFixture()
+        self._lock = threading.Lock()
+        self._seen_messages: set[int] = set()
+        self._restore: list[tuple[Any, str, Any]] = []
+
+    def install(self, message_handler: Any) -> None:
+        from ai import graphs
+        from api.api_menager import APIManager
+
+        self._patch(message_handler, "handle", self._wrap_handle(message_handler.handle))
+        self._patch(graphs, "analyze_message_only", self._wrap_llm(graphs.analyze_message_only, "extraction"))
+        self._patch(
+            graphs, "analyze_message_and_picture", self._wrap_llm(graphs.analyze_message_and_picture, "extraction")
+        )
+        self._patch(graphs, "generate_activity_comment", self._wrap_llm(graphs.generate_activity_comment, "comment"))
+        self._patch(graphs, "analyze_activity_with_comment", self._wrap_combined(graphs.analyze_activity_with_comment))
+        self._patch(APIManager, "_send", self._wrap_send(APIManager._send))
+        logger.info("Fixture recording enabled", extra={"path": self.path})
+
+    def uninstall(self) -> None:
+        while self._restore:
+            target, name, original = self._restore.pop()
+            setattr(target, name, original)
+
+    def save(self) -> None:
+        with self._lock:
+            self.fixture.save(self.path)
+        logger.info(
+            "Fixture saved",
+            extra={"path": self.path, "messages": len(self.fixture.messages), "db_responses": len(self.fixture.db)},
+        )
+
+    def _patch(self, target: Any, name: str, replacement: Any) -> None:
+        self._restore.append((target, name, getattr(target, name)))
+        setattr(target, name, replacement)
+
+    def _wrap_handle(self, handle: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(handle)
+        async def wrapper(message: Any, *args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                if message.id not in self._seen_messages:
+                    self._seen_messages.add(message.id)
+                    self.fixture.messages.append(RecordedMessage.from_discord(message))
+            token = current_message_id.set(str(message.id))
+            try:
+                return await handle(message, *args, **kwargs)
+            finally:
+                current_message_id.reset(token)
+
+        return wrapper
+
+    def _wrap_llm(self, call: Callable[..., Any], kind: str) -> Callable[..., Any]:
+        @functools.wraps(call)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = await call(*args, **kwargs)
+            message_id = current_message_id.get()
+            if message_id is not None:
+                value = result.model_dump(mode="json") if hasattr(result, "model_dump") else result
+                with self._lock:
+                    self.fixture.llm.setdefault(message_id, {})[kind] = value
+            return result
+
+        return wrapper
+
+    def _wrap_combined(self, call: Callable[..., Any]) -> Callable[..., Any]:
+        # Stored as the two-call kinds so one fixture replays in either pipeline mode.
+        @functools.wraps(call)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            result = await call(*args, **kwargs)
+            message_id = current_message_id.get()
+            if message_id is not None:
+                with self._lock:
+                    recorded = self.fixture.llm.setdefault(message_id, {})
+                    recorded["extraction"] = result.activity().model_dump(mode="json")
+                    recorded["comment"] = result.comment
+            return result
+
+        return wrapper
+
+    def _wrap_send(self, send: Callable[..., Any]) -> Callable[..., Any]:
+        from api.api_menager import APIManagerHTTPError
+
+        recorder = self
+
+        @functools.wraps(send)
+        def wrapper(api: Any, method: str, url: str, json_payload: dict[str, Any] | None) -> Any:
+            parsed = parse.urlsplit(url)
+            path = parsed.path.removeprefix(parse.urlsplit(api.api_base_url).path)
+            key = f"{method.upper()} {path}" + (f"?{parsed.query}" if parsed.query else "")
+            try:
+                body = send(api, method, url, json_payload)
+            except APIManagerHTTPError as exc:
+                with recorder._lock:
+                    recorder.fixture.db[key] = {"status": exc.status_code, "body": {"detail": exc.detail}}
+                raise
+            with recorder._lock:
+                recorder.fixture.db[key] = {"status": 200, "body": body}
+            return body
+
+        return wrapper
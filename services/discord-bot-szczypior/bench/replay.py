@@ -0,0 +1,260 @@
+"""Odtwarzanie nagranego ruchu przez handler i graf AI z raportem przepustowosci.
+
+    python -m bench.replay bench/data/sample_fixture.json --concurrency 8 --repeat 20 \
+        --llm-latency 0.8 --llm-jitter 0.3 --db-latency 0.02 --discord-latency 0.08
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import bench  # noqa: F401  (sys.path bootstrap)
+from bench.fakes import DbServiceStandIn, DiscordRestStats, FakeMessage, LatencyModel, ReplayChatModel
+from bench.fixtures import ReplayFixture, current_message_id
+
+
+@dataclass(slots=True)
+class ReplayConfig:
+    concurrency: int = 4
+    repeat: int = 1
+    llm_latency_seconds: float = 0.0
+    llm_jitter_seconds: float = 0.0
+    db_latency_seconds: float = 0.0
+    discord_latency_seconds: float = 0.0
+    seed: int = 0
+    trace_memory: bool = False
+    stream_comments: bool = True
+    pipeline_mode: str = "two_call"
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _bucket_quantile(buckets: tuple[float, ...], counts: list[int], fraction: float) -> float:
+    # Upper bound of the bucket holding the quantile, as Prometheus would report it.
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    cumulative = 0
+    for bound, count in zip((*buckets, float("inf")), counts):
+        cumulative += count
+        if cumulative >= fraction * total:
+            return bound if bound != float("inf") else buckets[-1]
+    return buckets[-1]
+
+
+def _stage_report(before: dict[Any, tuple[list[int], float]]) -> dict[str, dict[str, float]]:
+    from utils.metrics import STAGE_DURATION
+
+    report: dict[str, dict[str, float]] = {}
+    for key, (counts, total) in sorted(STAGE_DURATION.snapshot().items()):
+        previous_counts, previous_total = before.get(key, ([0] * len(counts), 0.0))
+        delta = [now - then for now, then in zip(counts, previous_counts)]
+        count = sum(delta)
+        if not count:
+            continue
+        report[key[0]] = {
+            "count": count,
+            "mean_ms": round((total - previous_total) / count * 1000, 2),
+            "p50_le_ms": round(_bucket_quantile(STAGE_DURATION.buckets, delta, 0.5) * 1000, 1),
+            "p95_le_ms": round(_bucket_quantile(STAGE_DURATION.buckets, delta, 0.95) * 1000, 1),
+        }
+    return report
+
+
+def _outcome_counts() -> dict[str, float]:
+    from utils.metrics import MESSAGES
+
+    return {
+        outcome: MESSAGES.value(outcome=outcome, priority="live")
+        for outcome in ("seen", "forwarded", "deduped", "processed", "failed")
+    }
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _reset_singletons() -> None:
+    # Process-wide singletons read the environment once; the replay points them at the stand-in.
+    import ai.cache
+    import ai.history
+    import ai.services
+    import api.outbox
+    import libs.shared.cache
+
+    ai.services._activity_graph = None
+    ai.cache._extraction_cache = None
+    ai.history._history_digest_cache = None
+    api.outbox._shared_outbox = None
+    libs.shared.cache._shared_cache = None
+
+
+async def run_replay(fixture: ReplayFixture, config: ReplayConfig) -> dict[str, Any]:
+    """Odtwarza fixture `repeat` razy z `concurrency` workerami i zwraca raport."""
+    import ai.chains
+    from api.outbox import get_activity_outbox
+    from bot.message_handler import DiscordMessageHandler, ModuleAIMessageProcessor
+    from bot.scheduler import MessageScheduler
+    from utils.metrics import STAGE_DURATION
+
+    db_service = DbServiceStandIn(fixture, LatencyModel(config.db_latency_seconds, seed=config.seed))
+    await db_service.start()
+    llm_latency = LatencyModel(config.llm_latency_seconds, config.llm_jitter_seconds, seed=config.seed)
+    chat_model = ReplayChatModel(fixture, llm_latency)
+
+    work_dir = tempfile.mkdtemp(prefix="bot-replay-")
+    replay_env = {
+        "DB_SERVICE_BASE_URL": db_service.base_url,
+        "DB_SERVICE_API_KEY": "replay",
+        "BOT_OUTBOX_PATH": os.path.join(work_dir, "outbox.sqlite3"),
+        "AI_EXTRACTION_CACHE_PATH": "",
+        "AI_PIPELINE_MODE": config.pipeline_mode,
+    }
+    previous_env = {name: os.environ.get(name) for name in replay_env}
+    os.environ.update(replay_env)
+    original_get_chat_model = ai.chains.get_chat_model
+    ai.chains.get_chat_model = lambda model_name, temperature=None: chat_model
+    _reset_singletons()
+
+    scheduler = MessageScheduler(workers=config.concurrency, max_queue=max(200, len(fixture.messages) * config.repeat))
+    handler = DiscordMessageHandler(
+        ai_processor=ModuleAIMessageProcessor(), scheduler=scheduler, stream_comments=config.stream_comments
+    )
+    original_handle = handler.handle
+    latencies: list[float] = []
+    # Every repetition gets fresh message ids so deduplication does not short-circuit it.
+    id_stride = 10 ** (len(str(max((message.id for message in fixture.messages), default=1))) + 1)
+
+    async def timed_handle(message: Any, *args: Any, **kwargs: Any) -> None:
+        token = current_message_id.set(str(message.id % id_stride))
+        started = time.perf_counter()
+        try:
+            await original_handle(message, *args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+            current_message_id.reset(token)
+
+    handler.handle = timed_handle  # type: ignore[method-assign]
+
+    rest_stats = DiscordRestStats()
+    messages = [
+        FakeMessage.from_recorded(
+            recorded,
+            attachment_base_url=f"{db_service.base_url}/attachments",
+            rest_latency_seconds=config.discord_latency_seconds,
+            rest_stats=rest_stats,
+            id_offset=round_index * id_stride,
+        )
+        for round_index in range(config.repeat)
+        for recorded in fixture.messages
+    ]
+
+    outbox = get_activity_outbox()
+    stages_before = STAGE_DURATION.snapshot()
+    outcomes_before = _outcome_counts()
+    if config.trace_memory:
+        tracemalloc.start()
+    try:
+        if outbox is not None:
+            await outbox.start()
+        await scheduler.start()
+        started = time.perf_counter()
+        futures = [await handler.dispatch(message) for message in messages]
+        await asyncio.gather(*(future for future in futures if future is not None), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if config.trace_memory else None
+    finally:
+        if config.trace_memory:
+            tracemalloc.stop()
+        await scheduler.stop()
+        if outbox is not None:
+            await outbox.stop()
+            outbox.close()
+        from ai.images import close_image_resources
+
+        await close_image_resources()
+        await db_service.stop()
+        ai.chains.get_chat_model = original_get_chat_model
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        _reset_singletons()
+
+    outcomes = {name: value - outcomes_before[name] for name, value in _outcome_counts().items()}
+    latencies.sort()
+    return {
+        "config": asdict(config),
+        "messages": len(messages),
+        "outcomes": {name: int(value) for name, value in outcomes.items()},
+        "duration_seconds": round(elapsed, 3),
+        "messages_per_second": round(len(messages) / elapsed, 2) if elapsed else 0.0,
+        "handle_latency_ms": {
+            "p50": round(_percentile(latencies, 0.5) * 1000, 1),
+            "p95": round(_percentile(latencies, 0.95) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "stages": _stage_report(stages_before),
+        "llm_calls": chat_model.calls,
+        "db_requests": db_service.requests,
+        "saved_activities": db_service.saved_activities,
+        "discord_rest": asdict(rest_stats),
+        "memory": {
+            "max_rss_mb": _max_rss_mb(),
+            "traced_peak_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded Discord traffic through the bot pipeline.")
+    parser.add_argument("fixture", help="JSON fixture recorded with BOT_RECORD_FIXTURES")
+    parser.add_argument("--concurrency", type=int, default=4, help="AI scheduler workers")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the fixture N times")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="mean fake LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="+- uniform jitter in seconds")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="db-service stand-in latency in seconds")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="fake Discord REST latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slower)")
+    parser.add_argument("--no-stream", action="store_true", help="reply once with the full comment (no edits)")
+    parser.add_argument("--pipeline-mode", choices=("two_call", "combined"), default="two_call")
+    args = parser.parse_args(argv)
+
+    config = ReplayConfig(
+        concurrency=args.concurrency,
+        repeat=args.repeat,
+        llm_latency_seconds=args.llm_latency,
+        llm_jitter_seconds=args.llm_jitter,
+        db_latency_seconds=args.db_latency,
+        discord_latency_seconds=args.discord_latency,
+        seed=args.seed,
+        trace_memory=args.trace_memory,
+        stream_comments=not args.no_stream,
+        pipeline_mode=args.pipeline_mode,
+    )
+    report = asyncio.run(run_replay(ReplayFixture.load(args.fixture), config))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
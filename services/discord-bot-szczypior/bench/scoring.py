@@ -0,0 +1,55 @@
+"""Mikrobenchmark punktacji: kompilacja regul przy kazdym wywolaniu vs raz na challenge.
+
+    python -m bench.scoring --iterations 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+
+import bench  # noqa: F401  (sys.path bootstrap)
+from libs.shared.constants import ACTIVITY_TYPES
+from libs.shared.scoring import compile_points_rules
+
+# Shaped like a challenge loaded from db-service: rules with diacritics, points_rules overrides.
+POINTS_RULES = {"weight_bonus": {"min_weight_kg": 5, "distance_points_multiplier": 1.5}, "elevation_bonus": {"meters_step": 50}}
+SAMPLES = (
+    ("bieganie_teren", 10.5, 8.0, 320),
+    ("rower", 42.0, None, 650),
+    ("plywanie", 1.8, None, None),
+    ("running_treadmill", 7.2, 12.0, None),
+)
+
+
+def _per_call() -> None:
+    # Previous behaviour: every score re-normalized bonus names and re-parsed points_rules.
+    for activity_type, distance_km, weight_kg, elevation_m in SAMPLES:
+        compile_points_rules(ACTIVITY_TYPES, POINTS_RULES).score(activity_type, distance_km, weight_kg, elevation_m)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark points scoring with and without precompiled rules.")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    compiled = compile_points_rules(ACTIVITY_TYPES, POINTS_RULES)
+
+    def precompiled() -> None:
+        for activity_type, distance_km, weight_kg, elevation_m in SAMPLES:
+            compiled.score(activity_type, distance_km, weight_kg, elevation_m)
+
+    scores = len(SAMPLES) * args.iterations
+    report = {"scores": scores}
+    for name, func in (("compile_per_call", _per_call), ("precompiled", precompiled)):
+        best = min(timeit.repeat(func, number=args.iterations, repeat=args.repeat))
+        report[name] = {"ns_per_score": round(best / scores * 1e9, 1), "scores_per_second": round(scores / best)}
+    report["speedup"] = round(report["compile_per_call"]["ns_per_score"] / report["precompiled"]["ns_per_score"], 1)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
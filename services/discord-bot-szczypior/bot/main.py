@@ -20,10 +20,16 @@ import asyncio
 
 load_dotenv()
 
+from utils.metrics import get_startup_marks, mark_startup
+
 try:
     from bot.message_handler import DiscordMessageHandler, ModuleAIMessageProcessor  # pyright: ignore[reportMissingImports]
+    from bot.runtime_profile import BotRuntimeProfile, ChannelScope  # pyright: ignore[reportMissingImports]
+    from bot.scheduler import MessageScheduler  # pyright: ignore[reportMissingImports]
 except ImportError:
     from message_handler import DiscordMessageHandler, ModuleAIMessageProcessor  # pyright: ignore[reportMissingImports]
+    from runtime_profile import BotRuntimeProfile, ChannelScope  # pyright: ignore[reportMissingImports]
+    from scheduler import MessageScheduler  # pyright: ignore[reportMissingImports]
 
 
 class ExtraFormatter(logging.Formatter):
@@ -79,13 +85,96 @@ def _configure_logging() -> logging.Logger:
 
 logger = _configure_logging()
 
+runtime_profile = BotRuntimeProfile.from_env()
 intents = discord.Intents.default()
 intents.message_content = True
 intents.messages = True
 intents.guilds = True
+intents = runtime_profile.apply_intents(intents)
+channel_scope = ChannelScope.from_env(runtime_profile)
+
+# single: Discord + graf AI w jednym procesie; gateway: graf AI na workerach (jobs/, run.py przy BOT_MODE=worker).
+BOT_MODE = os.getenv("BOT_MODE", "single").strip().lower()
+
+
+def _build_ai_processor() -> Any:
+    if BOT_MODE == "gateway":
+        from jobs.gateway import QueueAIMessageProcessor
+        from jobs.queue import job_queue_from_env
+
+        return QueueAIMessageProcessor.from_env(job_queue_from_env())
+    return ModuleAIMessageProcessor()
+
+
+bot = commands.Bot(command_prefix="!", intents=intents, **runtime_profile.bot_kwargs())
+scheduler = MessageScheduler.from_env()
+ai_processor: Any = _build_ai_processor()
+message_handler: Any = DiscordMessageHandler(
+    ai_processor=ai_processor,
+    bot=bot,
+    scheduler=scheduler,
+    # Progress sinks live in this process and cannot follow a job to a worker.
+    stream_comments=False if BOT_MODE == "gateway" else None,
+)
+
+
+def register_runtime_metrics() -> None:
+    """Gauge'e liczone przy scrapie /metrics z istniejacych `get_stats()`."""
+    from api.outbox import get_activity_outbox
+    from utils.metrics import REGISTRY
+    from utils.resilience import CircuitBreaker, get_breaker_stats
+
+    def scheduler_queue_depth():
+        for priority, stats in scheduler.get_stats()["priorities"].items():
+            yield {"priority": priority}, stats["queued"]
 
-bot = commands.Bot(command_prefix="!", intents=intents)
-message_handler: Any = DiscordMessageHandler(ai_processor=ModuleAIMessageProcessor(), bot=bot)
+    def llm_queue_depth():
+        from ai.rate_limiter import get_llm_rate_limiter
+
+        for model, stats in get_llm_rate_limiter().get_stats().items():
+            yield {"model": model}, stats["queue_depth"]
+
+    def breaker_open():
+        for name, stats in get_breaker_stats().items():
+            yield {"breaker": name}, 0 if stats["state"] == CircuitBreaker.CLOSED else 1
+
+    def outbox_rows():
+        outbox = get_activity_outbox()
+        if outbox is None:
+            return
+        stats = outbox.get_stats()
+        yield {"status": "pending"}, stats["pending"]
+        yield {"status": "failed"}, stats["failed"]
+
+    REGISTRY.gauge_callback("bot_ai_queue_depth", "Zadania AI czekajace w kolejce schedulera.", scheduler_queue_depth)
+    REGISTRY.gauge_callback("bot_llm_rate_limit_queue_depth", "Wywolania LLM czekajace na limiter.", llm_queue_depth)
+    REGISTRY.gauge_callback("bot_circuit_breaker_open", "1 gdy breaker jest open lub half-open.", breaker_open)
+    REGISTRY.gauge_callback("bot_outbox_rows", "Wiersze w lokalnym outboxie aktywnosci.", outbox_rows)
+
+
+def register_memory_report() -> None:
+    """Rozmiary cache'y discord.py w raporcie pamieci (/debug/memory, log co interwal)."""
+    from utils.memory import get_memory_reporter
+
+    reporter = get_memory_reporter()
+    reporter.register_source("discord_messages", lambda: len(bot.cached_messages))
+    reporter.register_source("discord_users", lambda: len(bot.users))
+    reporter.register_source("discord_members", lambda: sum(len(guild.members) for guild in bot.guilds))
+    reporter.register_source("discord_channels", lambda: sum(len(guild.channels) for guild in bot.guilds))
+
+
+async def refresh_channel_scope() -> None:
+    """Zaweza obsluge do kanalow aktywnych challenge'y (odczyt przez wspolny cache)."""
+    api_manager = getattr(message_handler, "_api_manager", None)
+    if api_manager is None:
+        return
+    try:
+        challenges = await asyncio.to_thread(api_manager.get_active_challenges)
+    except Exception:
+        logger.warning("Could not refresh channel scope", exc_info=True)
+        channel_scope.mark_refreshed()
+        return
+    channel_scope.update_from_challenges(challenges)
 
 
 def register_future_commands() -> None:
@@ -99,7 +188,9 @@ async def on_ready() -> None:
         logger.warning("Bot connected without resolved user object")
         return
 
+    mark_startup("on_ready")
     logger.info("Bot is online", extra={"bot_id": bot.user.id, "bot_name": str(bot.user)})
+    logger.info("Startup timings", extra={"startup_seconds": get_startup_marks()})
 
     api_manager = getattr(message_handler, "_api_manager", None)
     if api_manager is None:
@@ -110,6 +201,7 @@ async def on_ready() -> None:
     except Exception:
         logger.error("Failed to fetch active challenges for startup sync", exc_info=True)
         return
+    channel_scope.update_from_challenges(challenges)
 
     try:
         await message_handler.sync_active_challenges(challenges)
@@ -128,7 +220,24 @@ async def on_message(message: discord.Message) -> None:
     if message.content.startswith("!"):
         return
 
-    await message_handler.handle(message)
+    if channel_scope.needs_refresh:
+        await refresh_channel_scope()
+    if not channel_scope.allows(message.channel):
+        return
+
+    await message_handler.dispatch(message, priority="live")
+
+
+@bot.event
+async def on_message_edit(before: discord.Message, after: discord.Message) -> None:
+    """Edycje trafiaja na koniec kolejki; duplikaty sa odfiltrowane po iid w handlerze."""
+    if after.author == bot.user or before.content == after.content:
+        return
+
+    if after.content.startswith("!") or not channel_scope.allows(after.channel):
+        return
+
+    await message_handler.dispatch(after, priority="edit")
 
 
 @bot.command(name="ping")
@@ -140,12 +249,55 @@ async def ping(ctx: commands.Context) -> None:
 async def start() -> None:
     """Uruchamia bota Discord w istniejącej pętli asyncio."""
     register_future_commands()
+    register_runtime_metrics()
+    register_memory_report()
 
     token = os.getenv("DISCORD_TOKEN")
     if not token:
         raise ValueError("Brak tokena Discord! Ustaw DISCORD_TOKEN w zmiennych środowiskowych")
-
-    await bot.start(token)
+    # Startup report / budget test: everything up to the gateway connection, without connecting.
+    dry_run = bool(os.getenv("BOT_STARTUP_DRY_RUN"))
+
+    from api.outbox import get_activity_outbox
+
+    # In gateway mode activities are saved by the workers, so their outbox is the one that drains.
+    outbox = get_activity_outbox() if BOT_MODE != "gateway" else None
+    if outbox is not None:
+        await outbox.start()
+    if BOT_MODE == "gateway":
+        await ai_processor.start()
+    recorder = None
+    if os.getenv("BOT_RECORD_FIXTURES"):
+        # Benchmark fixtures (see bench.replay): records message shapes, LLM and db-service responses.
+        from bench.recorder import FixtureRecorder
+
+        recorder = FixtureRecorder(os.environ["BOT_RECORD_FIXTURES"])
+        recorder.install(message_handler)
+    from libs.shared.cache import CHALLENGES, get_shared_cache
+    from utils.memory import get_memory_reporter
+
+    # Challenge edits elsewhere (db-service, dashboard) can add or move challenge channels.
+    get_shared_cache().add_listener(lambda namespace: namespace == CHALLENGES and channel_scope.mark_stale())
+    memory_reporter = get_memory_reporter()
+    await memory_reporter.start()
+    await scheduler.start()
+    try:
+        mark_startup("discord_connect")
+        if not dry_run:
+            await bot.start(token)
+    finally:
+        await scheduler.stop()
+        await memory_reporter.stop()
+        if BOT_MODE == "gateway":
+            await ai_processor.stop()
+        if outbox is not None:
+            await outbox.stop()
+        if recorder is not None:
+            recorder.uninstall()
+            recorder.save()
+        from ai.images import close_image_resources
+
+        await close_image_resources()
 
 
 def main() -> None:
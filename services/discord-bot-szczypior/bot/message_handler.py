@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import inspect
 import logging
+import os
+import time
 from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, field
 from typing import Any, Optional, Protocol
@@ -21,7 +24,24 @@ except Exception:
     class APIManagerHTTPError(APIManagerError):
         status_code: int = 0
 
+try:
+    from api.outbox import get_activity_outbox
+except Exception:
+    get_activity_outbox = None  # type: ignore
+
+try:
+    from bot.scheduler import JobDropped, MessageScheduler
+except ImportError:
+    from scheduler import JobDropped, MessageScheduler  # pyright: ignore[reportMissingImports]
+
+try:
+    from bot.progressive_reply import ProgressiveReply
+except ImportError:
+    from progressive_reply import ProgressiveReply  # pyright: ignore[reportMissingImports]
+
+from ai.rate_limiter import RequestPriority
 from libs.shared.constants import ACTIVITY_KEYWORDS
+from utils.metrics import MESSAGES, stage_timer
 from libs.shared.schemas.challenge import ChallengeRead
 
 logger = logging.getLogger(__name__)
@@ -38,6 +58,9 @@ class AIProcessingRequest:
     content: str
     image_urls: list[str] = field(default_factory=list)
     created_at: Optional[str] = None
+    priority: str = "live"
+    # ai.progress.CommentProgress sink; set for live messages when comment streaming is on.
+    progress: Optional[Any] = None
 
 
 @dataclass(slots=True)
@@ -116,35 +139,85 @@ class DiscordMessageHandler:
         ai_processor: AIMessageProcessor,
         api_manager: Optional[Any] = None,
         bot: Optional[Any] = None,
+        scheduler: Optional[MessageScheduler] = None,
+        stream_comments: Optional[bool] = None,
     ) -> None:
         self._ai_processor = ai_processor
         self._activity_keywords = self._load_activity_keywords()
         self._api_manager = api_manager or self._build_api_manager()
         self._bot = bot
+        self._scheduler = scheduler
+        if stream_comments is None:
+            stream_comments = os.getenv("BOT_STREAM_COMMENTS", "1").strip().lower() not in {"0", "false", "no"}
+        self._stream_comments = stream_comments
+
+    async def dispatch(self, message: discord.Message, priority: str = "live") -> Optional[asyncio.Future[Any]]:
+        """Filtruje wiadomosc i przekazuje ja do kolejki AI (lub obsluguje od razu bez schedulera)."""
+        MESSAGES.inc(outcome="seen", priority=priority)
+        with stage_timer("keyword_filter"):
+            should_analyze, _, _ = self._should_forward_to_ai(message)
+        if not should_analyze:
+            return None
+        MESSAGES.inc(outcome="forwarded", priority=priority)
 
-    async def handle(self, message: discord.Message, quiet_mode: bool = False) -> None:
+        quiet_mode = priority == "backlog"
+        if self._scheduler is None:
+            await self.handle(message, quiet_mode=quiet_mode, priority=priority)
+            return None
+
+        return await self._scheduler.submit(
+            lambda: self.handle(message, quiet_mode=quiet_mode, priority=priority),
+            author_id=str(message.author.id),
+            priority=RequestPriority.parse(priority),
+        )
+
+    async def handle(self, message: discord.Message, quiet_mode: bool = False, priority: Optional[str] = None) -> None:
+        with stage_timer("handle"):
+            await self._handle(message, quiet_mode=quiet_mode, priority=priority)
+
+    async def _handle(self, message: discord.Message, quiet_mode: bool, priority: Optional[str]) -> None:
+        started = time.perf_counter()
         should_analyze, has_keywords, has_image = self._should_forward_to_ai(message)
         if not should_analyze:
             return
 
-        # Skip duplicate activity messages before any AI call.
-        if (has_keywords or has_image) and await self._activity_already_exists(message):
-            logger.info(
-                "Skipping duplicate message",
-                extra={"message_id": message.id, "author": str(message.author)},
-            )
-            if (not quiet_mode) and (not any(str(r.emoji) == "✅" for r in message.reactions)):
-                await message.add_reaction("✅")
-            return
+        resolved_priority = priority or ("backlog" if quiet_mode else "live")
 
-        request = self._build_request(message)
+        # Skip duplicate activity messages before any AI call.
+        if has_keywords or has_image:
+            with stage_timer("duplicate_check"):
+                already_exists = await self._activity_already_exists(message)
+            if already_exists:
+                MESSAGES.inc(outcome="deduped", priority=resolved_priority)
+                logger.info(
+                    "Skipping duplicate message",
+                    extra={"message_id": message.id, "author": str(message.author)},
+                )
+                if (not quiet_mode) and (not any(str(r.emoji) == "✅" for r in message.reactions)):
+                    with stage_timer("discord_rest"):
+                        await message.add_reaction("✅")
+                return
+
+        request = self._build_request(message, priority=resolved_priority)
+        progress: Optional[ProgressiveReply] = None
+        if self._stream_comments and not quiet_mode:
+            # Reply as soon as the activity and points are known, then edit it while the comment streams in.
+            progress = ProgressiveReply.from_env(message, started_at=started)
+            request.progress = progress
 
         if not quiet_mode:
-            await message.add_reaction("🤔")
+            with stage_timer("discord_rest"):
+                await message.add_reaction("🤔")
 
         try:
-            result = await self._ai_processor.process_message(request)
-        except Exception:
+            with stage_timer("ai_pipeline"):
+                result = await self._ai_processor.process_message(request)
+        except BaseException as exc:
+            if progress is not None:
+                await progress.abort()
+            if not isinstance(exc, Exception):
+                raise
+            MESSAGES.inc(outcome="failed", priority=resolved_priority)
             if not quiet_mode:
                 await self._safe_remove_reaction(message, "🤔")
             logger.error(
@@ -156,11 +229,13 @@ class DiscordMessageHandler:
                 await message.add_reaction("❓")
             return
 
+        MESSAGES.inc(outcome="processed", priority=resolved_priority)
         if quiet_mode:
             return
 
-        await self._safe_remove_reaction(message, "🤔")
-        await self._apply_result(message, result)
+        with stage_timer("discord_rest"):
+            await self._safe_remove_reaction(message, "🤔")
+            await self._apply_result(message, result, progress)
 
     @staticmethod
     async def _safe_remove_reaction(message: discord.Message, emoji: str) -> None:
@@ -185,7 +260,9 @@ class DiscordMessageHandler:
             "processed": 0,
             "failed": 0,
             "skipped": 0,
+            "deferred": 0,
         }
+        scheduled: list[tuple[int, int, asyncio.Future[Any]]] = []
 
         if self._api_manager is None:
             logger.warning("Startup sync skipped: api_manager not available")
@@ -235,6 +312,13 @@ class DiscordMessageHandler:
                     summary["duplicates"] += 1
                     continue
 
+                if self._scheduler is not None:
+                    # Backlog jobs queue behind live traffic; submit blocks while the queue is full.
+                    future = await self.dispatch(message, priority="backlog")
+                    if future is not None:
+                        scheduled.append((challenge.id, message.id, future))
+                    continue
+
                 try:
                     await self.handle(message, quiet_mode=True)
                     summary["processed"] += 1
@@ -246,6 +330,20 @@ class DiscordMessageHandler:
                         extra={"challenge_id": challenge.id, "message_id": message.id},
                     )
 
+        for challenge_id, message_id, future in scheduled:
+            try:
+                await future
+                summary["processed"] += 1
+            except JobDropped:
+                summary["deferred"] += 1
+            except Exception:
+                summary["failed"] += 1
+                logger.error(
+                    "Failed to process startup sync message",
+                    exc_info=True,
+                    extra={"challenge_id": challenge_id, "message_id": message_id},
+                )
+
         logger.info("Startup sync completed", extra=summary)
         return summary
 
@@ -310,12 +408,15 @@ class DiscordMessageHandler:
         return f"{timestamp_int}_{message.id}"
 
     async def _activity_already_exists(self, message: discord.Message) -> bool:
+        iid = self._create_unique_id(message)
+        # Saved locally but not yet flushed to db-service.
+        outbox = get_activity_outbox() if get_activity_outbox is not None else None
+        if outbox is not None and await asyncio.to_thread(outbox.contains, iid):
+            return True
+
         if self._api_manager is None:
             return False
 
-        import asyncio
-
-        iid = self._create_unique_id(message)
         try:
             await asyncio.to_thread(self._api_manager.get_activity, iid)
             return True
@@ -331,7 +432,7 @@ class DiscordMessageHandler:
             logger.warning("Unexpected error checking duplicate", exc_info=True, extra={"iid": iid})
             return False
 
-    def _build_request(self, message: discord.Message) -> AIProcessingRequest:
+    def _build_request(self, message: discord.Message, priority: str = "live") -> AIProcessingRequest:
         return AIProcessingRequest(
             message_id=str(message.id),
             author_id=str(message.author.id),
@@ -340,6 +441,7 @@ class DiscordMessageHandler:
             content=message.content or "",
             image_urls=self._extract_image_urls(message),
             created_at=message.created_at.isoformat() if message.created_at else None,
+            priority=priority,
         )
 
     @staticmethod
@@ -354,10 +456,23 @@ class DiscordMessageHandler:
                 image_urls.append(attachment.url)
         return image_urls
 
-    async def _apply_result(self, message: discord.Message, result: AIProcessingResult) -> None:
+    async def _apply_result(
+        self,
+        message: discord.Message,
+        result: AIProcessingResult,
+        progress: Optional[ProgressiveReply] = None,
+    ) -> None:
         if result.reaction:
             await message.add_reaction(result.reaction)
 
+        if progress is not None:
+            embed = discord.Embed.from_dict(result.reply_embed) if result.reply_embed else None
+            if result.reply_embed or result.reply_text:
+                if await progress.finish(result.reply_text, embed=embed):
+                    return
+            else:
+                await progress.abort()
+
         if result.reply_embed:
             await message.reply(embed=discord.Embed.from_dict(result.reply_embed))
             return
@@ -18,6 +18,7 @@ from exceptions import (
     LLMTimeoutError,
 )
 from libs.shared.schemas.challenge import ChallengeRead
+from libs.shared.scoring import CompiledPointsRules, challenge_points_rules, compile_points_rules
 from utils import get_display_name, parse_distance
 
 from ai.chains import analyze_message_and_picture
@@ -43,8 +44,8 @@ class BotOrchestrator:
         self.activity_keywords = config_manager.get_activity_keywords()
         # Cache: challenge_id -> activity types dict (same shape as ACTIVITY_TYPES)
         self._rules_cache: dict[int, dict[str, Any]] = {}
-        # Cache: challenge_id -> effective points_rules dict
-        self._points_rules_cache: dict[int, dict[str, Any]] = {}
+        # Cache: challenge_id -> compiled activity rules + points_rules
+        self._points_rules_cache: dict[Optional[int], CompiledPointsRules] = {}
         # Startup sync tunables: keep cache bounded to avoid memory spikes.
         self._startup_sync_user_history_limit = max(
             50,
@@ -240,64 +241,15 @@ class BotOrchestrator:
 
         return ACTIVITY_TYPES
 
-    @staticmethod
-    def _to_float_or_default(value: Any, default: float) -> float:
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return default
-
-    @staticmethod
-    def _to_int_or_default(value: Any, default: int) -> int:
-        try:
-            return int(value)
-        except (TypeError, ValueError):
-            return default
-
-    def _normalize_points_rules(self, raw_points_rules: Optional[dict[str, Any]]) -> dict[str, Any]:
-        default_rules = config_manager.get_points_rules()
-        if not isinstance(raw_points_rules, dict):
-            raw_points_rules = {}
-
-        weight_raw = raw_points_rules.get("weight_bonus")
-        elevation_raw = raw_points_rules.get("elevation_bonus")
-
-        return {
-            "weight_bonus": {
-                "min_weight_kg": self._to_float_or_default(
-                    weight_raw.get("min_weight_kg") if isinstance(weight_raw, dict) else None,
-                    float(default_rules["weight_bonus"]["min_weight_kg"]),
-                ),
-                "distance_points_multiplier": self._to_float_or_default(
-                    weight_raw.get("distance_points_multiplier") if isinstance(weight_raw, dict) else None,
-                    float(default_rules["weight_bonus"]["distance_points_multiplier"]),
-                ),
-            },
-            "elevation_bonus": {
-                "meters_step": self._to_int_or_default(
-                    elevation_raw.get("meters_step") if isinstance(elevation_raw, dict) else None,
-                    int(default_rules["elevation_bonus"]["meters_step"]),
-                ),
-                "points_per_step": self._to_int_or_default(
-                    elevation_raw.get("points_per_step") if isinstance(elevation_raw, dict) else None,
-                    int(default_rules["elevation_bonus"]["points_per_step"]),
-                ),
-            },
-        }
-
-    def _get_points_rules(self, challenge_id: Optional[int]) -> dict[str, Any]:
-        if challenge_id is None:
-            return self._normalize_points_rules(None)
-
+    def _get_points_rules(self, challenge_id: Optional[int]) -> CompiledPointsRules:
         if challenge_id in self._points_rules_cache:
             return self._points_rules_cache[challenge_id]
 
         raw_points_rules: Optional[dict[str, Any]] = None
-        if self.api_manager:
+        if challenge_id is not None and self.api_manager:
             try:
                 challenge = self.api_manager.get_challenge(challenge_id)
-                if isinstance(challenge.rules, dict):
-                    raw_points_rules = challenge.rules.get("points_rules")
+                raw_points_rules = challenge_points_rules(challenge.rules)
             except Exception:
                 logger.warning(
                     "Failed to fetch challenge points_rules from API, using defaults",
@@ -305,9 +257,13 @@ class BotOrchestrator:
                     extra={"challenge_id": challenge_id},
                 )
 
-        effective_rules = self._normalize_points_rules(raw_points_rules)
-        self._points_rules_cache[challenge_id] = effective_rules
-        return effective_rules
+        compiled = compile_points_rules(
+            self._get_activity_types(challenge_id=challenge_id),
+            raw_points_rules,
+            defaults=config_manager.get_points_rules(),
+        )
+        self._points_rules_cache[challenge_id] = compiled
+        return compiled
 
     def _create_unique_id(self, message: discord.Message) -> str:
         """
@@ -1412,50 +1368,15 @@ class BotOrchestrator:
         challenge_id: Optional[int] = None,
     ) -> tuple[dict[str, int], str]:
         """Zwraca spójny breakdown punktów i ich sumę dla aktywności."""
-        activity_types = self._get_activity_types(challenge_id=challenge_id)
-        if activity_type not in activity_types:
+        rules = self._get_points_rules(challenge_id)
+        activity_info = rules.get(activity_type)
+        if activity_info is None:
             return {}, f"Nieznany typ aktywności: {activity_type}"
 
-        activity_info = activity_types[activity_type]
-        min_distance = activity_info.get("min_distance", 0)
-        if distance < min_distance:
-            return {}, f"Minimalny dystans dla {activity_info['display_name']}: {min_distance} km"
-
-        base_points_rate = activity_info["base_points"]
-        base_points = int(distance * base_points_rate)
-        bonuses = activity_info.get("bonuses", [])
-        points_rules = self._get_points_rules(challenge_id)
-
-        weight_bonus_points = 0
-        weight_bonus_cfg = points_rules.get("weight_bonus", {})
-        min_weight_kg = float(weight_bonus_cfg.get("min_weight_kg", 5))
-        distance_multiplier = float(weight_bonus_cfg.get("distance_points_multiplier", 1.5))
-        if (
-            weight
-            and weight >= min_weight_kg
-            and "obciążenie" in bonuses
-            and distance_multiplier > 1
-        ):
-            weight_bonus_points = int(base_points * (distance_multiplier - 1))
-
-        elevation_bonus_points = 0
-        elevation_bonus_cfg = points_rules.get("elevation_bonus", {})
-        meters_step = int(elevation_bonus_cfg.get("meters_step", 50))
-        points_per_step = int(elevation_bonus_cfg.get("points_per_step", 500))
-        if elevation and elevation > 0 and "przewyższenie" in bonuses and meters_step > 0:
-            elevation_bonus_points = int(elevation // meters_step) * points_per_step
-
-        total_points = base_points + weight_bonus_points + elevation_bonus_points
-        if total_points < 1:
-            base_points = 1
-            total_points = 1
-
-        return {
-            "base_points": base_points,
-            "weight_bonus_points": weight_bonus_points,
-            "elevation_bonus_points": elevation_bonus_points,
-            "total_points": total_points,
-        }, ""
+        if distance < activity_info.min_distance:
+            return {}, f"Minimalny dystans dla {activity_info.display_name}: {activity_info.min_distance} km"
+
+        return rules.score(activity_type, distance, weight, elevation), ""
 
     def calculate_points(
         self,
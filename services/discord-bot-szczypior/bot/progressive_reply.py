@@ -0,0 +1,147 @@
+"""Odpowiedz Discord publikowana od razu po ekstrakcji i edytowana w trakcie generowania komentarza."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Optional
+
+import discord
+
+from utils.metrics import STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+DISCORD_MESSAGE_LIMIT = 2000
+WRITING_MARKER = "✍️"
+
+
+class ProgressiveReply:
+    """Implementacja `ai.progress.CommentProgress` dla jednej wiadomosci Discord.
+
+    `preview` i `partial` tylko zapamietuja najnowszy tekst; wysylka (pierwsza
+    odpowiedz, potem edycje) dzieje sie w osobnym tasku nie czesciej niz co
+    `min_edit_interval_seconds`, wiec strumien z modelu nie czeka na REST
+    Discorda, a kolejne edycje mieszcza sie w limicie kanalu (5 na 5 s).
+    """
+
+    def __init__(
+        self,
+        message: discord.Message,
+        min_edit_interval_seconds: float = 1.0,
+        started_at: Optional[float] = None,
+    ) -> None:
+        self._message = message
+        self._min_edit_interval_seconds = max(0.0, min_edit_interval_seconds)
+        self._started_at = time.perf_counter() if started_at is None else started_at
+        self._summary = ""
+        self._comment = ""
+        self._reply: Optional[Any] = None
+        self._sent_text = ""
+        self._dirty = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._closed = False
+        self._sender: Optional[asyncio.Task[None]] = None
+        self.edits = 0
+
+    @classmethod
+    def from_env(cls, message: discord.Message, started_at: Optional[float] = None) -> "ProgressiveReply":
+        return cls(
+            message,
+            min_edit_interval_seconds=float(os.getenv("BOT_STREAM_EDIT_INTERVAL_SECONDS", "1.0")),
+            started_at=started_at,
+        )
+
+    @property
+    def has_reply(self) -> bool:
+        return self._reply is not None
+
+    async def preview(self, summary: str) -> None:
+        self._summary = summary
+        self._mark_dirty()
+
+    async def partial(self, comment: str) -> None:
+        self._comment = comment
+        self._mark_dirty()
+
+    async def finish(self, text: Optional[str] = None, embed: Optional[discord.Embed] = None) -> bool:
+        """Zatrzymuje strumien i ustawia ostateczna tresc. Zwraca False, gdy nic nie opublikowano."""
+        await self._stop_sender()
+        if self._reply is None:
+            return False
+        try:
+            if embed is not None:
+                await self._reply.edit(content=self._summary or None, embed=embed)
+            else:
+                await self._edit(self._render(text if text is not None else self._comment, writing=False))
+        except Exception:
+            logger.warning("Could not finalize streamed reply", exc_info=True, extra={"message_id": self._message.id})
+        return True
+
+    async def abort(self) -> None:
+        """Usuwa opublikowana czesciowa odpowiedz (np. gdy przetwarzanie sie nie powiodlo)."""
+        await self._stop_sender()
+        if self._reply is None:
+            return
+        try:
+            await self._reply.delete()
+        except Exception:
+            logger.warning("Could not delete streamed reply", exc_info=True, extra={"message_id": self._message.id})
+        self._reply = None
+
+    def _mark_dirty(self) -> None:
+        if self._closed:
+            return
+        self._dirty.set()
+        if self._sender is None:
+            self._sender = asyncio.create_task(self._send_loop())
+
+    def _render(self, comment: str, writing: bool) -> str:
+        lines = [line for line in (self._summary, comment.strip()) if line]
+        text = "\n\n".join(lines)
+        if writing:
+            text = f"{text} {WRITING_MARKER}" if text else WRITING_MARKER
+        return text[:DISCORD_MESSAGE_LIMIT]
+
+    async def _send_loop(self) -> None:
+        while True:
+            await self._dirty.wait()
+            if self._closed:
+                return
+            self._dirty.clear()
+            text = self._render(self._comment, writing=True)
+            try:
+                if self._reply is None:
+                    self._reply = await self._message.reply(text)
+                    self._sent_text = text
+                    STAGE_DURATION.observe(time.perf_counter() - self._started_at, stage="first_feedback")
+                else:
+                    await self._edit(text)
+            except Exception:
+                logger.warning(
+                    "Could not update streamed reply", exc_info=True, extra={"message_id": self._message.id}
+                )
+            try:
+                # Throttle edits, but wake up at once when the stream is closed.
+                await asyncio.wait_for(self._closing.wait(), timeout=self._min_edit_interval_seconds)
+                return
+            except TimeoutError:
+                pass
+
+    async def _edit(self, text: str) -> None:
+        if text == self._sent_text:
+            return
+        await self._reply.edit(content=text)
+        self._sent_text = text
+        self.edits += 1
+
+    async def _stop_sender(self) -> None:
+        # No cancel: an in-flight first reply must finish, or finish() would post a second one.
+        self._closed = True
+        self._closing.set()
+        self._dirty.set()
+        if self._sender is not None:
+            sender, self._sender = self._sender, None
+            await sender
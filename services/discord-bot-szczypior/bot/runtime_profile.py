@@ -0,0 +1,136 @@
+"""Profil pamieci klienta discord.py i zawezenie bota do kanalow challenge'y.
+
+BOT_MEMORY_PROFILE=low (np. maly Fly machine): maly cache wiadomosci, brak
+cache czlonkow i chunkingu gildii, wylaczone intenty, ktorych bot nie uzywa.
+BOT_MEMORY_PROFILE=default zachowuje ustawienia discord.py.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Intents that only feed caches or events the bot never handles.
+LOW_MEMORY_DISABLED_INTENTS = (
+    "typing",
+    "voice_states",
+    "invites",
+    "integrations",
+    "webhooks",
+    "emojis_and_stickers",
+)
+
+
+@dataclass(slots=True)
+class BotRuntimeProfile:
+    """Parametry `commands.Bot` zalezne od profilu pamieci."""
+
+    name: str = "default"
+    max_messages: Optional[int] = 1000
+    cache_members: bool = True
+    chunk_guilds_at_startup: Optional[bool] = None
+    disabled_intents: tuple[str, ...] = ()
+
+    @classmethod
+    def from_env(cls) -> "BotRuntimeProfile":
+        name = os.getenv("BOT_MEMORY_PROFILE", "default").strip().lower()
+        if name == "low":
+            # Edits are only dispatched for cached messages, so keep a small window of recent ones.
+            profile = cls(
+                name="low",
+                max_messages=200,
+                cache_members=False,
+                chunk_guilds_at_startup=False,
+                disabled_intents=LOW_MEMORY_DISABLED_INTENTS,
+            )
+        else:
+            profile = cls()
+        raw_max_messages = os.getenv("BOT_MAX_MESSAGES")
+        if raw_max_messages is not None:
+            # 0 disables the message cache entirely (discord.py expects None for that).
+            profile.max_messages = int(raw_max_messages) or None
+        return profile
+
+    def apply_intents(self, intents: discord.Intents) -> discord.Intents:
+        for intent in self.disabled_intents:
+            setattr(intents, intent, False)
+        return intents
+
+    def bot_kwargs(self) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {"max_messages": self.max_messages}
+        if not self.cache_members:
+            kwargs["member_cache_flags"] = discord.MemberCacheFlags.none()
+        if self.chunk_guilds_at_startup is not None:
+            kwargs["chunk_guilds_at_startup"] = self.chunk_guilds_at_startup
+        return kwargs
+
+
+def _parse_ids(raw: str) -> set[int]:
+    return {int(part) for part in raw.replace(";", ",").split(",") if part.strip().isdigit()}
+
+
+@dataclass(slots=True)
+class ChannelScope:
+    """Kanaly obslugiwane przez bota: BOT_ALLOWED_CHANNEL_IDS + kanaly aktywnych challenge'y.
+
+    Kanaly challenge'y zawezaja obsluge tylko przy `enabled` (domyslnie w
+    profilu low, BOT_SCOPE_TO_CHALLENGE_CHANNELS). Pusty zbior oznacza brak
+    ograniczenia, jak dotad. Watki sa dopuszczane po kanale nadrzednym.
+    """
+
+    static_ids: set[int] = field(default_factory=set)
+    challenge_ids: set[int] = field(default_factory=set)
+    enabled: bool = False
+    refresh_interval_seconds: float = 600.0
+    stale: bool = True
+    refreshed_at: float = 0.0
+
+    @classmethod
+    def from_env(cls, profile: Optional[BotRuntimeProfile] = None) -> "ChannelScope":
+        default_enabled = "1" if profile is not None and profile.name == "low" else "0"
+        return cls(
+            static_ids=_parse_ids(os.getenv("BOT_ALLOWED_CHANNEL_IDS", "")),
+            enabled=os.getenv("BOT_SCOPE_TO_CHALLENGE_CHANNELS", default_enabled).strip().lower()
+            not in {"0", "false", "no"},
+            refresh_interval_seconds=float(os.getenv("BOT_CHANNEL_SCOPE_REFRESH_SECONDS", "600")),
+        )
+
+    @property
+    def channel_ids(self) -> set[int]:
+        return self.static_ids | self.challenge_ids if self.enabled else set(self.static_ids)
+
+    @property
+    def needs_refresh(self) -> bool:
+        # Challenges also start and end on their own, not only when someone edits them.
+        return self.enabled and (self.stale or time.monotonic() - self.refreshed_at > self.refresh_interval_seconds)
+
+    def mark_stale(self) -> None:
+        self.stale = True
+
+    def mark_refreshed(self) -> None:
+        self.stale = False
+        self.refreshed_at = time.monotonic()
+
+    def update_from_challenges(self, challenges: Iterable[Any]) -> None:
+        self.challenge_ids = {
+            int(challenge.discord_channel_id)
+            for challenge in challenges
+            if str(getattr(challenge, "discord_channel_id", "") or "").isdigit()
+        }
+        self.mark_refreshed()
+        logger.info("Channel scope updated", extra={"channel_ids": sorted(self.channel_ids)})
+
+    def allows(self, channel: Any) -> bool:
+        allowed = self.channel_ids
+        if not allowed:
+            return True
+        if getattr(channel, "id", None) in allowed:
+            return True
+        return getattr(channel, "parent_id", None) in allowed
@@ -0,0 +1,234 @@
+"""Kolejka priorytetowa miedzy eventami Discord a pipeline'em AI."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from ai.rate_limiter import RequestPriority
+from utils.metrics import STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class JobDropped(Exception):
+    """Zadanie zostalo odrzucone lub wyparte z kolejki przy przeciazeniu."""
+
+
+@dataclass(slots=True, order=True)
+class _Job:
+    priority: int
+    sequence: int
+    author_id: str = field(compare=False)
+    factory: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future[Any] = field(compare=False)
+    enqueued_at: float = field(compare=False)
+
+
+@dataclass(slots=True)
+class _PriorityStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    service_seconds_total: float = 0.0
+    service_seconds_max: float = 0.0
+
+
+class MessageScheduler:
+    """Ograniczona kolejka priorytetowa z pula workerow AI.
+
+    - LIVE > BACKLOG > EDIT; przy pelnej kolejce nowe zadanie wypiera najgorsze
+      zadanie o nizszym priorytecie, a gdy takiego nie ma, jest odrzucane.
+      BACKLOG zamiast odrzucenia czeka na miejsce (backpressure dla startup sync).
+    - Zadania jednego autora wykonuja sie sekwencyjnie, w kolejnosci pobrania.
+      Zadania czekajace na zajetego autora wliczaja sie do limitu kolejki.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 200) -> None:
+        self._worker_count = max(1, workers)
+        self._max_queue = max(1, max_queue)
+        self._heap: list[_Job] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Condition()
+        self._active_authors: set[str] = set()
+        self._author_pending: dict[str, deque[_Job]] = {}
+        self._pending_count = 0
+        self._workers: list[asyncio.Task[None]] = []
+        self._in_flight = 0
+        self._stats = {priority: _PriorityStats() for priority in RequestPriority}
+
+    @classmethod
+    def from_env(cls) -> "MessageScheduler":
+        return cls(
+            workers=int(os.getenv("BOT_AI_WORKERS", "4")),
+            max_queue=int(os.getenv("BOT_AI_QUEUE_SIZE", "200")),
+        )
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker_loop(), name=f"ai-worker-{index}")
+            for index in range(self._worker_count)
+        ]
+        logger.info("AI scheduler started", extra={"workers": self._worker_count, "max_queue": self._max_queue})
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        *,
+        author_id: str,
+        priority: RequestPriority = RequestPriority.LIVE,
+    ) -> Optional[asyncio.Future[Any]]:
+        """Kolejkuje zadanie; zwraca future wyniku albo None, gdy zadanie odrzucono."""
+        job = _Job(
+            priority=int(priority),
+            sequence=next(self._sequence),
+            author_id=author_id,
+            factory=factory,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic(),
+        )
+        stats = self._stats[priority]
+        stats.submitted += 1
+
+        async with self._changed:
+            if self._queued() >= self._max_queue:
+                if priority == RequestPriority.BACKLOG:
+                    await self._changed.wait_for(lambda: self._queued() < self._max_queue)
+                elif not self._evict_lower_than(priority):
+                    stats.dropped += 1
+                    logger.warning(
+                        "AI queue full, dropping job",
+                        extra={"priority": priority.name, "author_id": author_id, "queue_depth": self._queued()},
+                    )
+                    return None
+
+            job.enqueued_at = time.monotonic()
+            heapq.heappush(self._heap, job)
+            self._changed.notify_all()
+        return job.future
+
+    def _queued(self) -> int:
+        return len(self._heap) + self._pending_count
+
+    def _evict_lower_than(self, priority: RequestPriority) -> bool:
+        pending_jobs = (job for jobs in self._author_pending.values() for job in jobs)
+        worst = max(itertools.chain(self._heap, pending_jobs), default=None)
+        if worst is None or worst.priority <= priority:
+            return False
+        author_jobs = self._author_pending.get(worst.author_id)
+        if author_jobs is not None and worst in author_jobs:
+            author_jobs.remove(worst)
+            self._pending_count -= 1
+        else:
+            self._heap.remove(worst)
+            heapq.heapify(self._heap)
+        evicted_priority = RequestPriority(worst.priority)
+        self._stats[evicted_priority].dropped += 1
+        if not worst.future.done():
+            worst.future.set_exception(JobDropped(f"Evicted by {priority.name} job"))
+            # Nobody may await an evicted backlog/edit future; mark the exception retrieved.
+            worst.future.exception()
+        logger.warning(
+            "AI queue full, evicted lower-priority job",
+            extra={"evicted_priority": evicted_priority.name, "author_id": worst.author_id},
+        )
+        return True
+
+    async def _worker_loop(self) -> None:
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: bool(self._heap))
+                job = heapq.heappop(self._heap)
+                self._changed.notify_all()
+                if job.author_id in self._active_authors:
+                    # Another worker is busy with this author; it will pick this up next.
+                    self._author_pending.setdefault(job.author_id, deque()).append(job)
+                    self._pending_count += 1
+                    continue
+                self._active_authors.add(job.author_id)
+
+            while job is not None:
+                await self._run(job)
+                async with self._changed:
+                    pending = self._author_pending.get(job.author_id)
+                    if pending:
+                        job = pending.popleft()
+                        self._pending_count -= 1
+                        self._changed.notify_all()
+                    else:
+                        self._author_pending.pop(job.author_id, None)
+                        self._active_authors.discard(job.author_id)
+                        job = None
+
+    async def _run(self, job: _Job) -> None:
+        stats = self._stats[RequestPriority(job.priority)]
+        started = time.monotonic()
+        waited = started - job.enqueued_at
+        stats.wait_seconds_total += waited
+        stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+        STAGE_DURATION.observe(waited, stage="queue_wait")
+        self._in_flight += 1
+        try:
+            result = await job.factory()
+        except Exception as exc:
+            stats.failed += 1
+            logger.error(
+                "AI job failed",
+                exc_info=True,
+                extra={"priority": RequestPriority(job.priority).name, "author_id": job.author_id},
+            )
+            if not job.future.done():
+                job.future.set_exception(exc)
+                job.future.exception()
+        else:
+            stats.completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            service = time.monotonic() - started
+            stats.service_seconds_total += service
+            stats.service_seconds_max = max(stats.service_seconds_max, service)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Glebokosc kolejki oraz czasy oczekiwania i obslugi per priorytet."""
+        by_priority: dict[str, dict[str, Any]] = {}
+        pending_jobs = [job for jobs in self._author_pending.values() for job in jobs]
+        for priority, stats in self._stats.items():
+            finished = stats.completed + stats.failed
+            by_priority[priority.name.lower()] = {
+                "queued": sum(1 for job in itertools.chain(self._heap, pending_jobs) if job.priority == priority),
+                "submitted": stats.submitted,
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "dropped": stats.dropped,
+                "avg_wait_seconds": round(stats.wait_seconds_total / finished, 3) if finished else 0.0,
+                "max_wait_seconds": round(stats.wait_seconds_max, 3),
+                "avg_service_seconds": round(stats.service_seconds_total / finished, 3) if finished else 0.0,
+                "max_service_seconds": round(stats.service_seconds_max, 3),
+            }
+        return {
+            "queue_depth": self._queued(),
+            "author_pending": self._pending_count,
+            "in_flight": self._in_flight,
+            "workers": len(self._workers),
+            "priorities": by_priority,
+        }
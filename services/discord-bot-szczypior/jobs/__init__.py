@@ -0,0 +1,18 @@
+"""Kolejka zadan AI dla trybu rozdzielonego: gateway Discord + skalowane poziomo workery.
+
+BOT_MODE=gateway - proces Discord tylko filtruje wiadomosci, wstawia zadania
+i stosuje wyniki (reakcje, odpowiedzi). BOT_MODE=worker - proces bez Discorda
+uruchamia graf AI dla zadan z kolejki. BOT_MODE=single (domyslnie) - jak dotad.
+"""
+
+from .queue import AIJob, AIJobResult, InMemoryJobQueue, JobDelivery, JobQueue, build_job_id, job_queue_from_env
+
+__all__ = [
+    "AIJob",
+    "AIJobResult",
+    "InMemoryJobQueue",
+    "JobDelivery",
+    "JobQueue",
+    "build_job_id",
+    "job_queue_from_env",
+]
@@ -0,0 +1,100 @@
+"""Strona gateway: `AIMessageProcessor`, ktory zleca przetwarzanie workerom przez kolejke."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from jobs.queue import AIJob, AIJobResult, JobQueue
+
+try:
+    from bot.message_handler import AIProcessingRequest, AIProcessingResult  # pyright: ignore[reportMissingImports]
+except ImportError:
+    from message_handler import AIProcessingRequest, AIProcessingResult  # pyright: ignore[reportMissingImports]
+
+logger = logging.getLogger(__name__)
+
+
+class AIJobFailedError(RuntimeError):
+    """Worker zakonczyl zadanie bledem; tresc bledu pochodzi z `AIJobResult.error`."""
+
+
+class QueueAIMessageProcessor:
+    """Wstawia `AIProcessingRequest` do kolejki i czeka na wynik od dowolnego workera.
+
+    Wyniki czyta jeden task nasluchujacy (`start`) i rozdziela je po job_id do
+    oczekujacych futures. Wynik bez oczekujacego (np. po restarcie gateway)
+    jest tylko logowany - wiadomosc i tak zostanie pominieta po iid.
+    Strumieniowanie komentarza (`request.progress`) nie przechodzi przez kolejke.
+    """
+
+    def __init__(self, queue: JobQueue, result_timeout_seconds: float = 300.0) -> None:
+        self._queue = queue
+        self._result_timeout_seconds = result_timeout_seconds
+        self._waiting: dict[str, list[asyncio.Future[AIJobResult]]] = {}
+        self._listener: Optional[asyncio.Task[None]] = None
+
+    @classmethod
+    def from_env(cls, queue: JobQueue) -> "QueueAIMessageProcessor":
+        return cls(queue, result_timeout_seconds=float(os.getenv("BOT_JOB_RESULT_TIMEOUT_SECONDS", "300")))
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+            # Let the listener subscribe before the first job is enqueued.
+            await asyncio.sleep(0)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._queue.close()
+
+    async def process_message(self, request: AIProcessingRequest) -> AIProcessingResult:
+        job = AIJob.from_request(request)
+        future: asyncio.Future[AIJobResult] = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(job.job_id, []).append(future)
+        try:
+            await self._queue.enqueue(job)
+            result = await self._wait_for_result(job.job_id, future)
+        finally:
+            waiting = self._waiting.get(job.job_id, [])
+            if future in waiting:
+                waiting.remove(future)
+            if not waiting:
+                self._waiting.pop(job.job_id, None)
+
+        if result.status == "failed":
+            raise AIJobFailedError(result.error or "AI worker failed")
+        return AIProcessingResult(
+            status=result.status,
+            reaction=result.reaction,
+            reply_text=result.reply_text,
+            reply_embed=result.reply_embed,
+        )
+
+    async def _wait_for_result(self, job_id: str, future: asyncio.Future[AIJobResult]) -> AIJobResult:
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self._result_timeout_seconds)
+        except TimeoutError:
+            # The listener may have missed it (e.g. while reconnecting); the stored result is authoritative.
+            stored = await self._queue.completed_result(job_id)
+            if stored is None:
+                raise
+            return stored
+
+    async def _listen(self) -> None:
+        async for result in self._queue.results():
+            futures = self._waiting.get(result.job_id)
+            if not futures:
+                logger.info("AI job result without a waiting request", extra={"job_id": result.job_id})
+                continue
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
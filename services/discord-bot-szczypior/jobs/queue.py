@@ -0,0 +1,200 @@
+"""Kolejka zadan AI miedzy procesem gateway a workerami (tryb BOT_MODE=gateway/worker).
+
+Semantyka at-least-once: zadanie pobrane przez workera, ktore nie zostalo
+potwierdzone (`complete`) w ciagu `claim_idle_seconds`, trafia ponownie do
+kolejki. Identyfikator zadania pochodzi od iid wiadomosci, a wynik zapisany
+pod nim pozwala workerowi odeslac gotowy wynik zamiast ponownie uruchamiac graf.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Protocol
+
+from ai.rate_limiter import RequestPriority
+
+logger = logging.getLogger(__name__)
+
+
+def build_job_id(request: dict[str, Any]) -> str:
+    """iid wiadomosci (jak w ai.graphs) + skrot tresci, zeby edycja byla nowym zadaniem, a redelivery nie."""
+    created_at = request.get("created_at")
+    timestamp = int(datetime.fromisoformat(created_at).timestamp()) if created_at else 0
+    content = "\x1f".join([request.get("content") or "", *(request.get("image_urls") or [])])
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+    return f"{timestamp}_{request.get('message_id')}:{digest}"
+
+
+@dataclass(slots=True)
+class AIJob:
+    """Zadanie AI: serializowalny `AIProcessingRequest` (bez obiektow procesu, np. progress)."""
+
+    job_id: str
+    request: dict[str, Any]
+    priority: str = "live"
+    enqueued_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_request(cls, request: Any) -> "AIJob":
+        payload = dict(request) if isinstance(request, dict) else asdict(request)
+        payload.pop("progress", None)
+        priority = RequestPriority.parse(payload.get("priority")).name.lower()
+        payload["priority"] = priority
+        return cls(job_id=build_job_id(payload), request=payload, priority=priority)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "AIJob":
+        return cls(**json.loads(raw))
+
+
+@dataclass(slots=True)
+class AIJobResult:
+    """Wynik zadania odsylany do gateway; `status="failed"` niesie opis bledu w `error`."""
+
+    job_id: str
+    status: str
+    reaction: Optional[str] = None
+    reply_text: Optional[str] = None
+    reply_embed: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "AIJobResult":
+        return cls(**json.loads(raw))
+
+
+@dataclass(slots=True)
+class JobDelivery:
+    """Zadanie pobrane przez workera; `receipt` identyfikuje je w backendzie przy potwierdzeniu."""
+
+    job: AIJob
+    receipt: Any
+    deliveries: int = 1
+
+
+class JobQueue(Protocol):
+    async def enqueue(self, job: AIJob) -> None:
+        ...
+
+    async def consume(self, consumer: str, block_seconds: float = 5.0) -> Optional[JobDelivery]:
+        """Nastepne zadanie (najpierw przeterminowane niepotwierdzone, potem wg priorytetu) albo None."""
+        ...
+
+    async def complete(self, delivery: JobDelivery, result: AIJobResult) -> None:
+        """Zapisuje wynik pod job_id, publikuje go dla gateway i potwierdza zadanie."""
+        ...
+
+    async def completed_result(self, job_id: str) -> Optional[AIJobResult]:
+        ...
+
+    def results(self) -> AsyncIterator[AIJobResult]:
+        """Strumien wynikow publikowanych od momentu subskrypcji (strona gateway)."""
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class InMemoryJobQueue:
+    """Backend w pamieci procesu o tej samej semantyce co Redis Streams (testy, bench, tryb lokalny)."""
+
+    def __init__(self, claim_idle_seconds: float = 60.0) -> None:
+        self._claim_idle_seconds = claim_idle_seconds
+        self._streams: dict[RequestPriority, deque[tuple[int, AIJob]]] = {
+            priority: deque() for priority in RequestPriority
+        }
+        self._pending: dict[int, tuple[AIJob, float, int]] = {}
+        self._deliveries: dict[int, int] = {}
+        self._stored_results: dict[str, AIJobResult] = {}
+        self._subscribers: list[asyncio.Queue[AIJobResult]] = []
+        self._ids = itertools.count(1)
+        self._changed = asyncio.Condition()
+
+    async def enqueue(self, job: AIJob) -> None:
+        async with self._changed:
+            self._streams[RequestPriority.parse(job.priority)].append((next(self._ids), job))
+            self._changed.notify_all()
+
+    async def consume(self, consumer: str, block_seconds: float = 5.0) -> Optional[JobDelivery]:
+        deadline = time.monotonic() + block_seconds
+        async with self._changed:
+            while True:
+                delivery = self._next_delivery()
+                if delivery is not None:
+                    return delivery
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                try:
+                    # Wakes up for new jobs, and at least once per idle window for stale ones.
+                    await asyncio.wait_for(self._changed.wait(), timeout=min(remaining, self._claim_idle_seconds))
+                except TimeoutError:
+                    pass
+
+    async def complete(self, delivery: JobDelivery, result: AIJobResult) -> None:
+        self._stored_results[result.job_id] = result
+        self._pending.pop(delivery.receipt, None)
+        self._deliveries.pop(delivery.receipt, None)
+        for subscriber in list(self._subscribers):
+            subscriber.put_nowait(result)
+
+    async def completed_result(self, job_id: str) -> Optional[AIJobResult]:
+        return self._stored_results.get(job_id)
+
+    async def results(self) -> AsyncIterator[AIJobResult]:
+        subscriber: asyncio.Queue[AIJobResult] = asyncio.Queue()
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                yield await subscriber.get()
+        finally:
+            self._subscribers.remove(subscriber)
+
+    async def close(self) -> None:
+        return None
+
+    def _next_delivery(self) -> Optional[JobDelivery]:
+        now = time.monotonic()
+        for receipt, (job, delivered_at, _) in self._pending.items():
+            if now - delivered_at >= self._claim_idle_seconds:
+                return self._deliver(receipt, job, now)
+        for priority in RequestPriority:
+            if self._streams[priority]:
+                receipt, job = self._streams[priority].popleft()
+                return self._deliver(receipt, job, now)
+        return None
+
+    def _deliver(self, receipt: int, job: AIJob, now: float) -> JobDelivery:
+        deliveries = self._deliveries.get(receipt, 0) + 1
+        self._deliveries[receipt] = deliveries
+        self._pending[receipt] = (job, now, deliveries)
+        return JobDelivery(job=job, receipt=receipt, deliveries=deliveries)
+
+
+def job_queue_from_env() -> JobQueue:
+    """BOT_JOB_QUEUE=redis (domyslnie, REDIS_URL) albo memory (gateway i worker w jednym procesie)."""
+    backend = os.getenv("BOT_JOB_QUEUE", "redis").strip().lower()
+    claim_idle_seconds = float(os.getenv("BOT_JOB_CLAIM_IDLE_SECONDS", "120"))
+    if backend == "memory":
+        return InMemoryJobQueue(claim_idle_seconds=claim_idle_seconds)
+    if backend != "redis":
+        raise ValueError(f"Unsupported BOT_JOB_QUEUE backend: {backend!r}")
+
+    from jobs.redis_queue import RedisStreamJobQueue
+
+    return RedisStreamJobQueue.from_env()
@@ -0,0 +1,176 @@
+"""Backend kolejki zadan AI na Redis Streams (consumer group, XAUTOCLAIM, XACK + XDEL).
+
+Uklad kluczy (prefiks `BOT_JOB_PREFIX`, domyslnie `szczypior`):
+- `{prefix}:jobs:{live|backlog|edit}` - strumienie zadan, jeden na priorytet (zakonczone
+  zadania sa usuwane, wiec zostaja tylko oczekujace),
+- `{prefix}:results` - strumien wynikow czytany przez gateway (XREAD od `$`),
+- `{prefix}:result:{job_id}` - zapisany wynik (TTL) do idempotencji redelivery.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Optional
+
+from ai.rate_limiter import RequestPriority
+from jobs.queue import AIJob, AIJobResult, JobDelivery
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "ai-workers"
+
+
+def _import_redis() -> Any:
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError as exc:
+        raise RuntimeError(
+            "BOT_JOB_QUEUE=redis requires the 'redis' package (pip install 'redis>=5.0')"
+        ) from exc
+    return redis_asyncio
+
+
+class RedisStreamJobQueue:
+    """Implementacja `jobs.queue.JobQueue` na Redis Streams.
+
+    Zadanie pobrane przez workera zostaje w PEL grupy do XACK; po
+    `claim_idle_seconds` bez potwierdzenia przejmuje je inny worker (XAUTOCLAIM).
+    Wynik, publikacja i XACK ida w jednej transakcji MULTI.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "szczypior",
+        claim_idle_seconds: float = 120.0,
+        result_ttl_seconds: int = 86400,
+        results_maxlen: int = 10000,
+    ) -> None:
+        self._client = client
+        self._prefix = prefix
+        self._claim_idle_ms = int(claim_idle_seconds * 1000)
+        self._result_ttl_seconds = result_ttl_seconds
+        self._results_maxlen = results_maxlen
+        self._streams = {priority: f"{prefix}:jobs:{priority.name.lower()}" for priority in RequestPriority}
+        self._results_stream = f"{prefix}:results"
+        self._groups_ready = False
+        self._buffered: deque[JobDelivery] = deque()
+        self._last_claim_check = 0.0
+
+    @classmethod
+    def from_env(cls) -> "RedisStreamJobQueue":
+        redis_asyncio = _import_redis()
+        client = redis_asyncio.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+        return cls(
+            client,
+            prefix=os.getenv("BOT_JOB_PREFIX", "szczypior"),
+            claim_idle_seconds=float(os.getenv("BOT_JOB_CLAIM_IDLE_SECONDS", "120")),
+            result_ttl_seconds=int(os.getenv("BOT_JOB_RESULT_TTL_SECONDS", "86400")),
+        )
+
+    def _result_key(self, job_id: str) -> str:
+        return f"{self._prefix}:result:{job_id}"
+
+    async def _ensure_groups(self) -> None:
+        if self._groups_ready:
+            return
+        redis_asyncio = _import_redis()
+        for stream in self._streams.values():
+            try:
+                await self._client.xgroup_create(stream, CONSUMER_GROUP, id="0", mkstream=True)
+            except redis_asyncio.ResponseError as exc:
+                if "BUSYGROUP" not in str(exc):
+                    raise
+        self._groups_ready = True
+
+    async def enqueue(self, job: AIJob) -> None:
+        stream = self._streams[RequestPriority.parse(job.priority)]
+        await self._client.xadd(stream, {"job": job.to_json()})
+
+    async def consume(self, consumer: str, block_seconds: float = 5.0) -> Optional[JobDelivery]:
+        await self._ensure_groups()
+        if self._buffered:
+            return self._buffered.popleft()
+
+        now = time.monotonic()
+        if now - self._last_claim_check >= self._claim_idle_ms / 1000:
+            self._last_claim_check = now
+            claimed = await self._claim_stale(consumer)
+            if claimed is not None:
+                return claimed
+
+        # Priority order first (non-blocking), then block on all streams at once.
+        for stream in self._streams.values():
+            response = await self._client.xreadgroup(CONSUMER_GROUP, consumer, {stream: ">"}, count=1)
+            self._buffer_entries(response, deliveries=1)
+            if self._buffered:
+                return self._buffered.popleft()
+
+        block_ms = max(1, int(block_seconds * 1000))
+        streams = {stream: ">" for stream in self._streams.values()}
+        response = await self._client.xreadgroup(CONSUMER_GROUP, consumer, streams, count=1, block=block_ms)
+        self._buffer_entries(response, deliveries=1)
+        return self._buffered.popleft() if self._buffered else None
+
+    async def _claim_stale(self, consumer: str) -> Optional[JobDelivery]:
+        for stream in self._streams.values():
+            response = await self._client.xautoclaim(
+                stream, CONSUMER_GROUP, consumer, min_idle_time=self._claim_idle_ms, start_id="0-0", count=1
+            )
+            entries = response[1] if len(response) > 1 else []
+            for entry_id, fields in entries:
+                if not fields:
+                    continue  # entry trimmed from the stream while pending
+                pending = await self._client.xpending_range(stream, CONSUMER_GROUP, min=entry_id, max=entry_id, count=1)
+                deliveries = int(pending[0]["times_delivered"]) if pending else 2
+                logger.warning(
+                    "Reclaimed stale AI job",
+                    extra={"stream": stream, "entry_id": entry_id, "deliveries": deliveries},
+                )
+                return JobDelivery(job=AIJob.from_json(fields["job"]), receipt=(stream, entry_id), deliveries=deliveries)
+        return None
+
+    def _buffer_entries(self, response: Any, deliveries: int) -> None:
+        for stream, entries in response or []:
+            for entry_id, fields in entries:
+                self._buffered.append(
+                    JobDelivery(job=AIJob.from_json(fields["job"]), receipt=(stream, entry_id), deliveries=deliveries)
+                )
+
+    async def complete(self, delivery: JobDelivery, result: AIJobResult) -> None:
+        stream, entry_id = delivery.receipt
+        payload = result.to_json()
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.set(self._result_key(result.job_id), payload, ex=self._result_ttl_seconds)
+            pipe.xadd(self._results_stream, {"result": payload}, maxlen=self._results_maxlen, approximate=True)
+            pipe.xack(stream, CONSUMER_GROUP, entry_id)
+            # The result is stored above; the job payload itself is no longer needed.
+            pipe.xdel(stream, entry_id)
+            await pipe.execute()
+
+    async def completed_result(self, job_id: str) -> Optional[AIJobResult]:
+        raw = await self._client.get(self._result_key(job_id))
+        return AIJobResult.from_json(raw) if raw else None
+
+    async def results(self) -> AsyncIterator[AIJobResult]:
+        last_id = "$"
+        while True:
+            try:
+                response = await self._client.xread({self._results_stream: last_id}, count=100, block=5000)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Reading AI job results failed", exc_info=True)
+                await asyncio.sleep(1.0)
+                continue
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    yield AIJobResult.from_json(fields["result"])
+
+    async def close(self) -> None:
+        await self._client.aclose()
@@ -0,0 +1,146 @@
+"""Bezstanowy worker AI: pobiera zadania z kolejki, uruchamia graf i odsyla wynik."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Awaitable, Callable, Optional
+
+from jobs.queue import AIJobResult, JobDelivery, JobQueue, job_queue_from_env
+
+logger = logging.getLogger(__name__)
+
+ProcessFn = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+def _default_process() -> ProcessFn:
+    from ai.services import invoke_message_analysis
+
+    return invoke_message_analysis
+
+
+class AIJobWorker:
+    """`concurrency` petli konsumujacych jedna kolejke; kazda obsluguje jedno zadanie naraz.
+
+    Redelivery zadania z zapisanym wynikiem odsyla ten wynik bez ponownego
+    uruchamiania grafu. Zadanie dostarczone wiecej niz `max_deliveries` razy
+    (np. zabijajace workera) konczy sie wynikiem `failed`.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        process: Optional[ProcessFn] = None,
+        concurrency: int = 4,
+        consumer: Optional[str] = None,
+        max_deliveries: int = 3,
+    ) -> None:
+        self._queue = queue
+        self._process = process
+        self._concurrency = max(1, concurrency)
+        self._consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._max_deliveries = max(1, max_deliveries)
+        self._tasks: list[asyncio.Task[None]] = []
+        self._stopping = asyncio.Event()
+        self.processed = 0
+        self.replayed = 0
+
+    @classmethod
+    def from_env(cls, queue: JobQueue) -> "AIJobWorker":
+        return cls(
+            queue,
+            concurrency=int(os.getenv("BOT_AI_WORKERS", "4")),
+            consumer=os.getenv("BOT_WORKER_NAME") or None,
+            max_deliveries=int(os.getenv("BOT_JOB_MAX_DELIVERIES", "3")),
+        )
+
+    async def start(self) -> None:
+        if self._process is None:
+            self._process = _default_process()
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._consume_loop(f"{self._consumer}-{index}")) for index in range(self._concurrency)
+        ]
+        logger.info("AI job worker started", extra={"consumer": self._consumer, "concurrency": self._concurrency})
+
+    async def stop(self) -> None:
+        """Konczy biezace zadania; niepobrane zostaja w kolejce dla innych workerow."""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _consume_loop(self, consumer: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                delivery = await self._queue.consume(consumer, block_seconds=1.0)
+            except Exception:
+                logger.error("Consuming AI jobs failed", exc_info=True, extra={"consumer": consumer})
+                await asyncio.sleep(1.0)
+                continue
+            if delivery is not None:
+                await self.handle(delivery)
+
+    async def handle(self, delivery: JobDelivery) -> AIJobResult:
+        job = delivery.job
+        existing = await self._queue.completed_result(job.job_id)
+        if existing is not None:
+            # Redelivered after the result was stored (e.g. crash between SET and XACK).
+            self.replayed += 1
+            await self._queue.complete(delivery, existing)
+            return existing
+
+        if delivery.deliveries > self._max_deliveries:
+            logger.error(
+                "AI job exceeded max deliveries",
+                extra={"job_id": job.job_id, "deliveries": delivery.deliveries},
+            )
+            result = AIJobResult(job_id=job.job_id, status="failed", error="max deliveries exceeded")
+        else:
+            result = await self._run(job.job_id, job.request)
+
+        await self._queue.complete(delivery, result)
+        self.processed += 1
+        return result
+
+    async def _run(self, job_id: str, request: dict[str, Any]) -> AIJobResult:
+        try:
+            raw = await self._process(request)
+        except Exception as exc:
+            logger.error("AI job failed", exc_info=True, extra={"job_id": job_id})
+            return AIJobResult(job_id=job_id, status="failed", error=f"{type(exc).__name__}: {exc}")
+
+        if not isinstance(raw, dict):
+            raw = {
+                key: getattr(raw, key, None) for key in ("status", "reaction", "reply_text", "reply_embed")
+            }
+        return AIJobResult(
+            job_id=job_id,
+            status=str(raw.get("status") or "ignored"),
+            reaction=raw.get("reaction"),
+            reply_text=raw.get("reply_text"),
+            reply_embed=raw.get("reply_embed"),
+        )
+
+
+async def run_worker() -> None:
+    """Punkt wejscia procesu workera (BOT_MODE=worker): bez polaczenia z Discordem."""
+    from api.outbox import get_activity_outbox
+
+    queue = job_queue_from_env()
+    worker = AIJobWorker.from_env(queue)
+    outbox = get_activity_outbox()
+    if outbox is not None:
+        await outbox.start()
+    await worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+        if outbox is not None:
+            await outbox.stop()
+        await queue.close()
+        from ai.images import close_image_resources
+
+        await close_image_resources()
@@ -1,16 +1,19 @@
 """Punkt wejściowy bota na Cloud Run.
 
 Uruchamia:
-1. HTTP health server wymagany przez Cloud Run,
-2. Discord bota.
+1. HTTP health server wymagany przez Cloud Run (oraz /metrics dla Prometheusa i /debug/memory),
+2. Discord bota albo, przy BOT_MODE=worker, workera AI czytającego kolejkę zadań (jobs/).
+
+`python run.py --startup-report` uruchamia start na sucho (bez łączenia z
+Discordem) pod `-X importtime` i wypisuje czasy faz oraz najcięższe importy.
 """
 
 import asyncio
+import json
 import os
+import subprocess
 import sys
 
-from aiohttp import web
-
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 BOT_DIR = os.path.join(ROOT_DIR, "bot")
 REPO_ROOT = os.path.abspath(os.path.join(ROOT_DIR, "..", ".."))
@@ -19,15 +22,42 @@ for path in (ROOT_DIR, BOT_DIR, REPO_ROOT):
     if path not in sys.path:
         sys.path.insert(0, path)
 
+# Stdlib-only; imported before aiohttp so startup marks are measured from process start.
+from utils.metrics import get_startup_marks, mark_startup  # noqa: E402
+from utils.memory import get_memory_reporter  # noqa: E402
+
+# Before the heavy imports, so BOT_TRACEMALLOC also attributes import-time allocations.
+get_memory_reporter().start_tracing()
+
+from aiohttp import web  # noqa: E402
+
+STARTUP_MARKS_PREFIX = "STARTUP_MARKS "
+
 
 async def health(request: web.Request) -> web.Response:
     return web.Response(text="ok")
 
 
+async def metrics(request: web.Request) -> web.Response:
+    from utils.metrics import REGISTRY
+
+    return web.Response(
+        text=REGISTRY.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def memory_report(request: web.Request) -> web.Response:
+    report = await asyncio.to_thread(get_memory_reporter().report)
+    return web.json_response(report)
+
+
 async def start_health_server() -> None:
     app = web.Application()
     app.router.add_get("/", health)
     app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/debug/memory", memory_report)
 
     port = int(os.environ.get("PORT", "8080"))
 
@@ -42,11 +72,75 @@ async def start_health_server() -> None:
 
 async def main_entrypoint() -> None:
     await start_health_server()
+    mark_startup("health_server")
+
+    if os.getenv("BOT_MODE", "single").strip().lower() == "worker":
+        from jobs.worker import run_worker
+
+        await run_worker()
+        return
 
     import main  # importuje bot/main.py dzięki sys.path
 
+    mark_startup("bot_imported")
     await main.start()
 
+    if os.getenv("BOT_STARTUP_DRY_RUN"):
+        print(STARTUP_MARKS_PREFIX + json.dumps(get_startup_marks()), flush=True)
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Zwraca (modul, self_us, cumulative_us) dla importow najwyzszego poziomu."""
+    top_level: list[tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_value, cumulative_value = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # header line
+        if name.startswith("  "):
+            continue  # nested import, already included in its parent's cumulative time
+        top_level.append((name.strip(), self_value, cumulative_value))
+    return top_level
+
+
+def run_startup_report(top: int = 25) -> int:
+    env = {
+        **os.environ,
+        "BOT_STARTUP_DRY_RUN": "1",
+        "PORT": os.environ.get("PORT", "0"),
+        "DISCORD_TOKEN": os.environ.get("DISCORD_TOKEN", "dry-run"),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__)],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        print(completed.stderr[-4000:], file=sys.stderr)
+        return completed.returncode
+
+    marks: dict[str, float] = {}
+    for line in completed.stdout.splitlines():
+        if line.startswith(STARTUP_MARKS_PREFIX):
+            marks = json.loads(line[len(STARTUP_MARKS_PREFIX):])
+
+    print("Startup phases (seconds since process start):")
+    for phase, seconds in marks.items():
+        print(f"  {phase:<20} {seconds:8.3f}")
+
+    imports = sorted(_parse_importtime(completed.stderr), key=lambda item: item[2], reverse=True)
+    print(f"\nTop {top} top-level imports by cumulative time (ms):")
+    for name, _, cumulative_us in imports[:top]:
+        print(f"  {cumulative_us / 1000:9.1f}  {name}")
+    return 0
+
 
 if __name__ == "__main__":
-    asyncio.run(main_entrypoint())
\ No newline at end of file
+    if "--startup-report" in sys.argv:
+        sys.exit(run_startup_report())
+    asyncio.run(main_entrypoint())
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import logging
 import re
-import unicodedata
+import time
 from datetime import datetime
 from typing import Any, Mapping, Optional
 
@@ -15,7 +15,14 @@ try:
 except ImportError:
 	from services.discord_bot_szczypior.api.api_menager import APIManager  # type: ignore
 
-from libs.shared.constants import ACTIVITY_TYPES, POINTS_BONUSES
+from libs.shared.cache import ACTIVITY_RULES, CHALLENGES, get_shared_cache
+from libs.shared.constants import ACTIVITY_TYPES
+from libs.shared.scoring import (
+	ACTIVITY_TYPE_ALIASES,
+	CompiledPointsRules,
+	challenge_points_rules,
+	compile_points_rules,
+)
 
 from libs.shared.schemas.activity import ActivityCreate
 
@@ -23,25 +30,17 @@ from libs.shared.schemas.activity import ActivityCreate
 logger = logging.getLogger(__name__)
 
 
-ACTIVITY_TYPE_ALIASES: dict[str, str] = {
-	"running_terrain": "bieganie_teren",
-	"running_treadmill": "bieganie_bieznia",
-	"swimming": "plywanie",
-	"cycling": "rower",
-	"walking": "spacer",
-	"other_cardio": "cardio",
-}
+# Compiled rules per challenge. Dropped on challenge / activity-rule invalidations;
+# the TTL covers writes this process cannot hear about (no Redis).
+COMPILED_RULES_TTL_SECONDS = 60.0
+DEFAULT_POINTS_RULES = compile_points_rules()
+_compiled_rules: dict[int, tuple[float, CompiledPointsRules]] = {}
+_compiled_rules_listener_registered = False
 
 
-def _normalize_bonus_name(value: str) -> str:
-	normalized = unicodedata.normalize("NFD", value)
-	without_diacritics = "".join(ch for ch in normalized if unicodedata.category(ch) != "Mn")
-	return without_diacritics.strip().lower()
-
-
-def _has_bonus(bonuses: list[str], bonus_name: str) -> bool:
-	expected = _normalize_bonus_name(bonus_name)
-	return any(_normalize_bonus_name(item) == expected for item in bonuses)
+def _on_cache_invalidated(namespace: str) -> None:
+	if namespace in (CHALLENGES, ACTIVITY_RULES):
+		_compiled_rules.clear()
 
 
 def _to_float(value: Any, default: float = 0.0) -> float:
@@ -95,40 +94,6 @@ def _parse_time_to_minutes(raw_time: Any) -> Optional[int]:
 	return None
 
 
-def _normalize_points_rules(raw_points_rules: Optional[dict[str, Any]]) -> dict[str, Any]:
-	default_rules = POINTS_BONUSES if isinstance(POINTS_BONUSES, dict) else {}
-	default_weight_rules = default_rules.get("weight_bonus", {})
-	default_elevation_rules = default_rules.get("elevation_bonus", {})
-	if not isinstance(raw_points_rules, dict):
-		raw_points_rules = {}
-
-	weight_raw = raw_points_rules.get("weight_bonus")
-	elevation_raw = raw_points_rules.get("elevation_bonus")
-
-	return {
-		"weight_bonus": {
-			"min_weight_kg": _to_float(
-				weight_raw.get("min_weight_kg") if isinstance(weight_raw, dict) else None,
-				_to_float(default_weight_rules.get("min_weight_kg", 5), 5),
-			),
-			"distance_points_multiplier": _to_float(
-				weight_raw.get("distance_points_multiplier") if isinstance(weight_raw, dict) else None,
-				_to_float(default_weight_rules.get("distance_points_multiplier", 1.5), 1.5),
-			),
-		},
-		"elevation_bonus": {
-			"meters_step": _to_int(
-				elevation_raw.get("meters_step") if isinstance(elevation_raw, dict) else None,
-				_to_int(default_elevation_rules.get("meters_step", 50), 50),
-			),
-			"points_per_step": _to_int(
-				elevation_raw.get("points_per_step") if isinstance(elevation_raw, dict) else None,
-				_to_int(default_elevation_rules.get("points_per_step", 500), 500),
-			),
-		},
-	}
-
-
 def _resolve_activity_types(api_manager: Optional[APIManager], challenge_id: Optional[int]) -> dict[str, Any]:
 	if api_manager is None or challenge_id is None:
 		return ACTIVITY_TYPES
@@ -152,21 +117,33 @@ def _resolve_activity_types(api_manager: Optional[APIManager], challenge_id: Opt
 	return mapped or ACTIVITY_TYPES
 
 
-def _resolve_points_rules(api_manager: Optional[APIManager], challenge_id: Optional[int]) -> dict[str, Any]:
-	if api_manager is None or challenge_id is None:
-		return _normalize_points_rules(None)
-
-	raw_points_rules: Optional[dict[str, Any]] = None
+def _fetch_points_rules(api_manager: APIManager, challenge_id: int) -> Optional[Mapping[str, Any]]:
 	try:
-		challenge = api_manager.get_challenge(challenge_id)
-		if isinstance(challenge.rules, dict):
-			maybe_rules = challenge.rules.get("points_rules")
-			if isinstance(maybe_rules, dict):
-				raw_points_rules = maybe_rules
+		return challenge_points_rules(api_manager.get_challenge(challenge_id).rules)
 	except Exception:
-		pass
+		return None
+
 
-	return _normalize_points_rules(raw_points_rules)
+def _resolve_points_rules(api_manager: Optional[APIManager], challenge_id: Optional[int]) -> CompiledPointsRules:
+	"""Challenge's activity rules and points_rules compiled once, reused until invalidated."""
+	global _compiled_rules_listener_registered
+	if api_manager is None or challenge_id is None:
+		return DEFAULT_POINTS_RULES
+
+	cached = _compiled_rules.get(challenge_id)
+	if cached is not None and cached[0] > time.monotonic():
+		return cached[1]
+
+	if not _compiled_rules_listener_registered:
+		get_shared_cache().add_listener(_on_cache_invalidated)
+		_compiled_rules_listener_registered = True
+
+	compiled = compile_points_rules(
+		_resolve_activity_types(api_manager, challenge_id),
+		_fetch_points_rules(api_manager, challenge_id),
+	)
+	_compiled_rules[challenge_id] = (time.monotonic() + COMPILED_RULES_TTL_SECONDS, compiled)
+	return compiled
 
 
 def _coerce_ai_payload(ai_response: BaseModel | Mapping[str, Any]) -> dict[str, Any]:
@@ -181,68 +158,20 @@ def calculate_points_breakdown(
 	distance_km: float,
 	weight_kg: Optional[float],
 	elevation_m: Optional[int],
-	activity_types: dict[str, Any],
-	points_rules: dict[str, Any],
+	rules: CompiledPointsRules,
 ) -> dict[str, int]:
-	"""Pure function calculating points from resolved rules."""
-	resolved_type = ACTIVITY_TYPE_ALIASES.get(activity_type, activity_type)
-	if resolved_type not in activity_types:
-		raise ValueError(f"Unknown activity type: {activity_type}")
-
-	activity_info = activity_types[resolved_type]
-	min_distance = float(activity_info.get("min_distance", 0) or 0)
-	if distance_km < min_distance:
-		display_name = activity_info.get("display_name", resolved_type)
-		raise ValueError(f"Minimal distance for {display_name}: {min_distance} km")
-
-	base_points_rate = int(activity_info.get("base_points", 0))
-	base_points = int(distance_km * base_points_rate)
-	bonuses = activity_info.get("bonuses", []) or []
-
-	weight_bonus_cfg = points_rules.get("weight_bonus", {})
-	min_weight_kg = float(weight_bonus_cfg.get("min_weight_kg", 5))
-	distance_multiplier = float(weight_bonus_cfg.get("distance_points_multiplier", 1.5))
-	weight_bonus_points = 0
-	if (
-		weight_kg
-		and weight_kg >= min_weight_kg
-		and _has_bonus(bonuses, "obciazenie")
-		and distance_multiplier > 1
-	):
-		weight_bonus_points = int(base_points * (distance_multiplier - 1))
-
-	elevation_bonus_cfg = points_rules.get("elevation_bonus", {})
-	meters_step = int(elevation_bonus_cfg.get("meters_step", 50))
-	points_per_step = int(elevation_bonus_cfg.get("points_per_step", 500))
-	elevation_bonus_points = 0
-	if (
-		elevation_m
-		and elevation_m > 0
-		and _has_bonus(bonuses, "przewyzszenie")
-		and meters_step > 0
-	):
-		elevation_bonus_points = int(elevation_m // meters_step) * points_per_step
-
-	total_points = base_points + weight_bonus_points + elevation_bonus_points
-	if total_points < 1:
-		base_points = 1
-		total_points = 1
-
+	"""Points for an activity scored against precompiled challenge rules."""
+	breakdown = rules.score(activity_type, distance_km, weight_kg, elevation_m)
 	logger.info(
 		"Points calculated",
 		extra={
-			"total_points": total_points,
-			"weight_bonus_points": weight_bonus_points,
-			"elevation_bonus_points": elevation_bonus_points,
+			"total_points": breakdown["total_points"],
+			"weight_bonus_points": breakdown["weight_bonus_points"],
+			"elevation_bonus_points": breakdown["elevation_bonus_points"],
 		},
 	)
 
-	return {
-		"base_points": base_points,
-		"weight_bonus_points": weight_bonus_points,
-		"elevation_bonus_points": elevation_bonus_points,
-		"total_points": total_points,
-	}
+	return breakdown
 
 
 def build_activity_create_from_ai_response(
@@ -283,15 +212,12 @@ def build_activity_create_from_ai_response(
 	raw_time = data.get("czas") if data.get("czas") is not None else data.get("time_minutes")
 	time_minutes = _parse_time_to_minutes(raw_time)
 
-	activity_types = _resolve_activity_types(api_manager, challenge_id)
-	points_rules = _resolve_points_rules(api_manager, challenge_id)
 	breakdown = calculate_points_breakdown(
 		activity_type=activity_type,
 		distance_km=distance_km,
 		weight_kg=weight_kg,
 		elevation_m=elevation_m,
-		activity_types=activity_types,
-		points_rules=points_rules,
+		rules=_resolve_points_rules(api_manager, challenge_id),
 	)
 
 	total_points = breakdown["total_points"] + max(0, mission_bonus_points)
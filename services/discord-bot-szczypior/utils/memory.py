@@ -0,0 +1,130 @@
+"""Raport pamieci procesu: RSS, najwieksze alokacje (tracemalloc) i rozmiary cache'y.
+
+Raport jest logowany co BOT_MEMORY_REPORT_INTERVAL_SECONDS i dostepny na
+health serverze (`/debug/memory`). tracemalloc jest wlaczany tylko przy
+BOT_TRACEMALLOC=<liczba ramek>, bo spowalnia alokacje i sam zuzywa pamiec.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import resource
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss_bytes() -> int:
+	"""Biezacy RSS z /proc (Linux); poza Linuksem szczytowy RSS z getrusage."""
+	try:
+		with open("/proc/self/statm", encoding="ascii") as statm:
+			resident_pages = int(statm.read().split()[1])
+		return resident_pages * os.sysconf("SC_PAGE_SIZE")
+	except (OSError, ValueError, IndexError):
+		# ru_maxrss is KiB on Linux; peak rather than current, but better than nothing.
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryReporter:
+	"""Zbiera raport pamieci; zrodla rozmiarow cache'y rejestruje `bot/main.py`."""
+
+	def __init__(self, interval_seconds: float = 300.0, top: int = 10, tracemalloc_frames: int = 0) -> None:
+		self._interval_seconds = interval_seconds
+		self._top = top
+		self._tracemalloc_frames = tracemalloc_frames
+		self._sources: dict[str, Callable[[], int]] = {}
+		self._task: Optional[asyncio.Task[None]] = None
+		self._gauges_registered = False
+
+	@classmethod
+	def from_env(cls) -> "MemoryReporter":
+		return cls(
+			interval_seconds=float(os.getenv("BOT_MEMORY_REPORT_INTERVAL_SECONDS", "300")),
+			top=int(os.getenv("BOT_MEMORY_REPORT_TOP", "10")),
+			tracemalloc_frames=int(os.getenv("BOT_TRACEMALLOC", "0") or 0),
+		)
+
+	def start_tracing(self) -> None:
+		"""Wywolywane jak najwczesniej (run.py), zeby objac alokacje z importow."""
+		if self._tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+			tracemalloc.start(self._tracemalloc_frames)
+
+	def register_source(self, name: str, size: Callable[[], int]) -> None:
+		self._sources[name] = size
+		if not self._gauges_registered:
+			self._gauges_registered = True
+			REGISTRY.gauge_callback("bot_process_rss_bytes", "RSS procesu bota.", lambda: [({}, process_rss_bytes())])
+			REGISTRY.gauge_callback("bot_cache_entries", "Liczba wpisow w cache'ach procesu.", self._cache_samples)
+
+	def _cache_samples(self):
+		for name, size in self._cache_sizes().items():
+			yield {"cache": name}, size
+
+	def _cache_sizes(self) -> dict[str, int]:
+		sizes: dict[str, int] = {}
+		for name, size in list(self._sources.items()):
+			try:
+				sizes[name] = int(size())
+			except Exception:
+				logger.debug("Cache size source failed", exc_info=True, extra={"cache": name})
+		return sizes
+
+	def _top_allocations(self) -> Optional[dict[str, Any]]:
+		if not tracemalloc.is_tracing():
+			return None
+		current, peak = tracemalloc.get_traced_memory()
+		statistics = tracemalloc.take_snapshot().statistics("lineno")[: self._top]
+		return {
+			"current_bytes": current,
+			"peak_bytes": peak,
+			"top": [
+				{"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+				for stat in statistics
+			],
+		}
+
+	def report(self) -> dict[str, Any]:
+		started = time.perf_counter()
+		report = {
+			"rss_bytes": process_rss_bytes(),
+			"caches": self._cache_sizes(),
+			"tracemalloc": self._top_allocations(),
+		}
+		report["report_ms"] = round((time.perf_counter() - started) * 1000, 1)
+		return report
+
+	async def start(self) -> None:
+		if self._interval_seconds > 0 and self._task is None:
+			self._task = asyncio.create_task(self._report_loop())
+
+	async def stop(self) -> None:
+		if self._task is not None:
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+			self._task = None
+
+	async def _report_loop(self) -> None:
+		while True:
+			await asyncio.sleep(self._interval_seconds)
+			# The snapshot walks every traced block; keep it off the event loop.
+			report = await asyncio.to_thread(self.report)
+			logger.info("Memory report", extra={"memory": report})
+
+
+_memory_reporter: Optional[MemoryReporter] = None
+
+
+def get_memory_reporter() -> MemoryReporter:
+	global _memory_reporter
+	if _memory_reporter is None:
+		_memory_reporter = MemoryReporter.from_env()
+	return _memory_reporter
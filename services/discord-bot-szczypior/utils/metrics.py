@@ -0,0 +1,239 @@
+"""Lekki rejestr metryk w formacie tekstowym Prometheus (bez zewnetrznych zaleznosci)."""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+LabelValues = tuple[str, ...]
+GaugeSamples = Iterable[tuple[dict[str, str], float]]
+
+# Seconds; spans a keyword check (~us) up to a slow vision call with retries.
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+	return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+	parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+	if extra:
+		parts.append(extra)
+	return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+	if value == float("inf"):
+		return "+Inf"
+	return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+	kind = ""
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._lock = threading.Lock()
+
+	def _label_values(self, labels: dict[str, str]) -> LabelValues:
+		if set(labels) != set(self.labelnames):
+			raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+		return tuple(str(labels[name]) for name in self.labelnames)
+
+	def _header(self) -> list[str]:
+		return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+	def render(self) -> list[str]:
+		raise NotImplementedError
+
+
+class Counter(_Metric):
+	kind = "counter"
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+		super().__init__(name, documentation, labelnames)
+		self._values: dict[LabelValues, float] = {}
+
+	def inc(self, amount: float = 1.0, **labels: str) -> None:
+		key = self._label_values(labels)
+		with self._lock:
+			self._values[key] = self._values.get(key, 0.0) + amount
+
+	def value(self, **labels: str) -> float:
+		return self._values.get(self._label_values(labels), 0.0)
+
+	def render(self) -> list[str]:
+		with self._lock:
+			items = sorted(self._values.items())
+		lines = self._header()
+		lines.extend(
+			f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+		)
+		return lines
+
+
+class Histogram(_Metric):
+	kind = "histogram"
+
+	def __init__(
+		self,
+		name: str,
+		documentation: str,
+		labelnames: Sequence[str] = (),
+		buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+	) -> None:
+		super().__init__(name, documentation, labelnames)
+		self._buckets = tuple(sorted(buckets))
+		# Per label set: [per-bucket counts..., +Inf count], sum.
+		self._counts: dict[LabelValues, list[int]] = {}
+		self._sums: dict[LabelValues, float] = {}
+
+	def observe(self, value: float, **labels: str) -> None:
+		key = self._label_values(labels)
+		index = bisect.bisect_left(self._buckets, value)
+		with self._lock:
+			counts = self._counts.setdefault(key, [0] * (len(self._buckets) + 1))
+			counts[index] += 1
+			self._sums[key] = self._sums.get(key, 0.0) + value
+
+	@contextmanager
+	def time(self, **labels: str) -> Iterator[None]:
+		started = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observe(time.perf_counter() - started, **labels)
+
+	def count(self, **labels: str) -> int:
+		return sum(self._counts.get(self._label_values(labels), ()))
+
+	@property
+	def buckets(self) -> tuple[float, ...]:
+		return self._buckets
+
+	def snapshot(self) -> dict[LabelValues, tuple[list[int], float]]:
+		"""Kopia licznikow per zestaw etykiet: ([liczby w kubelkach..., +Inf], suma)."""
+		with self._lock:
+			return {key: (list(counts), self._sums[key]) for key, counts in self._counts.items()}
+
+	def render(self) -> list[str]:
+		with self._lock:
+			items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+		lines = self._header()
+		for key, counts, total in items:
+			cumulative = 0
+			for bound, count in zip((*self._buckets, float("inf")), counts):
+				cumulative += count
+				le = f'le="{_format_value(bound)}"'
+				lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+			lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(total, 6))}")
+			lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+		return lines
+
+
+class _GaugeCallback(_Metric):
+	kind = "gauge"
+
+	def __init__(self, name: str, documentation: str, callback: Callable[[], GaugeSamples]) -> None:
+		super().__init__(name, documentation)
+		self._callback = callback
+
+	def render(self) -> list[str]:
+		lines = self._header()
+		for labels, value in self._callback():
+			names = tuple(labels)
+			lines.append(f"{self.name}{_format_labels(names, [labels[n] for n in names])} {_format_value(value)}")
+		return lines
+
+
+class MetricsRegistry:
+	def __init__(self) -> None:
+		self._metrics: dict[str, _Metric] = {}
+		self._lock = threading.Lock()
+
+	def _get_or_create(self, name: str, factory: Callable[[], _Metric]) -> _Metric:
+		with self._lock:
+			metric = self._metrics.get(name)
+			if metric is None:
+				metric = factory()
+				self._metrics[name] = metric
+			return metric
+
+	def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+		return self._get_or_create(name, lambda: Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+	def histogram(
+		self,
+		name: str,
+		documentation: str,
+		labelnames: Sequence[str] = (),
+		buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+	) -> Histogram:
+		return self._get_or_create(name, lambda: Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+	def gauge_callback(self, name: str, documentation: str, callback: Callable[[], GaugeSamples]) -> None:
+		"""Gauge liczony przy scrapie, np. z `get_stats()` schedulera lub outboxa."""
+		with self._lock:
+			self._metrics[name] = _GaugeCallback(name, documentation, callback)
+
+	def render(self) -> str:
+		with self._lock:
+			metrics = list(self._metrics.values())
+		lines: list[str] = []
+		for metric in metrics:
+			try:
+				lines.extend(metric.render())
+			except Exception:
+				logger.warning("Could not render metric", exc_info=True, extra={"metric": metric.name})
+		return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+	"bot_stage_duration_seconds",
+	"Czas etapow obslugi wiadomosci (handler i wezly grafu AI).",
+	("stage",),
+)
+MESSAGES = REGISTRY.counter(
+	"bot_messages_total",
+	"Wiadomosci wg wyniku: seen, forwarded, deduped, processed, failed.",
+	("outcome", "priority"),
+)
+
+
+# run.py imports this module before aiohttp/discord, so this is ~process start.
+_process_started = time.perf_counter()
+_startup_marks: dict[str, float] = {}
+
+
+def mark_startup(phase: str) -> None:
+	"""Zapamietuje (raz) czas od startu procesu do danej fazy, np. 'health_server', 'on_ready'."""
+	_startup_marks.setdefault(phase, round(time.perf_counter() - _process_started, 3))
+
+
+def get_startup_marks() -> dict[str, float]:
+	return dict(_startup_marks)
+
+
+REGISTRY.gauge_callback(
+	"bot_startup_seconds",
+	"Czas od startu procesu do fazy startu bota.",
+	lambda: (({"phase": phase}, seconds) for phase, seconds in _startup_marks.items()),
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+	"""Mierzy czas etapu w `bot_stage_duration_seconds{stage=...}`."""
+	with STAGE_DURATION.time(stage=stage):
+		yield
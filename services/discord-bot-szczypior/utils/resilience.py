@@ -0,0 +1,293 @@
+"""Retry z wykladniczym backoffem, budzety retry i circuit breakery."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+	"""Wywolanie pominiete, bo circuit breaker zaleznosci jest otwarty."""
+
+	def __init__(self, name: str, retry_after_seconds: float):
+		self.name = name
+		self.retry_after_seconds = retry_after_seconds
+		super().__init__(f"Circuit '{name}' is open, retry in {retry_after_seconds:.1f}s")
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+	"""Wykladniczy backoff z pelnym jitterem (delay ~ U(0, min(max, base * mult^n)))."""
+
+	max_attempts: int = 3
+	base_delay_seconds: float = 0.5
+	max_delay_seconds: float = 8.0
+	multiplier: float = 2.0
+
+	def delay_for(self, attempt: int) -> float:
+		ceiling = min(self.max_delay_seconds, self.base_delay_seconds * (self.multiplier ** (attempt - 1)))
+		return random.uniform(0, ceiling)
+
+
+class RetryBudget:
+	"""Ogranicza retry do ulamka ruchu, zeby awaria nie mnozyla liczby wywolan.
+
+	Kazde pierwsze wywolanie dodaje `ratio` tokenu, kazdy retry zabiera jeden.
+	`min_tokens` pozwala na retry przy malym ruchu.
+	"""
+
+	def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 10.0) -> None:
+		self._ratio = ratio
+		self._max_tokens = max_tokens
+		self._tokens = min_tokens
+		self._lock = threading.Lock()
+		self.exhausted = 0
+
+	def record_request(self) -> None:
+		with self._lock:
+			self._tokens = min(self._max_tokens, self._tokens + self._ratio)
+
+	def try_spend(self) -> bool:
+		with self._lock:
+			if self._tokens >= 1.0:
+				self._tokens -= 1.0
+				return True
+			self.exhausted += 1
+			return False
+
+	@property
+	def tokens(self) -> float:
+		return self._tokens
+
+
+class CircuitBreaker:
+	"""Breaker closed -> open po `failure_threshold` kolejnych bledach; po `recovery_timeout` half-open."""
+
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half_open"
+
+	def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout_seconds: float = 30.0) -> None:
+		self.name = name
+		self._failure_threshold = failure_threshold
+		self._recovery_timeout_seconds = recovery_timeout_seconds
+		self._state = self.CLOSED
+		self._consecutive_failures = 0
+		self._opened_at = 0.0
+		self._half_open_probe = False
+		self._probe_started_at = 0.0
+		self._lock = threading.Lock()
+		self.opened_count = 0
+		self.rejected = 0
+
+	@property
+	def state(self) -> str:
+		with self._lock:
+			self._maybe_half_open()
+			return self._state
+
+	def _maybe_half_open(self) -> None:
+		if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._recovery_timeout_seconds:
+			self._transition(self.HALF_OPEN)
+			self._half_open_probe = False
+
+	def _transition(self, new_state: str) -> None:
+		old_state, self._state = self._state, new_state
+		if old_state != new_state:
+			logger.warning(
+				"Circuit breaker state changed",
+				extra={
+					"breaker": self.name,
+					"from_state": old_state,
+					"to_state": new_state,
+					"consecutive_failures": self._consecutive_failures,
+				},
+			)
+
+	def allow(self) -> bool:
+		"""Czy wywolanie moze przejsc; w half-open przepuszcza jedna probe."""
+		with self._lock:
+			self._maybe_half_open()
+			if self._state == self.CLOSED:
+				return True
+			# A probe that never reported back (e.g. cancelled task) expires after
+			# one recovery timeout so the breaker cannot stay half-open forever.
+			probe_expired = time.monotonic() - self._probe_started_at >= self._recovery_timeout_seconds
+			if self._state == self.HALF_OPEN and (not self._half_open_probe or probe_expired):
+				self._half_open_probe = True
+				self._probe_started_at = time.monotonic()
+				return True
+			self.rejected += 1
+			return False
+
+	def retry_after_seconds(self) -> float:
+		with self._lock:
+			return max(0.0, self._recovery_timeout_seconds - (time.monotonic() - self._opened_at))
+
+	def release(self) -> None:
+		"""Zwalnia probe half-open bez wyniku (wywolanie anulowane przed odpowiedzia)."""
+		with self._lock:
+			self._half_open_probe = False
+
+	def record_success(self) -> None:
+		with self._lock:
+			self._consecutive_failures = 0
+			self._half_open_probe = False
+			self._transition(self.CLOSED)
+
+	def record_failure(self) -> None:
+		with self._lock:
+			self._consecutive_failures += 1
+			self._half_open_probe = False
+			if self._state == self.HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+				if self._state != self.OPEN:
+					self.opened_count += 1
+				self._opened_at = time.monotonic()
+				self._transition(self.OPEN)
+
+	def stats(self) -> dict[str, Any]:
+		return {
+			"state": self.state,
+			"consecutive_failures": self._consecutive_failures,
+			"opened_count": self.opened_count,
+			"rejected": self.rejected,
+		}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+	name: str,
+	failure_threshold: int = 5,
+	recovery_timeout_seconds: float = 30.0,
+) -> CircuitBreaker:
+	"""Zwraca wspoldzielony breaker dla zaleznosci (np. 'llm:gpt-4o-mini', 'db-service')."""
+	with _breakers_lock:
+		breaker = _breakers.get(name)
+		if breaker is None:
+			breaker = CircuitBreaker(name, failure_threshold, recovery_timeout_seconds)
+			_breakers[name] = breaker
+		return breaker
+
+
+def get_breaker_stats() -> dict[str, dict[str, Any]]:
+	with _breakers_lock:
+		breakers = list(_breakers.values())
+	return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+def _check_breaker(breaker: Optional[CircuitBreaker]) -> None:
+	if breaker is not None and not breaker.allow():
+		raise CircuitOpenError(breaker.name, breaker.retry_after_seconds())
+
+
+def _should_retry(
+	attempt: int,
+	policy: RetryPolicy,
+	exc: Exception,
+	retry_if: Callable[[Exception], bool],
+	budget: Optional[RetryBudget],
+	operation: str,
+) -> Optional[float]:
+	"""Zwraca opoznienie przed kolejna proba albo None, gdy trzeba oddac wyjatek."""
+	if attempt >= policy.max_attempts or isinstance(exc, CircuitOpenError) or not retry_if(exc):
+		return None
+	if budget is not None and not budget.try_spend():
+		logger.warning("Retry budget exhausted", extra={"operation": operation, "attempt": attempt})
+		return None
+	delay = policy.delay_for(attempt)
+	logger.warning(
+		"Retrying after failure",
+		exc_info=True,
+		extra={
+			"operation": operation,
+			"attempt": attempt,
+			"max_attempts": policy.max_attempts,
+			"delay_seconds": round(delay, 3),
+		},
+	)
+	return delay
+
+
+async def retry_async(
+	call: Callable[[], Awaitable[T]],
+	*,
+	operation: str,
+	policy: RetryPolicy = RetryPolicy(),
+	breaker: Optional[CircuitBreaker] = None,
+	budget: Optional[RetryBudget] = None,
+	retry_if: Callable[[Exception], bool] = lambda exc: True,
+	is_failure: Callable[[Exception], bool] = lambda exc: True,
+) -> T:
+	"""Wykonuje `call` z backoffem; `is_failure` decyduje, czy blad obciaza breaker."""
+	if budget is not None:
+		budget.record_request()
+	attempt = 0
+	while True:
+		attempt += 1
+		_check_breaker(breaker)
+		try:
+			result = await call()
+		except Exception as exc:
+			if breaker is not None and not isinstance(exc, CircuitOpenError):
+				(breaker.record_failure if is_failure(exc) else breaker.record_success)()
+			delay = _should_retry(attempt, policy, exc, retry_if, budget, operation)
+			if delay is None:
+				raise
+			await asyncio.sleep(delay)
+		except BaseException:
+			# CancelledError/KeyboardInterrupt: no outcome, but free a half-open probe.
+			if breaker is not None:
+				breaker.release()
+			raise
+		else:
+			if breaker is not None:
+				breaker.record_success()
+			return result
+
+
+def retry_sync(
+	call: Callable[[], T],
+	*,
+	operation: str,
+	policy: RetryPolicy = RetryPolicy(),
+	breaker: Optional[CircuitBreaker] = None,
+	budget: Optional[RetryBudget] = None,
+	retry_if: Callable[[Exception], bool] = lambda exc: True,
+	is_failure: Callable[[Exception], bool] = lambda exc: True,
+) -> T:
+	"""Synchroniczny odpowiednik `retry_async` dla blokujacego klienta HTTP."""
+	if budget is not None:
+		budget.record_request()
+	attempt = 0
+	while True:
+		attempt += 1
+		_check_breaker(breaker)
+		try:
+			result = call()
+		except Exception as exc:
+			if breaker is not None and not isinstance(exc, CircuitOpenError):
+				(breaker.record_failure if is_failure(exc) else breaker.record_success)()
+			delay = _should_retry(attempt, policy, exc, retry_if, budget, operation)
+			if delay is None:
+				raise
+			time.sleep(delay)
+		except BaseException:
+			if breaker is not None:
+				breaker.release()
+			raise
+		else:
+			if breaker is not None:
+				breaker.record_success()
+			return result
@@ -0,0 +1,63 @@
+"""Cache of verified Supabase tokens -> resolved DiscordUser.
+
+Keys are SHA-256 hashes of the raw token, so tokens never sit in memory as
+dict keys. An entry lives at most ``ttl_seconds`` and never past the token's
+``exp``; the least recently used entry is dropped when the cache is full.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenUserCache:
+    """Bounded LRU with per-entry expiry (epoch seconds, like the JWT ``exp`` claim)."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0, negative_ttl_seconds: float = 10.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> tuple[bool, Any]:
+        """``(True, user)`` on a hit (``user`` may be None for a known-unregistered token)."""
+        key = token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[0]
+
+    def set(self, token: str, user: Any, token_exp: float | None) -> None:
+        ttl = self.ttl_seconds if user is not None else self.negative_ttl_seconds
+        expires_at = time.time() + ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        if ttl <= 0 or self.max_entries <= 0 or expires_at <= time.time():
+            return
+        key = token_key(token)
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
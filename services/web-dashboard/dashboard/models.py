@@ -33,6 +33,23 @@ class Challenge(models.Model):
         db_table = 'challenges'
 
 
+class ActivityRule(models.Model):
+    challenge = models.ForeignKey(
+        Challenge, on_delete=models.CASCADE, db_column='challenge_id', related_name='activity_rules'
+    )
+    activity_type = models.TextField()
+    emoji = models.TextField(default='🏃')
+    display_name = models.TextField()
+    base_points = models.IntegerField(default=0)
+    unit = models.TextField(default='km')
+    min_distance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    bonuses = models.JSONField(default=list)
+
+    class Meta:
+        managed = False
+        db_table = 'activity_rules'
+
+
 class SpecialMission(models.Model):
     name = models.TextField()
     description = models.TextField(null=True, blank=True)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.conf import settings
-from .models import Activity, DiscordUser, Challenge, SpecialMission, AirsoftEvent
+from .models import Activity, Challenge, SpecialMission, AirsoftEvent
 
 
 class ChallengeSerializer(serializers.ModelSerializer):
@@ -100,127 +100,109 @@ class ActivitySerializer(serializers.ModelSerializer):
         )
 
     def get_paceMinPerKm(self, obj):
-        if not obj.pace:
-            return None
-        try:
-            # pace stored as "MM:SS" → convert to float minutes
-            parts = str(obj.pace).split(":")
-            return round(int(parts[0]) + int(parts[1]) / 60, 2)
-        except Exception:
-            return None
-
-
-class PlayerSerializer(serializers.ModelSerializer):
-    id = serializers.CharField(source="discord_id")
-    username = serializers.CharField(source="display_name")
-    totalPoints = serializers.SerializerMethodField()
-    totalDistanceKm = serializers.SerializerMethodField()
-    totalActivities = serializers.SerializerMethodField()
-    totalDurationMin = serializers.SerializerMethodField()
-    favoriteActivity = serializers.SerializerMethodField()
-    runningKm = serializers.SerializerMethodField()
-    swimmingKm = serializers.SerializerMethodField()
-    cyclingKm = serializers.SerializerMethodField()
-    walkingKm = serializers.SerializerMethodField()
-    otherKm = serializers.SerializerMethodField()
+        return _pace_minutes(obj.pace)
 
-    class Meta:
-        model = DiscordUser
-        fields = [
-            "id",
-            "username",
-            "avatar_url",
-            "totalPoints",
-            "totalDistanceKm",
-            "totalActivities",
-            "totalDurationMin",
-            "favoriteActivity",
-            "runningKm",
-            "swimmingKm",
-            "cyclingKm",
-            "walkingKm",
-            "otherKm",
-        ]
-
-    def _acts(self, obj):
-        acts = obj.activity_set.all()
-        challenge_id = self.context.get("challenge_id")
-        if challenge_id is not None:
-            acts = acts.filter(challenge_id=challenge_id)
-        return list(acts)
-
-    def get_totalPoints(self, obj):
-        return sum(a.total_points for a in self._acts(obj))
-
-    def get_totalDistanceKm(self, obj):
-        return round(float(sum(a.distance_km for a in self._acts(obj))), 2)
-
-    def get_totalActivities(self, obj):
-        return len(self._acts(obj))
-
-    def get_totalDurationMin(self, obj):
-        return sum(a.time_minutes or 0 for a in self._acts(obj))
-
-    def get_favoriteActivity(self, obj):
-        mapping = getattr(settings, "ACTIVITY_MAP", {})
-        acts = self._acts(obj)
-        if not acts:
-            return "running_terrain"
-        from collections import Counter
-
-        most_common = Counter(a.activity_type for a in acts).most_common(1)[0][0]
-        return mapping.get(most_common, most_common)
-
-    def _km_for_types(self, obj, db_types):
-        return round(
-            float(
-                sum(
-                    a.distance_km
-                    for a in self._acts(obj)
-                    if a.activity_type in db_types
-                )
-            ),
-            2,
-        )
 
-    def get_runningKm(self, obj):
-        return self._km_for_types(obj, ["bieganie_teren", "bieganie_bieznia"])
-
-    def get_swimmingKm(self, obj):
-        return self._km_for_types(obj, ["plywanie"])
-
-    def get_cyclingKm(self, obj):
-        return self._km_for_types(obj, ["rower"])
-
-    def get_walkingKm(self, obj):
-        return self._km_for_types(obj, ["spacer"])
-
-    def get_otherKm(self, obj):
-        return self._km_for_types(obj, ["cardio"])
-
-
-class PlayerRankingSerializer(PlayerSerializer):
-    rank = serializers.SerializerMethodField()
-    pointsDiff = serializers.SerializerMethodField()
-    bestPaceMinPerKm = serializers.SerializerMethodField()
-
-    def get_rank(self, obj):
+def _pace_minutes(pace) -> float | None:
+    if not pace:
         return None
-
-    def get_pointsDiff(self, obj):
+    try:
+        # pace stored as "MM:SS" → convert to float minutes
+        parts = str(pace).split(":")
+        return round(int(parts[0]) + int(parts[1]) / 60, 2)
+    except Exception:
         return None
 
-    def get_bestPaceMinPerKm(self, obj):
-        return None
 
-    bestPaceMinPerKm = serializers.FloatField(allow_null=True)
-
-    class Meta(PlayerSerializer.Meta):
-        fields = PlayerSerializer.Meta.fields + [
-            "rank",
-            "pointsDiff",
-            "bestPaceMinPerKm",
-        ]
+def _float_or_none(value) -> float | None:
+    return float(value) if value is not None else None
+
+
+# Pole ActivitySerializer -> (kolumny z .values(), funkcja wiersza). Listy aktywności
+# pobierają tylko kolumny wybranych pól (parametr fields=) i nie tworzą modeli.
+ACTIVITY_LIST_FIELDS = {
+    "id": (("id",), lambda row: row["id"]),
+    "userId": (("user__discord_id",), lambda row: row["user__discord_id"]),
+    "type": (
+        ("activity_type",),
+        lambda row: getattr(settings, "ACTIVITY_MAP", {}).get(row["activity_type"], row["activity_type"]),
+    ),
+    "date": (("created_at",), lambda row: row["created_at"].strftime("%Y-%m-%d")),
+    "distanceKm": (("distance_km",), lambda row: _float_or_none(row["distance_km"])),
+    "loadKg": (("weight_kg",), lambda row: _float_or_none(row["weight_kg"])),
+    "elevationGain": (("elevation_m",), lambda row: row["elevation_m"]),
+    "durationMin": (("time_minutes",), lambda row: row["time_minutes"]),
+    "paceMinPerKm": (("pace",), lambda row: _pace_minutes(row["pace"])),
+    "heartRateAvg": (("heart_rate_avg",), lambda row: row["heart_rate_avg"]),
+    "calories": (("calories",), lambda row: row["calories"]),
+    "pointsEarned": (("total_points",), lambda row: row["total_points"]),
+    "basePoints": (("base_points",), lambda row: row["base_points"]),
+    "bonusPoints": (
+        ("weight_bonus_points", "elevation_bonus_points", "mission_bonus_points"),
+        lambda row: row["weight_bonus_points"] + row["elevation_bonus_points"] + row["mission_bonus_points"],
+    ),
+    "weightBonusPoints": (("weight_bonus_points",), lambda row: row["weight_bonus_points"]),
+    "elevationBonusPoints": (("elevation_bonus_points",), lambda row: row["elevation_bonus_points"]),
+    "missionBonusPoints": (("mission_bonus_points",), lambda row: row["mission_bonus_points"]),
+    "ai_comment": (("ai_comment",), lambda row: row["ai_comment"]),
+    "challengeId": (("challenge_id",), lambda row: row["challenge_id"]),
+}
+
+
+def parse_activity_fields(raw: str | None) -> list[str]:
+    """``fields=id,type,pointsEarned`` -> lista pól; bez parametru wszystkie pola ActivitySerializer."""
+    if not raw:
+        return list(ACTIVITY_LIST_FIELDS)
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(",") if field.strip()))
+    if not fields:
+        raise ValueError("fields must not be empty")
+    unknown = [field for field in fields if field not in ACTIVITY_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def activity_list_columns(fields: list[str]) -> list[str]:
+    return list(dict.fromkeys(column for field in fields for column in ACTIVITY_LIST_FIELDS[field][0]))
+
+
+def serialize_activity_row(row: dict, fields: list[str]) -> dict:
+    """Wiersz .values(*activity_list_columns(fields)) -> JSON jak ActivitySerializer, tylko wybrane pola."""
+    return {field: ACTIVITY_LIST_FIELDS[field][1](row) for field in fields}
+
+
+PLAYER_KM_TYPES = {
+    "runningKm": ("bieganie_teren", "bieganie_bieznia"),
+    "swimmingKm": ("plywanie",),
+    "cyclingKm": ("rower",),
+    "walkingKm": ("spacer",),
+    "otherKm": ("cardio",),
+}
+
+
+def _km(value) -> float:
+    return round(float(value or 0), 2)
+
+
+def serialize_player_row(row: dict) -> dict:
+    """Wiersz zapytania rankingu graczy (views._player_ranking_rows) -> JSON API."""
+    mapping = getattr(settings, "ACTIVITY_MAP", {})
+    favorite = row["favorite_activity"]
+    best_pace = row["best_pace"]
+    return {
+        "id": row["discord_id"],
+        "username": row["display_name"],
+        "avatar_url": row["avatar_url"],
+        "totalPoints": row["total_points"],
+        "totalDistanceKm": _km(row["total_distance_km"]),
+        "totalActivities": row["total_activities"],
+        "totalDurationMin": row["total_duration_min"] or 0,
+        "favoriteActivity": mapping.get(favorite, favorite) if favorite else "running_terrain",
+        **{field: _km(row[field]) for field in PLAYER_KM_TYPES},
+        "rank": row["rank"],
+        "pointsDiff": row["top_points"] - row["total_points"],
+        "bestPaceMinPerKm": round(best_pace, 2) if best_pace is not None else None,
+    }
 
 
 class StatsSummarySerializer(serializers.Serializer):
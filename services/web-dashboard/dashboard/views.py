@@ -1,30 +1,64 @@
+import base64
 import json
+import logging
 import re
-import unicodedata
-from datetime import datetime
-from typing import Any
+import threading
+import time
+from datetime import datetime, timedelta
 from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
 import jwt
-from jwt import PyJWKClient
+from jwt import PyJWKClient, PyJWKClientError
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Avg, Case, Count, F, FloatField, Min, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Cast, Coalesce, FirstValue, RowNumber, StrIndex, Substr, TruncWeek
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_http_methods
 from django.utils import timezone
 
+from libs.shared.cache import ACTIVITY_RULES, CHALLENGES, RANKINGS, get_shared_cache, user_stats_namespace
+from libs.shared.scoring import CompiledPointsRules, challenge_points_rules, compile_points_rules
+
+from .auth_cache import TokenUserCache
 from .models import Activity, AirsoftEvent, EventRegistration, Challenge, DiscordUser, SpecialMission
 
+logger = logging.getLogger(__name__)
+
 # Klient JWKS — pobiera i cachuje klucze publiczne Supabase (ES256)
 _jwks_client: PyJWKClient | None = None
+_jwks_lock = threading.Lock()
+
+_token_users = TokenUserCache(
+    max_entries=getattr(settings, "AUTH_CACHE_MAX_ENTRIES", 1024),
+    ttl_seconds=getattr(settings, "AUTH_CACHE_TTL_SECONDS", 60),
+)
+
+
+def _refresh_jwks(client: PyJWKClient, interval: float) -> None:
+    """Odświeża zestaw kluczy w tle, żeby żądania nie czekały na pobranie JWKS."""
+    while True:
+        try:
+            client.fetch_data()
+        except PyJWKClientError:
+            logger.warning("JWKS refresh failed", exc_info=True, extra={"jwks_url": client.uri})
+        time.sleep(interval)
 
 
 def _get_jwks_client() -> PyJWKClient:
     global _jwks_client
     if _jwks_client is None:
-        jwks_url = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
-        _jwks_client = PyJWKClient(jwks_url, cache_keys=True)
+        with _jwks_lock:
+            if _jwks_client is None:
+                jwks_url = f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+                interval = getattr(settings, "SUPABASE_JWKS_REFRESH_SECONDS", 300)
+                # The cached set outlives a few refresh rounds, so a failed refresh does not block requests.
+                client = PyJWKClient(jwks_url, cache_keys=True, lifespan=interval * 3)
+                threading.Thread(
+                    target=_refresh_jwks, args=(client, interval), name="jwks-refresh", daemon=True
+                ).start()
+                _jwks_client = client
     return _jwks_client
 
 
@@ -99,10 +133,19 @@ def _extract_bearer_token(request) -> str:
 
 
 def _get_request_user(request):
+    """
+    DiscordUser z tokena Bearer. Zweryfikowane tokeny trafiają do _token_users
+    (także bez konta w bazie, na krócej), więc kolejne żądania z tym samym
+    tokenem nie weryfikują podpisu, nie pytają Supabase i nie odpytują bazy.
+    """
     token = _extract_bearer_token(request)
     if not token:
         return None
 
+    hit, user = _token_users.get(token)
+    if hit:
+        return user
+
     try:
         payload = _verify_supabase_token(token)
     except jwt.InvalidTokenError:
@@ -110,12 +153,12 @@ def _get_request_user(request):
 
     discord_id = _resolve_discord_id(token, payload)
     if not discord_id:
+        # Also returned when Supabase is unreachable, so it is not cached.
         return None
 
-    try:
-        return DiscordUser.objects.get(discord_id=discord_id)
-    except DiscordUser.DoesNotExist:
-        return None
+    user = DiscordUser.objects.filter(discord_id=discord_id).first()
+    _token_users.set(token, user, payload.get("exp"))
+    return user
 
 
 def _require_admin(request):
@@ -127,40 +170,16 @@ def _require_admin(request):
     return user, None
 
 
-def _pace_to_float(pace_value: str | None) -> float | None:
-    if not pace_value:
-        return None
-    try:
-        mins, secs = str(pace_value).split(":", 1)
-        return round(int(mins) + int(secs) / 60, 2)
-    except Exception:
-        return None
-
+# Tempo zapisywane przez bota jako "mm:ss"; inne formaty są pomijane w statystykach.
+PACE_REGEX = r"^\d+:\d+$"
+RUNNING_TYPES = ("bieganie_teren", "bieganie_bieznia")
+WEEKLY_STATS_WEEKS = 12
 
-def _normalize_bonus_name(value: str) -> str:
-    normalized = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode("ascii")
-    return normalized.strip().lower()
 
-
-def _has_bonus(bonuses: list[str] | None, bonus_name: str) -> bool:
-    if not bonuses:
-        return False
-    normalized_bonus = _normalize_bonus_name(bonus_name)
-    return any(_normalize_bonus_name(item) == normalized_bonus for item in bonuses)
-
-
-def _to_float_or_default(value: Any, default: float) -> float:
-    try:
-        return float(value)
-    except (TypeError, ValueError):
-        return default
-
-
-def _to_int_or_default(value: Any, default: int) -> int:
-    try:
-        return int(value)
-    except (TypeError, ValueError):
-        return default
+def _pace_minutes(field: str):
+    """Wyrażenie SQL: "mm:ss" z pola `field` -> minuty (float); tylko dla wartości pasujących do PACE_REGEX."""
+    colon = StrIndex(field, Value(":"))
+    return Cast(Substr(field, 1, colon - 1), FloatField()) + Cast(Substr(field, colon + 1), FloatField()) / 60.0
 
 
 def _parse_challenge_id(raw_value: str | None) -> int | None:
@@ -181,100 +200,41 @@ def _parse_challenge_id(raw_value: str | None) -> int | None:
     raise ValueError("Invalid challengeId")
 
 
-def _normalize_points_rules(points_rules: dict[str, Any] | None) -> dict[str, dict[str, float | int]]:
-    base_rules = {
-        "weight_bonus": {
-            "min_weight_kg": 5.0,
-            "distance_points_multiplier": 1.5,
-        },
-        "elevation_bonus": {
-            "meters_step": 50,
-            "points_per_step": 500,
-        },
-    }
-
-    if not isinstance(points_rules, dict):
-        return base_rules
-
-    weight_bonus = points_rules.get("weight_bonus")
-    elevation_bonus = points_rules.get("elevation_bonus")
-
-    base_rules["weight_bonus"]["min_weight_kg"] = _to_float_or_default(
-        weight_bonus.get("min_weight_kg") if isinstance(weight_bonus, dict) else None,
-        base_rules["weight_bonus"]["min_weight_kg"],
-    )
-    base_rules["weight_bonus"]["distance_points_multiplier"] = _to_float_or_default(
-        weight_bonus.get("distance_points_multiplier") if isinstance(weight_bonus, dict) else None,
-        base_rules["weight_bonus"]["distance_points_multiplier"],
-    )
-    base_rules["elevation_bonus"]["meters_step"] = _to_int_or_default(
-        elevation_bonus.get("meters_step") if isinstance(elevation_bonus, dict) else None,
-        base_rules["elevation_bonus"]["meters_step"],
-    )
-    base_rules["elevation_bonus"]["points_per_step"] = _to_int_or_default(
-        elevation_bonus.get("points_per_step") if isinstance(elevation_bonus, dict) else None,
-        base_rules["elevation_bonus"]["points_per_step"],
-    )
-
-    return base_rules
+def _cache_version_etag(*namespaces: str):
+    """
+    ETag publicznych endpointów: wersja namespace'ów cache współdzielonego, zmieniana
+    przy każdym zapisie. Niezmieniony odczyt kończy się 304 bez liczenia odpowiedzi.
+    """
 
+    def etag_func(request, *args, **kwargs) -> str | None:
+        try:
+            return get_shared_cache().version(*namespaces)
+        except Exception:
+            # Without a version the response is simply not conditional.
+            logger.warning("Shared cache version unavailable", exc_info=True, extra={"namespaces": namespaces})
+            return None
 
-def _effective_points_rules(challenge: Challenge | None) -> dict[str, dict[str, float | int]]:
-    if not challenge or not isinstance(challenge.rules, dict):
-        return _normalize_points_rules(None)
-    return _normalize_points_rules(challenge.rules.get("points_rules"))
+    return etag_func
 
 
-def _calculate_points_breakdown(
-    activity_info: dict[str, Any],
-    distance: float,
-    weight_kg: float | None,
-    elevation_m: int | None,
-    points_rules: dict[str, dict[str, float | int]],
-) -> dict[str, int]:
-    base_points_rate = activity_info.get("base_points", 0)
-    base_points = int(distance * base_points_rate)
-    bonuses = activity_info.get("bonuses", [])
+_public_cache_control = cache_control(public=True, max_age=getattr(settings, "PUBLIC_API_MAX_AGE_SECONDS", 15))
 
-    weight_bonus_cfg = points_rules.get("weight_bonus", {})
-    min_weight_kg = _to_float_or_default(weight_bonus_cfg.get("min_weight_kg"), 5.0)
-    distance_multiplier = _to_float_or_default(
-        weight_bonus_cfg.get("distance_points_multiplier"), 1.5
-    )
 
-    weight_bonus_points = 0
-    if (
-        weight_kg
-        and weight_kg >= min_weight_kg
-        and _has_bonus(bonuses, "obciazenie")
-        and distance_multiplier > 1
-    ):
-        weight_bonus_points = int(base_points * (distance_multiplier - 1))
-
-    elevation_bonus_cfg = points_rules.get("elevation_bonus", {})
-    meters_step = _to_int_or_default(elevation_bonus_cfg.get("meters_step"), 50)
-    points_per_step = _to_int_or_default(elevation_bonus_cfg.get("points_per_step"), 500)
-
-    elevation_bonus_points = 0
-    if (
-        elevation_m
-        and elevation_m > 0
-        and _has_bonus(bonuses, "przewyzszenie")
-        and meters_step > 0
-    ):
-        elevation_bonus_points = int(elevation_m // meters_step) * points_per_step
-
-    total_points = base_points + weight_bonus_points + elevation_bonus_points
-    if total_points < 1:
-        base_points = 1
-        total_points = 1
+def _effective_points_rules(challenge: Challenge | None) -> CompiledPointsRules:
+    """Reguły punktacji challenge'u jak w bocie i RescoreManager: wiersze activity_rules, bez nich ACTIVITY_TYPES."""
+    if challenge is None:
+        return compile_points_rules()
 
-    return {
-        "base_points": base_points,
-        "weight_bonus_points": weight_bonus_points,
-        "elevation_bonus_points": elevation_bonus_points,
-        "total_points": total_points,
+    activity_types = {
+        rule.activity_type: {
+            "display_name": rule.display_name,
+            "base_points": rule.base_points,
+            "min_distance": float(rule.min_distance),
+            "bonuses": rule.bonuses or [],
+        }
+        for rule in challenge.activity_rules.all()
     }
+    return compile_points_rules(activity_types or None, challenge_points_rules(challenge.rules))
 
 
 @require_http_methods(["GET", "OPTIONS"])
@@ -316,21 +276,84 @@ def me(request):
 
 
 @require_http_methods(["GET", "OPTIONS"])
+@_public_cache_control
+@etag(_cache_version_etag(CHALLENGES))
 def challenges(request):
     from .serializers import ChallengeSerializer
     from .models import Challenge
 
-    qs = Challenge.objects.all().order_by("-is_active", "start_date")
-    data = ChallengeSerializer(qs, many=True).data
-    return JsonResponse(list(data), safe=False)
+    def load() -> list:
+        qs = Challenge.objects.all().order_by("-is_active", "start_date")
+        return list(ChallengeSerializer(qs, many=True).data)
+
+    data = get_shared_cache().get_or_load(CHALLENGES, "dashboard:challenges", load)
+    return JsonResponse(data, safe=False)
+
+
+ACTIVITY_PAGE_DEFAULT_LIMIT = 200
+ACTIVITY_PAGE_MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_activity_cursor(created_at: datetime, activity_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), activity_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_activity_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, activity_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(activity_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _activity_page(request, qs):
+    """
+    Strona listy aktywności: keyset po (created_at, id) malejąco zamiast OFFSET,
+    tylko kolumny pól z `fields=`. Kursor następnej strony idzie w nagłówku
+    X-Next-Cursor (treść zostaje tablicą, jak dotąd); brak nagłówka = ostatnia strona.
+    """
+    from .serializers import activity_list_columns, parse_activity_fields, serialize_activity_row
+
+    try:
+        fields = parse_activity_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    try:
+        limit = int(request.GET.get("limit", ACTIVITY_PAGE_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    limit = min(max(limit, 1), ACTIVITY_PAGE_MAX_LIMIT)
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            created_at, activity_id = _decode_activity_cursor(cursor)
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=activity_id))
+
+    columns = activity_list_columns(fields)
+    rows = list(
+        qs.order_by("-created_at", "-id").values(*dict.fromkeys(["id", "created_at", *columns]))[: limit + 1]
+    )
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    response = JsonResponse([serialize_activity_row(row, fields) for row in rows], safe=False)
+    if has_next:
+        response[NEXT_CURSOR_HEADER] = _encode_activity_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return response
 
 
 @require_http_methods(["GET", "OPTIONS"])
 def activities(request):
-    from .serializers import ActivitySerializer
     from .models import Activity
 
-    qs = Activity.objects.select_related("user").order_by("-created_at")
+    qs = Activity.objects.all()
 
     challenge_id_raw = request.GET.get("challengeId")
     if challenge_id_raw:
@@ -345,16 +368,71 @@ def activities(request):
     if user_id:
         qs = qs.filter(user__discord_id=user_id)
 
-    limit = int(request.GET.get("limit", 200))
-    qs = qs[:limit]
+    return _activity_page(request, qs)
+
+
+def _player_ranking_rows(challenge_id: int | None) -> list[dict]:
+    """
+    Ranking graczy jednym zapytaniem: sumy warunkowe per typ aktywności,
+    ulubiony typ (podzapytanie), najlepsze tempo biegowe oraz miejsce i strata
+    do lidera z funkcji okna.
+    """
+    from .serializers import PLAYER_KM_TYPES
+
+    in_scope = Q(activity__challenge_id=challenge_id) if challenge_id is not None else Q()
+    scoped_activities = Activity.objects.filter(user_id=OuterRef("pk"))
+    if challenge_id is not None:
+        scoped_activities = scoped_activities.filter(challenge_id=challenge_id)
+    favorite_activity = (
+        scoped_activities.values("activity_type")
+        .annotate(count=Count("id"))
+        .order_by("-count", "activity_type")
+        .values("activity_type")[:1]
+    )
 
-    data = ActivitySerializer(qs, many=True).data
-    return JsonResponse(list(data), safe=False)
+    running_pace = in_scope & Q(activity__activity_type__in=PLAYER_KM_TYPES["runningKm"], activity__pace__regex=PACE_REGEX)
+
+    ranking_order = (F("total_points").desc(), F("id").asc())
+    return list(
+        DiscordUser.objects.annotate(
+            total_points=Coalesce(Sum("activity__total_points", filter=in_scope), 0),
+            total_distance_km=Sum("activity__distance_km", filter=in_scope),
+            total_activities=Count("activity", filter=in_scope),
+            total_duration_min=Sum("activity__time_minutes", filter=in_scope),
+            best_pace=Min(Case(When(running_pace, then=_pace_minutes("activity__pace")), output_field=FloatField())),
+            favorite_activity=Subquery(favorite_activity),
+            **{
+                field: Sum("activity__distance_km", filter=in_scope & Q(activity__activity_type__in=types))
+                for field, types in PLAYER_KM_TYPES.items()
+            },
+        )
+        .annotate(
+            rank=Window(RowNumber(), order_by=ranking_order),
+            top_points=Window(FirstValue("total_points"), order_by=ranking_order),
+        )
+        .order_by(*ranking_order)
+        .values(
+            "discord_id",
+            "display_name",
+            "avatar_url",
+            "total_points",
+            "total_distance_km",
+            "total_activities",
+            "total_duration_min",
+            "best_pace",
+            "favorite_activity",
+            "rank",
+            "top_points",
+            *PLAYER_KM_TYPES,
+        )
+    )
 
 
 @require_http_methods(["GET", "OPTIONS"])
+@_public_cache_control
+@etag(_cache_version_etag(RANKINGS))
 def players(request):
-    from .serializers import PlayerSerializer
+    from .serializers import serialize_player_row
 
     challenge_id_raw = request.GET.get("challengeId")
     challenge_id = None
@@ -364,33 +442,10 @@ def players(request):
         except ValueError:
             return JsonResponse({"error": "Invalid challengeId"}, status=400)
 
-    qs = DiscordUser.objects.prefetch_related("activity_set").all()
-    data = PlayerSerializer(qs, many=True, context={"challenge_id": challenge_id}).data
-    # Sort by totalPoints desc, add rank
-    sorted_data = sorted(data, key=lambda p: p["totalPoints"], reverse=True)
-    for i, p in enumerate(sorted_data):
-        p["rank"] = i + 1
-        p["pointsDiff"] = (
-            sorted_data[0]["totalPoints"] - p["totalPoints"] if i > 0 else 0
-        )
-
-        user_obj = next((u for u in qs if u.discord_id == p["id"]), None)
-        if user_obj is None:
-            p["bestPaceMinPerKm"] = None
-            continue
-
-        running_acts = [
-            a
-            for a in user_obj.activity_set.all()
-            if a.activity_type in ("bieganie_teren", "bieganie_bieznia")
-        ]
-        paces = [
-            pv
-            for pv in (_pace_to_float(a.pace) for a in running_acts)
-            if pv is not None
-        ]
-        p["bestPaceMinPerKm"] = min(paces) if paces else None
+    def load() -> list:
+        return [serialize_player_row(row) for row in _player_ranking_rows(challenge_id)]
 
+    sorted_data = get_shared_cache().get_or_load(RANKINGS, f"dashboard:players:{challenge_id}", load)
     return JsonResponse(sorted_data, safe=False)
 
 
@@ -399,75 +454,64 @@ def ranking(request):
     return players(request)
 
 
-@require_http_methods(["GET", "OPTIONS"])
-def stats_summary(request):
-    from .serializers import StatsSummarySerializer
+def _user_stats(user: DiscordUser, kind: str, loader):
+    """Statystyki użytkownika z cache współdzielonego; unieważniane przy zapisie jego aktywności."""
+    return get_shared_cache().get_or_load(user_stats_namespace(user.discord_id), f"dashboard:{kind}", loader)
 
-    user = _get_request_user(request)
-    if not user:
-        return JsonResponse({"error": "Unauthorized"}, status=401)
-
-    acts = list(user.activity_set.all().order_by("-created_at"))
-    last5 = acts[:5]
-
-    avg5_points = round(sum(a.total_points for a in last5) / len(last5)) if last5 else 0
-    best_activity = max(acts, key=lambda a: a.total_points) if acts else None
 
-    running_acts = [
-        a for a in acts if a.activity_type in ("bieganie_teren", "bieganie_bieznia")
-    ]
-    running_paces = [
-        pv for pv in (_pace_to_float(a.pace) for a in running_acts) if pv is not None
-    ]
-    avg_running_pace = (
-        round(sum(running_paces) / len(running_paces), 2) if running_paces else None
+def _stats_summary_payload(user: DiscordUser) -> dict:
+    activities = user.activity_set.all()
+    last5 = activities.order_by("-created_at")[:5].aggregate(avg=Avg("total_points"))
+    best_activity = activities.order_by("-total_points", "-created_at").values("total_points", "created_at").first()
+    totals = activities.aggregate(
+        avg_running_pace=Avg(
+            Case(
+                When(Q(activity_type__in=RUNNING_TYPES, pace__regex=PACE_REGEX), then=_pace_minutes("pace")),
+                output_field=FloatField(),
+            )
+        ),
+        total_duration=Sum("time_minutes"),
     )
 
-    payload = {
-        "avg5Points": int(avg5_points),
-        "bestActivityPoints": int(best_activity.total_points) if best_activity else 0,
+    return {
+        "avg5Points": round(last5["avg"]) if last5["avg"] is not None else 0,
+        "bestActivityPoints": int(best_activity["total_points"]) if best_activity else 0,
         "bestActivityDate": (
-            best_activity.created_at.strftime("%Y-%m-%d") if best_activity else None
+            best_activity["created_at"].strftime("%Y-%m-%d") if best_activity else None
         ),
-        "avgRunningPace": avg_running_pace,
-        "totalDurationMin": int(sum(a.time_minutes or 0 for a in acts)),
+        "avgRunningPace": (
+            round(totals["avg_running_pace"], 2) if totals["avg_running_pace"] is not None else None
+        ),
+        "totalDurationMin": int(totals["total_duration"] or 0),
     }
-    return JsonResponse(StatsSummarySerializer(payload).data)
-
-
-@require_http_methods(["GET", "OPTIONS"])
-def stats_weekly(request):
-    from .serializers import WeeklyStatsPointSerializer
-
-    user = _get_request_user(request)
-    if not user:
-        return JsonResponse({"error": "Unauthorized"}, status=401)
 
-    acts = list(user.activity_set.all().order_by("created_at"))
-    week_map = {}
-    for a in acts:
-        year, week, _ = a.created_at.isocalendar()
-        key = f"{year}-W{week:02d}"
-        if key not in week_map:
-            week_map[key] = {"name": key, "points": 0, "distance": 0.0}
-        week_map[key]["points"] += int(a.total_points)
-        week_map[key]["distance"] += float(a.distance_km)
-
-    weekly = list(week_map.values())[-12:]
-    for row in weekly:
-        row["distance"] = round(row["distance"], 2)
-
-    return JsonResponse(WeeklyStatsPointSerializer(weekly, many=True).data, safe=False)
 
+def _stats_weekly_payload(user: DiscordUser) -> list[dict]:
+    now = timezone.now()
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    since = week_start - timedelta(weeks=WEEKLY_STATS_WEEKS - 1)
+    rows = (
+        user.activity_set.filter(created_at__gte=since)
+        .annotate(week=TruncWeek("created_at"))
+        .values("week")
+        .annotate(points=Sum("total_points"), distance=Sum("distance_km"))
+        .order_by("week")
+    )
 
-@require_http_methods(["GET", "OPTIONS"])
-def stats_distribution(request):
-    from .serializers import ActivityDistributionSerializer
+    weekly = []
+    for row in rows:
+        year, week, _ = row["week"].isocalendar()
+        weekly.append(
+            {
+                "name": f"{year}-W{week:02d}",
+                "points": int(row["points"] or 0),
+                "distance": round(float(row["distance"] or 0), 2),
+            }
+        )
+    return weekly
 
-    user = _get_request_user(request)
-    if not user:
-        return JsonResponse({"error": "Unauthorized"}, status=401)
 
+def _stats_distribution_payload(user: DiscordUser) -> list[dict]:
     labels = {
         "bieganie_teren": "Bieganie (Teren)",
         "bieganie_bieznia": "Bieganie (Bieżnia)",
@@ -477,27 +521,70 @@ def stats_distribution(request):
         "cardio": "Inne Cardio",
     }
     mapping = getattr(settings, "ACTIVITY_MAP", {})
+    rows = (
+        user.activity_set.values("activity_type")
+        .annotate(count=Count("id"), distance=Sum("distance_km"), points=Sum("total_points"))
+        .order_by("activity_type")
+    )
 
+    # One row per stored type; types sharing a frontend type (aliases) are merged here.
     buckets = {}
-    for a in user.activity_set.all():
-        frontend_type = mapping.get(a.activity_type, a.activity_type)
+    for row in rows:
+        activity_type = row["activity_type"]
+        frontend_type = mapping.get(activity_type, activity_type)
         if frontend_type not in buckets:
             buckets[frontend_type] = {
                 "type": frontend_type,
-                "label": labels.get(a.activity_type, frontend_type),
+                "label": labels.get(activity_type, frontend_type),
                 "count": 0,
                 "distance": 0.0,
                 "points": 0,
             }
-        buckets[frontend_type]["count"] += 1
-        buckets[frontend_type]["distance"] += float(a.distance_km)
-        buckets[frontend_type]["points"] += int(a.total_points)
+        buckets[frontend_type]["count"] += row["count"]
+        buckets[frontend_type]["distance"] += float(row["distance"] or 0)
+        buckets[frontend_type]["points"] += int(row["points"] or 0)
 
     payload = list(buckets.values())
     payload.sort(key=lambda x: x["points"], reverse=True)
     for row in payload:
         row["distance"] = round(row["distance"], 2)
+    return payload
+
+
+@require_http_methods(["GET", "OPTIONS"])
+def stats_summary(request):
+    from .serializers import StatsSummarySerializer
+
+    user = _get_request_user(request)
+    if not user:
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    payload = _user_stats(user, "summary", lambda: _stats_summary_payload(user))
+    return JsonResponse(StatsSummarySerializer(payload).data)
+
+
+@require_http_methods(["GET", "OPTIONS"])
+def stats_weekly(request):
+    from .serializers import WeeklyStatsPointSerializer
+
+    user = _get_request_user(request)
+    if not user:
+        return JsonResponse({"error": "Unauthorized"}, status=401)
 
+    # Okno tygodni przesuwa się z czasem, więc wpis żyje najwyżej TTL cache'u (domyślnie 5 min).
+    weekly = _user_stats(user, "weekly", lambda: _stats_weekly_payload(user))
+    return JsonResponse(WeeklyStatsPointSerializer(weekly, many=True).data, safe=False)
+
+
+@require_http_methods(["GET", "OPTIONS"])
+def stats_distribution(request):
+    from .serializers import ActivityDistributionSerializer
+
+    user = _get_request_user(request)
+    if not user:
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    payload = _user_stats(user, "distribution", lambda: _stats_distribution_payload(user))
     return JsonResponse(
         ActivityDistributionSerializer(payload, many=True).data, safe=False
     )
@@ -636,6 +723,7 @@ def admin_challenges(request):
         is_active=bool(body.get("isActive", False)),
         discord_channel_id=body.get("discordChannelId") or None,
     )
+    get_shared_cache().invalidate(CHALLENGES)
     return JsonResponse(ChallengeAdminSerializer(challenge).data, status=201)
 
 
@@ -652,6 +740,8 @@ def admin_challenge_detail(request, challenge_id: int):
 
     if request.method == "DELETE":
         challenge.delete()
+        # Activities of the challenge lose challenge_id (SET NULL), so rankings change as well.
+        get_shared_cache().invalidate(CHALLENGES, ACTIVITY_RULES, RANKINGS)
         return JsonResponse({"ok": True})
 
     body = json.loads(request.body or "{}")
@@ -682,6 +772,7 @@ def admin_challenge_detail(request, challenge_id: int):
     challenge.rules = rules
 
     challenge.save()
+    get_shared_cache().invalidate(CHALLENGES)
 
     from .serializers import ChallengeAdminSerializer
 
@@ -694,9 +785,7 @@ def admin_activities(request):
     if error:
         return error
 
-    from .serializers import ActivitySerializer
-
-    qs = Activity.objects.select_related("user").order_by("-created_at")
+    qs = Activity.objects.all()
 
     user_id = request.GET.get("userId")
     if user_id and user_id != "all":
@@ -732,9 +821,7 @@ def admin_activities(request):
             | Q(user__discord_id__icontains=search)
         )
 
-    limit = int(request.GET.get("limit", 200))
-    data = ActivitySerializer(qs[:limit], many=True).data
-    return JsonResponse(list(data), safe=False)
+    return _activity_page(request, qs)
 
 
 @require_http_methods(["GET", "OPTIONS"])
@@ -779,10 +866,6 @@ def admin_activity_detail(request, activity_id: int):
         db_type = reverse_map.get(new_frontend_type, new_frontend_type)
         activity.activity_type = db_type
 
-    # Load activity rules from shared constants
-    from libs.shared.constants import ACTIVITY_TYPES
-    activity_info = ACTIVITY_TYPES.get(activity.activity_type, {})
-
     distance = float(activity.distance_km or 0)
 
     # Weight / load bonus
@@ -795,14 +878,16 @@ def admin_activity_detail(request, activity_id: int):
     elevation_m = int(elevation_m_raw) if elevation_m_raw not in (None, "") else None
     activity.elevation_m = elevation_m
 
-    points_rules = _effective_points_rules(activity.challenge)
-    points_breakdown = _calculate_points_breakdown(
-        activity_info=activity_info,
-        distance=distance,
-        weight_kg=weight_kg,
-        elevation_m=elevation_m,
-        points_rules=points_rules,
-    )
+    try:
+        points_breakdown = _effective_points_rules(activity.challenge).score(
+            activity.activity_type,
+            distance,
+            weight_kg,
+            elevation_m,
+            enforce_min_distance=False,
+        )
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
 
     activity.base_points = points_breakdown["base_points"]
     activity.weight_bonus_points = points_breakdown["weight_bonus_points"]
@@ -828,6 +913,7 @@ def admin_activity_detail(request, activity_id: int):
         "base_points", "weight_bonus_points", "elevation_bonus_points",
         "special_mission", "mission_bonus_points", "total_points",
     ])
+    get_shared_cache().invalidate(RANKINGS, user_stats_namespace(activity.user.discord_id))
 
     return JsonResponse(ActivitySerializer(activity).data)
 
@@ -851,6 +937,7 @@ def admin_activity_bonus(request, activity_id: int):
     activity.mission_bonus_points = (activity.mission_bonus_points or 0) + points
     activity.total_points = (activity.total_points or 0) + points
     activity.save(update_fields=["mission_bonus_points", "total_points"])
+    get_shared_cache().invalidate(RANKINGS, user_stats_namespace(activity.user.discord_id))
 
     from .serializers import ActivitySerializer
 
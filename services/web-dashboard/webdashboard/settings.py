@@ -101,6 +101,13 @@ DATABASES = {
 # Supabase
 # ---------------------------------------------------------------------------
 SUPABASE_URL = os.getenv('SUPABASE_URL', os.getenv('VITE_SUPABASE_URL', ''))
+# JWKS keys are refreshed by a background thread; requests only read the cached set.
+SUPABASE_JWKS_REFRESH_SECONDS = int(os.getenv('SUPABASE_JWKS_REFRESH_SECONDS', '300'))
+# Verified token -> DiscordUser cache (entries never outlive the token's exp).
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_CACHE_MAX_ENTRIES', '1024'))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv('AUTH_CACHE_TTL_SECONDS', '60'))
+# Cache-Control max-age of public polled endpoints (challenges, players, ranking); 304 via ETag after that.
+PUBLIC_API_MAX_AGE_SECONDS = int(os.getenv('PUBLIC_API_MAX_AGE_SECONDS', '15'))
 
 # ---------------------------------------------------------------------------
 # Activity type mapping (DB value → React ActivityType key)
@@ -131,6 +138,8 @@ CORS_ALLOW_HEADERS = [
     "origin",
     "x-requested-with",
 ]
+# Cursor of the next page of activity lists (keyset pagination).
+CORS_EXPOSE_HEADERS = ["x-next-cursor"]
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
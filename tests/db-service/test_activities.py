@@ -8,6 +8,7 @@ Scenariusze:
   3. Historia aktywności użytkownika
   4. Modyfikacja aktywności (np. zmiana activity_type)
   5. Usunięcie aktywności
+  6. Zapis paczki aktywności (outbox bota) — idempotentny po iid
 
 DLACZEGO AKTYWNOŚCI SĄ TRUDNIEJSZE DO TESTOWANIA NIŻ UŻYTKOWNICY?
   Aktywność wymaga istniejącego użytkownika w bazie (foreign key user_id).
@@ -235,6 +236,54 @@ class TestUpdateActivity:
             manager.update_activity("1710003002_UPD3", **{"iid": "ZMIENIONY_IID"})
 
 
+class TestCreateActivitiesBatch:
+    """Zapis paczki aktywności z outboxa bota."""
+
+    def test_batch_creates_new_and_reports_duplicates(self, db):
+        """Istniejące iid nie przerywają paczki — wracają jako "duplicate"."""
+        manager = ActivityManager(db)
+        manager.create_activity(_make_activity_payload(iid="1710006000_BATCH_A"))
+
+        results = manager.create_activities(
+            [
+                _make_activity_payload(iid="1710006000_BATCH_A"),
+                _make_activity_payload(iid="1710006000_BATCH_B", discord_id="555"),
+                _make_activity_payload(iid="1710006000_BATCH_B", discord_id="555"),
+            ]
+        )
+
+        assert [(item["iid"], item["status"]) for item in results] == [
+            ("1710006000_BATCH_A", "duplicate"),
+            ("1710006000_BATCH_B", "created"),
+        ]
+        assert results[1]["activity"].id is not None
+
+    def test_resending_batch_is_idempotent(self, db):
+        """Ponowna wysyłka tej samej paczki (retry outboxa) nie tworzy duplikatów."""
+        manager = ActivityManager(db)
+        payloads = [_make_activity_payload(iid=f"1710007000_RETRY_{i}") for i in range(3)]
+
+        first = manager.create_activities(payloads)
+        second = manager.create_activities(payloads)
+
+        assert {item["status"] for item in first} == {"created"}
+        assert {item["status"] for item in second} == {"duplicate"}
+        assert [item["activity"].id for item in first] == [item["activity"].id for item in second]
+
+    def test_integrity_error_without_existing_row_is_rejected(self, db, monkeypatch):
+        """Błąd FK/CHECK to nie duplikat — outbox musi zachować wpis, a nie go usunąć."""
+        manager = ActivityManager(db)
+
+        def failing_create(payload):
+            raise ValueError("Activity with this iid already exists")
+
+        monkeypatch.setattr(manager, "create_activity", failing_create)
+        result = manager._create_one_for_batch(_make_activity_payload(iid="1710008000_FK"))
+
+        assert result["status"] == "rejected"
+        assert result["activity"] is None
+
+
 class TestDeleteActivity:
     """Usuwanie aktywności."""
 
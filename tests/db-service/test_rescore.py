@@ -0,0 +1,125 @@
+"""
+test_rescore.py — Testy RescoreManager (przeliczanie punktów challenge'u)
+==========================================================================
+
+Scenariusze:
+  1. Zmiana reguł → dry-run raportuje różnice bez zapisu, właściwy przebieg
+     zapisuje punkty (również bonusy) i unieważnia cache rankingów
+  2. Ponowne dopasowanie misji z limitem max_completions_per_user
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+import libs.shared.cache as shared_cache
+from app.db.models import Activity, SpecialMission
+from app.schemas.activity import ActivityCreate
+from app.schemas.activity_rule import ActivityRulePatchPayload
+from app.schemas.challenge import ChallengeCreate
+from app.services.activity_manager import ActivityManager
+from app.services.challenges_manager import ChallengesManager
+from app.services.rescore_manager import RescoreManager
+from libs.shared.cache import RANKINGS, InMemoryCacheBackend, SharedCache
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = SharedCache(InMemoryCacheBackend())
+    monkeypatch.setattr(shared_cache, "_shared_cache", cache)
+    return cache
+
+
+def _challenge(db, rules: dict | None = None):
+    return ChallengesManager(db).create_challenge(
+        ChallengeCreate(
+            name="Przeliczenie",
+            start_date=datetime(2026, 5, 1, tzinfo=timezone.utc),
+            end_date=datetime(2026, 5, 31, tzinfo=timezone.utc),
+            rules=rules,
+        )
+    )
+
+
+def _activity(db, challenge_id: int, iid: str, day: int, **fields) -> Activity:
+    payload = {
+        "discord_id": "555",
+        "display_name": "Biegacz",
+        "activity_type": "bieganie_teren",
+        "distance_km": 10.0,
+        "base_points": 1,
+        "weight_bonus_points": 0,
+        "elevation_bonus_points": 0,
+        "mission_bonus_points": 0,
+        "total_points": 1,
+        "created_at": datetime(2026, 5, day, 8, 0, tzinfo=timezone.utc),
+        **fields,
+    }
+    return ActivityManager(db).create_activity(ActivityCreate(iid=iid, challenge_id=challenge_id, **payload))
+
+
+def test_rules_change_is_previewed_then_applied_in_sql(db, cache):
+    challenge = _challenge(db, rules={"points_rules": {"elevation_bonus": {"meters_step": 100, "points_per_step": 200}}})
+    heavy = _activity(db, challenge.id, "r1", 2, distance_km=0.57, weight_kg=8, elevation_m=250)
+    _activity(db, challenge.id, "r2", 3, activity_type="plywanie", distance_km=1.0)
+    ChallengesManager(db).patch_activity_rules(
+        challenge.id, [ActivityRulePatchPayload(activity_type="bieganie_teren", base_points=100)]
+    )
+    generation = cache._generation(RANKINGS)
+
+    preview = RescoreManager(db, batch_size=1).rescore_challenge(challenge.id)
+
+    assert preview["dry_run"] is True
+    assert preview["scanned"] == 2 and preview["batches"] == 2
+    diff = next(change for change in preview["changes"] if change["iid"] == "r1")
+    # int(0.57 * 100) == 56 in the bot (float arithmetic), so the database must agree.
+    assert diff["after"]["base_points"] == 56
+    assert diff["after"]["weight_bonus_points"] == 28
+    assert diff["after"]["elevation_bonus_points"] == 400
+    assert diff["after"]["total_points"] == 484
+    db.refresh(heavy)
+    assert heavy.total_points == 1
+
+    report = RescoreManager(db).rescore_challenge(challenge.id, dry_run=False)
+
+    db.refresh(heavy)
+    assert heavy.total_points == 484
+    assert (report["changed"], report["points_after"]) == (preview["changed"], preview["points_after"])
+    assert cache._generation(RANKINGS) != generation
+    assert RescoreManager(db).rescore_challenge(challenge.id)["changed"] == 0
+
+
+def test_rematch_missions_respects_completion_limit(db):
+    challenge = _challenge(db)
+    now = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    mission = SpecialMission(
+        name="Dycha",
+        bonus_points=3000,
+        min_distance_km=10,
+        activity_type_filter="bieganie_teren",
+        valid_from=now,
+        valid_until=datetime(2026, 5, 31, tzinfo=timezone.utc),
+        is_active=True,
+        max_completions_per_user=1,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(mission)
+    db.commit()
+    first = _activity(db, challenge.id, "m1", 4, distance_km=12.0)
+    second = _activity(db, challenge.id, "m2", 5, distance_km=11.0)
+    short = _activity(db, challenge.id, "m3", 6, distance_km=5.0)
+
+    RescoreManager(db).rescore_challenge(challenge.id, dry_run=False, rematch_missions=True)
+
+    for row in (first, second, short):
+        db.refresh(row)
+    assert (first.special_mission_id, first.mission_bonus_points) == (mission.id, 3000)
+    assert first.total_points == first.base_points + 3000
+    assert second.special_mission_id is None and second.mission_bonus_points == 0
+    assert short.special_mission_id is None
+
+
+def test_unknown_challenge_raises(db):
+    with pytest.raises(ValueError):
+        RescoreManager(db).rescore_challenge(999_999)
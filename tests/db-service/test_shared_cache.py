@@ -0,0 +1,153 @@
+"""
+test_shared_cache.py — Testy wspólnego cache (libs.shared.cache)
+=================================================================
+
+Dwie instancje SharedCache na jednym backendzie w pamięci udają dwa serwisy
+(np. db-service i bota) podłączone do tego samego Redisa.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+import libs.shared.cache as shared_cache
+from app.schemas.activity import ActivityCreate
+from app.schemas.activity_rule import ActivityRulePatchPayload
+from app.schemas.challenge import ChallengeCreate
+from app.schemas.user import UserUpsert
+from app.services.activity_manager import ActivityManager
+from app.services.challenges_manager import ChallengesManager
+from app.services.users_manager import UsersManager
+from libs.shared.cache import ACTIVITY_RULES, CHALLENGES, RANKINGS, InMemoryCacheBackend, SharedCache, user_stats_namespace
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = SharedCache(InMemoryCacheBackend())
+    monkeypatch.setattr(shared_cache, "_shared_cache", cache)
+    return cache
+
+
+def test_invalidation_reaches_other_services_local_copies():
+    backend = InMemoryCacheBackend()
+    db_service, bot = SharedCache(backend), SharedCache(backend)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return {"rules": len(loads)}
+
+    assert bot.get_or_load(CHALLENGES, "active", load) == {"rules": 1}
+    assert db_service.get_or_load(CHALLENGES, "active", load) == {"rules": 1}
+    assert bot.get_or_load(CHALLENGES, "active", load) == {"rules": 1}
+
+    db_service.invalidate(CHALLENGES)
+
+    assert bot.get_or_load(CHALLENGES, "active", load) == {"rules": 2}
+    assert len(loads) == 2
+
+
+def test_backend_failure_falls_back_to_loader():
+    class BrokenBackend(InMemoryCacheBackend):
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+    cache = SharedCache(BrokenBackend())
+
+    assert cache.get_or_load(CHALLENGES, "active", lambda: ["z bazy"]) == ["z bazy"]
+
+
+def test_patching_activity_rules_invalidates_cached_rules(db, cache):
+    """Zapis przez ChallengesManager unieważnia namespace reguł po commicie."""
+    manager = ChallengesManager(db)
+    challenge = manager.create_challenge(
+        ChallengeCreate(
+            name="Cache",
+            start_date=datetime(2026, 4, 1, tzinfo=timezone.utc),
+            end_date=datetime(2026, 4, 30, tzinfo=timezone.utc),
+        )
+    )
+
+    def cached_min_distance() -> float:
+        return cache.get_or_load(
+            ACTIVITY_RULES,
+            f"challenge:{challenge.id}",
+            lambda: {rule.activity_type: float(rule.min_distance) for rule in manager.list_activity_rules(challenge.id)},
+        )["rower"]
+
+    assert cached_min_distance() == 6.0
+    manager.patch_activity_rules(challenge.id, [ActivityRulePatchPayload(activity_type="rower", min_distance=12)])
+
+    assert cached_min_distance() == 12.0
+
+
+def test_activity_writes_invalidate_only_the_owners_stats(db, cache):
+    """Statystyki dashboardu są cache'owane per użytkownik; zapis cudzej aktywności ich nie rusza."""
+    manager = ActivityManager(db)
+
+    def create(iid: str, discord_id: str):
+        return manager.create_activity(
+            ActivityCreate(
+                iid=iid,
+                discord_id=discord_id,
+                display_name=f"Gracz {discord_id}",
+                activity_type="rower",
+                distance_km=20,
+                base_points=2000,
+                total_points=2000,
+                created_at=datetime(2026, 4, 2, tzinfo=timezone.utc),
+            )
+        )
+
+    create("s1", "111")
+    owner, other = cache._generation(user_stats_namespace("111")), cache._generation(user_stats_namespace("222"))
+
+    create("s2", "222")
+    assert cache._generation(user_stats_namespace("111")) == owner
+    assert cache._generation(user_stats_namespace("222")) != other
+
+    manager.update_activity("s1", total_points=2500)
+    assert cache._generation(user_stats_namespace("111")) != owner
+
+    owner = cache._generation(user_stats_namespace("111"))
+    manager.delete_activity("s1")
+    assert cache._generation(user_stats_namespace("111")) != owner
+
+
+def test_version_changes_with_invalidation_and_local_ttl(monkeypatch):
+    """Wersja (ETag dashboardu) zmienia się po zapisie; bez Redisa także co ttl_seconds."""
+    cache = SharedCache(InMemoryCacheBackend(), ttl_seconds=30)
+    monkeypatch.setattr(shared_cache.time, "time", lambda: 1000.0)
+    before = cache.version(CHALLENGES)
+
+    assert cache.version(CHALLENGES) == before
+    cache.invalidate(CHALLENGES)
+    assert cache.version(CHALLENGES) != before
+
+    current = cache.version(CHALLENGES)
+    monkeypatch.setattr(shared_cache.time, "time", lambda: 1030.0)
+    assert cache.version(CHALLENGES) != current
+
+
+def test_ranking_is_invalidated_by_new_users_avatars_and_challenge_delete(db, cache):
+    """Ranking graczy pokazuje też użytkowników bez aktywności, ich awatary i podział na challenge."""
+    users = UsersManager(db)
+
+    def bumped(write) -> bool:
+        before = cache._generation(RANKINGS)
+        write()
+        return cache._generation(RANKINGS) != before
+
+    assert bumped(lambda: users.upsert_user(UserUpsert(discord_id="900", display_name="Nowy")))
+    assert not bumped(lambda: users.upsert_user(UserUpsert(discord_id="900", display_name="Nowy")))
+    assert bumped(lambda: users.upsert_user(UserUpsert(discord_id="900", display_name="Nowy", avatar_url="a.png")))
+
+    challenges = ChallengesManager(db)
+    challenge = challenges.create_challenge(
+        ChallengeCreate(
+            name="Do usunięcia",
+            start_date=datetime(2026, 4, 1, tzinfo=timezone.utc),
+            end_date=datetime(2026, 4, 30, tzinfo=timezone.utc),
+        )
+    )
+    assert bumped(lambda: challenges.delete_challenge(challenge.id))
@@ -0,0 +1,18 @@
+"""
+conftest.py — Ścieżki importu dla testów bota Discord
+======================================================
+
+Moduły bota importują się jako `ai.*`, `api.*`, `bot.*`, `utils.*` oraz
+`libs.shared.*` — tak samo jak przy starcie przez `run.py`. Dorzucamy więc
+katalog serwisu i katalog główny repozytorium do sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+BOT_SERVICE_ROOT = REPO_ROOT / "services" / "discord-bot-szczypior"
+
+for _path in (str(BOT_SERVICE_ROOT), str(REPO_ROOT)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,148 @@
+"""Testy lokalnego outboxa zapisow aktywnosci (api.outbox)."""
+
+import asyncio
+from datetime import datetime, timezone
+
+from api.api_menager import APIManagerError, APIManagerHTTPError
+from api.outbox import ActivityOutbox
+from libs.shared.schemas.activity import ActivityBatchItemRead, ActivityCreate
+
+
+def _payload(iid: str, distance_km: float = 5.0) -> ActivityCreate:
+    return ActivityCreate(
+        discord_id="100",
+        display_name="Biegacz",
+        iid=iid,
+        activity_type="bieganie_teren",
+        distance_km=distance_km,
+        base_points=500,
+        total_points=500,
+        created_at=datetime(2026, 3, 10, 9, 0, tzinfo=timezone.utc),
+    )
+
+
+class FakeAPI:
+    def __init__(self, batch_error=None, single_errors=None):
+        self.batches: list[list[str]] = []
+        self.singles: list[str] = []
+        self.batch_error = batch_error
+        self.single_errors = single_errors or {}
+
+    def save_activities_batch(self, payloads):
+        if self.batch_error is not None:
+            raise self.batch_error
+        self.batches.append([payload.iid for payload in payloads])
+        return [ActivityBatchItemRead(iid=payload.iid, status="created") for payload in payloads]
+
+    def save_activity(self, payload):
+        self.singles.append(payload.iid)
+        if payload.iid in self.single_errors:
+            raise self.single_errors[payload.iid]
+        return None
+
+
+def _outbox(tmp_path, api, **kwargs):
+    return ActivityOutbox(str(tmp_path / "outbox.sqlite3"), api_manager_factory=lambda: api, **kwargs)
+
+
+def test_enqueued_activities_are_flushed_in_one_batch(tmp_path):
+    api = FakeAPI()
+    outbox = _outbox(tmp_path, api)
+    for index in range(3):
+        outbox.enqueue(_payload(f"iid_{index}"))
+    outbox.enqueue(_payload("iid_0"))
+
+    assert outbox.contains("iid_1")
+    assert asyncio.run(outbox.flush_once()) == 3
+    assert api.batches == [["iid_0", "iid_1", "iid_2"]]
+    assert outbox.get_stats()["pending"] == 0
+    assert not outbox.contains("iid_1")
+
+
+def test_pending_rows_survive_restart(tmp_path):
+    _outbox(tmp_path, FakeAPI()).enqueue(_payload("iid_persisted"))
+
+    api = FakeAPI()
+    reopened = _outbox(tmp_path, api)
+    asyncio.run(reopened.flush_once())
+    assert api.batches == [["iid_persisted"]]
+
+
+def test_failed_batch_is_rescheduled_with_backoff(tmp_path):
+    api = FakeAPI(batch_error=APIManagerError("db-service down"))
+    outbox = _outbox(tmp_path, api)
+    outbox.enqueue(_payload("iid_retry"))
+
+    assert asyncio.run(outbox.flush_once()) == 0
+    stats = outbox.get_stats()
+    assert stats["pending"] == 1
+    assert stats["last_error"] == "db-service down"
+
+
+def test_rejected_payload_does_not_block_the_batch(tmp_path):
+    api = FakeAPI(
+        batch_error=APIManagerHTTPError(422, "invalid", "/activities/batch"),
+        single_errors={
+            "iid_bad": APIManagerHTTPError(422, "invalid", "/activities"),
+            "iid_dup": APIManagerHTTPError(409, "exists", "/activities"),
+        },
+    )
+    outbox = _outbox(tmp_path, api)
+    for iid in ("iid_ok", "iid_bad", "iid_dup"):
+        outbox.enqueue(_payload(iid))
+
+    asyncio.run(outbox.flush_once())
+    assert api.singles == ["iid_ok", "iid_bad", "iid_dup"]
+    assert outbox.get_stats()["pending"] == 0
+    assert outbox.get_stats()["failed"] == 1
+    # A rejected row is not a saved activity, so it must not block a re-post.
+    assert not outbox.contains("iid_bad")
+
+    assert outbox.requeue_failed() == 1
+    assert outbox.contains("iid_bad")
+
+
+def test_transport_errors_never_mark_rows_failed(tmp_path):
+    api = FakeAPI(batch_error=APIManagerError("db-service down"))
+    outbox = _outbox(tmp_path, api, alert_after_attempts=2)
+    outbox.enqueue(_payload("iid_retry"))
+
+    for _ in range(5):
+        outbox._connection.execute("UPDATE activity_outbox SET next_attempt_at = 0")
+        asyncio.run(outbox.flush_once())
+    stats = outbox.get_stats()
+    assert (stats["pending"], stats["failed"]) == (1, 0)
+
+
+def test_batch_rejections_are_kept_as_failed(tmp_path):
+    class RejectingAPI(FakeAPI):
+        def save_activities_batch(self, payloads):
+            return [
+                ActivityBatchItemRead(iid=payloads[0].iid, status="created"),
+                ActivityBatchItemRead(iid=payloads[1].iid, status="rejected", detail="FOREIGN KEY constraint failed"),
+            ]
+
+    outbox = _outbox(tmp_path, RejectingAPI())
+    outbox.enqueue(_payload("iid_ok"))
+    outbox.enqueue(_payload("iid_fk"))
+
+    asyncio.run(outbox.flush_once())
+    stats = outbox.get_stats()
+    assert (stats["pending"], stats["failed"]) == (0, 1)
+
+
+def test_background_flusher_sends_enqueued_rows(tmp_path):
+    api = FakeAPI()
+
+    async def scenario():
+        outbox = _outbox(tmp_path, api, linger_seconds=0.01, flush_interval_seconds=10)
+        await outbox.start()
+        await asyncio.to_thread(outbox.enqueue, _payload("iid_live"))
+        for _ in range(100):
+            if api.batches:
+                break
+            await asyncio.sleep(0.01)
+        await outbox.stop()
+
+    asyncio.run(scenario())
+    assert api.batches == [["iid_live"]]
@@ -0,0 +1,87 @@
+"""Testy cache wyników ekstrakcji LLM (ai.cache)."""
+
+import asyncio
+
+from ai.cache import (
+    ExtractionCache,
+    build_extraction_cache_key,
+    image_url_digest,
+    prompt_version,
+)
+from ai import graphs
+from ai.schemas import ActivityParams
+
+
+def _params(distance_km: float = 10.0) -> ActivityParams:
+    return ActivityParams(activity_type="bieganie_teren", distance_km=distance_km)
+
+
+def _key(text: str, version: str = "v1") -> str:
+    return build_extraction_cache_key(text=text, image_digest="", prompt_version=version, model="m")
+
+
+def test_key_ignores_whitespace_and_case():
+    assert _key("Bieg  10 km\n") == _key("bieg 10 km")
+
+
+def test_key_changes_with_prompt_version():
+    v1 = prompt_version([("system", "a")])
+    v2 = prompt_version([("system", "b")])
+    assert v1 != v2
+    assert _key("bieg 10 km", v1) != _key("bieg 10 km", v2)
+
+
+def test_image_digest_ignores_cdn_signature():
+    base = "https://cdn.discordapp.com/attachments/1/2/screen.png"
+    assert image_url_digest(f"{base}?ex=1&is=2&hm=3") == image_url_digest(f"{base}?ex=9&is=8&hm=7")
+
+
+def test_lru_evicts_oldest_entry():
+    cache = ExtractionCache(max_entries=2)
+    cache.set("a", _params(1))
+    cache.set("b", _params(2))
+    assert cache.get("a") is not None
+    cache.set("c", _params(3))
+    assert cache.get("b") is None
+    assert cache.get("a").distance_km == 1
+    assert cache.get("c").distance_km == 3
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "extraction.sqlite3")
+    cache = ExtractionCache(sqlite_path=path)
+    cache.set("k", _params(7.5))
+    cache.close()
+
+    reopened = ExtractionCache(sqlite_path=path)
+    assert reopened.get("k") == _params(7.5)
+    assert reopened.hits == 1
+
+
+def test_graph_cache_hit_skips_llm_call(monkeypatch):
+    calls: list[str] = []
+
+    async def fake_llm(user_message: str) -> ActivityParams:
+        calls.append(user_message)
+        return _params(12.0)
+
+    monkeypatch.setattr(graphs, "analyze_message_only", fake_llm)
+    cache = ExtractionCache()
+    # Too vague for the regex fast path, so the first call goes to the LLM.
+    state = {"content": "dzisiaj bieganie, okolo dwunastu kilometrow", "message_id": "1"}
+
+    first = asyncio.run(graphs.extract_activity(state, cache))
+    second = asyncio.run(graphs.extract_activity(state, cache))
+
+    assert calls == [state["content"]]
+    assert first == second
+    assert first["distance_km"] == 12.0
+    assert cache.hits == 1
+
+
+def test_fast_path_hits_are_not_cached():
+    cache = ExtractionCache()
+    result = asyncio.run(graphs.extract_activity({"content": "bieg 10 km 52:30 5:15/km"}, cache))
+
+    assert result["distance_km"] == 10.0
+    assert len(cache) == 0
@@ -0,0 +1,74 @@
+"""Testy deterministycznej ekstrakcji aktywności z tekstu (ai.fast_path)."""
+
+from ai.fast_path import evaluate_fast_path, extract_activity_from_text
+
+
+def test_well_formed_run_report_is_confident():
+    result = extract_activity_from_text("bieg 10 km 52:30 5:15/km")
+    assert result.is_confident()
+    assert result.params.activity_type == "bieganie_teren"
+    assert result.params.distance_km == 10.0
+    assert result.params.time_minutes == 53
+    assert result.params.pace == "5:15/km"
+
+
+def test_decimal_comma_elevation_and_hours():
+    result = extract_activity_from_text("rower 25,5 km 1h 10min +350 m przewyższenia")
+    assert result.is_confident()
+    assert result.params.distance_km == 25.5
+    assert result.params.time_minutes == 70
+    assert result.params.elevation_m == 350
+
+
+def test_weight_without_value_goes_to_llm():
+    result = extract_activity_from_text("spacer 5km z plecakiem")
+    assert not result.is_confident()
+    assert "weight_without_value" in result.reasons
+
+
+def test_ambiguous_distance_goes_to_llm():
+    result = extract_activity_from_text("bieg 5 km i 10 km")
+    assert result.params is None
+    assert not result.is_confident()
+
+
+def test_no_activity_type_goes_to_llm():
+    assert not extract_activity_from_text("dzisiaj 10 km").is_confident()
+
+
+def test_inconsistent_pace_lowers_confidence():
+    result = extract_activity_from_text("bieg 10 km 30:00 5:15/km")
+    assert "inconsistent_time_pace" in result.reasons
+    assert not result.is_confident()
+
+
+def test_evaluate_fast_path_reports_hit_rate_and_accuracy():
+    report = evaluate_fast_path(
+        [
+            ("bieg 10 km 52:30 5:15/km", {"activity_type": "bieganie_teren", "distance_km": 10.0, "time_minutes": 53}),
+            ("spacer 5km 12 kg", {"activity_type": "spacer", "distance_km": 5.0, "weight_kg": 10.0}),
+            ("trening na siłowni", {"activity_type": "cardio", "distance_km": 1.0}),
+        ]
+    )
+    assert report["samples"] == 3
+    assert report["hits"] == 2
+    assert report["accurate_hits"] == 1
+    assert report["field_mismatches"] == {"weight_kg": 1}
+
+
+def test_two_part_clock_is_read_as_hours_when_pace_requires_it():
+    result = extract_activity_from_text("rower 40 km 1:30")
+    assert result.params.time_minutes == 90
+    assert result.is_confident()
+
+
+def test_hours_in_polish_are_converted():
+    result = extract_activity_from_text("bieg 10 km 2 godz")
+    assert result.params.time_minutes == 120
+    assert result.is_confident()
+
+
+def test_implausible_clock_lowers_confidence():
+    result = extract_activity_from_text("bieg 100 km 0:30")
+    assert "implausible_time" in result.reasons
+    assert not result.is_confident()
@@ -0,0 +1,70 @@
+"""Testy skrotu historii aktywnosci do promptu komentarza (ai.history)."""
+
+from datetime import datetime, timedelta, timezone
+
+from ai.history import NO_HISTORY, HistoryDigestCache, estimate_tokens, summarize_history
+from libs.shared.schemas.activity import ActivityRead
+
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def _activity(index: int, activity_type: str, distance_km: float, days_ago: float) -> ActivityRead:
+    return ActivityRead(
+        id=index,
+        iid=f"iid-{index}",
+        activity_type=activity_type,
+        distance_km=distance_km,
+        base_points=int(distance_km * 100),
+        weight_bonus_points=0,
+        elevation_bonus_points=0,
+        mission_bonus_points=0,
+        total_points=int(distance_km * 100),
+        special_mission_id=None,
+        challenge_id=1,
+        created_at=NOW - timedelta(days=days_ago),
+        ai_comment="Dlugi komentarz z poprzedniej aktywnosci, ktory nie powinien trafic do promptu.",
+    )
+
+
+def test_summary_has_totals_trend_bests_and_recent_rows():
+    history = [
+        _activity(1, "bieganie_teren", 5.0, 12),
+        _activity(2, "rower", 40.0, 9),
+        _activity(3, "bieganie_teren", 15.0, 3),
+        _activity(4, "bieganie_teren", 8.0, 1),
+    ]
+
+    summary = summarize_history(history, now=NOW)
+
+    assert "bieganie_teren|3|28.0|2800|15.0@2026-03-07" in summary
+    assert "rower|1|40.0|4000|40.0@2026-03-01" in summary
+    assert "trend_7d: n=2 km=23.0 (poprzednie 7d: n=2 km=45.0)" in summary
+    assert "rekord_pkt: 4000 (rower 40.0 km" in summary
+    assert summary.splitlines()[-4] == "2026-03-09|bieganie_teren|8.0|800"
+    assert "komentarz" not in summary
+
+
+def test_summary_is_much_smaller_than_full_json():
+    import json
+
+    history = [_activity(i, "bieganie_teren", 5.0 + i, i) for i in range(20)]
+    full_json = json.dumps([a.model_dump(mode="json") for a in history], ensure_ascii=False, indent=2)
+
+    assert estimate_tokens(summarize_history(history, now=NOW)) * 5 < estimate_tokens(full_json)
+    assert summarize_history([]) == NO_HISTORY
+
+
+def test_cache_is_invalidated_by_save_and_ignores_stale_builds():
+    cache = HistoryDigestCache()
+    history = [_activity(1, "rower", 20.0, 1)]
+
+    generation = cache.generation("42")
+    digest = cache.build("42", history, generation)
+    assert cache.get("42") == digest
+
+    cache.invalidate("42")
+    assert cache.get("42") is None
+
+    # History fetched before the save must not repopulate the cache.
+    cache.build("42", history, generation)
+    assert cache.get("42") is None
@@ -0,0 +1,53 @@
+"""Testy ekstrakcji z wielu zalacznikow graficznych i laczenia wynikow."""
+
+import asyncio
+import time
+
+from ai import graphs
+from ai.cache import ExtractionCache
+from ai.schemas import ActivityParams
+
+
+def test_merge_prefers_richest_image_and_fills_gaps_from_others():
+    map_screen = ActivityParams(activity_type="bieganie_teren", distance_km=10.4, elevation_m=230)
+    watch_screen = ActivityParams(
+        activity_type="bieganie_teren", distance_km=10.02, time_minutes=52, pace="5:11", heart_rate_avg=151
+    )
+    photo = ActivityParams(activity_type="spacer", distance_km=1.0)
+
+    merged = graphs.merge_activity_params([map_screen, watch_screen, photo])
+
+    assert merged == ActivityParams(
+        activity_type="bieganie_teren",
+        distance_km=10.02,
+        elevation_m=230,
+        time_minutes=52,
+        pace="5:11",
+        heart_rate_avg=151,
+    )
+    assert graphs.merge_activity_params([photo, map_screen, watch_screen]) == merged
+
+
+def test_all_images_are_extracted_concurrently_and_failures_are_skipped(monkeypatch):
+    async def fake_prepare(image_url):
+        return image_url, image_url
+
+    async def fake_llm(picture_url, user_message):
+        await asyncio.sleep(0.1)
+        if picture_url.endswith("broken"):
+            raise RuntimeError("vision call failed")
+        if picture_url.endswith("watch"):
+            return ActivityParams(activity_type="rower", distance_km=42.0, time_minutes=95)
+        return ActivityParams(activity_type="rower", distance_km=40.0, elevation_m=410)
+
+    monkeypatch.setattr(graphs, "_prepare_picture", fake_prepare)
+    monkeypatch.setattr(graphs, "analyze_message_and_picture", fake_llm)
+    monkeypatch.setattr(graphs, "LLM_RETRY_POLICY", graphs.RetryPolicy(max_attempts=1))
+    state = {"content": "rower", "message_id": "1", "image_urls": ["img/watch", "img/map", "img/broken"]}
+
+    started = time.perf_counter()
+    result = asyncio.run(graphs.extract_activity(state, ExtractionCache()))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.25
+    assert (result["distance_km"], result["time_minutes"], result["elevation_m"]) == (42.0, 95, 410)
@@ -0,0 +1,25 @@
+"""Testy przygotowania obrazów przed ekstrakcją vision (ai.images)."""
+
+from io import BytesIO
+
+from PIL import Image
+
+from ai.images import preprocess_image_bytes
+
+
+def _png(size: tuple[int, int], mode: str = "RGBA") -> bytes:
+    image = Image.new(mode, size, (30, 120, 200, 128) if mode == "RGBA" else (30, 120, 200))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_large_transparent_png_is_downscaled_to_jpeg():
+    output, width, height = preprocess_image_bytes(_png((3000, 1500)), max_side=1024)
+
+    decoded = Image.open(BytesIO(output))
+    assert decoded.format == "JPEG"
+    assert decoded.mode == "RGB"
+    assert (width, height) == (1024, 512)
+    assert decoded.size == (1024, 512)
+
@@ -0,0 +1,97 @@
+"""Testy trybu gateway/worker na kolejce zadan w pamieci."""
+
+import asyncio
+
+import pytest
+
+from bot.message_handler import AIProcessingRequest
+from jobs.gateway import AIJobFailedError, QueueAIMessageProcessor
+from jobs.queue import AIJob, InMemoryJobQueue
+from jobs.worker import AIJobWorker
+
+
+def _request(message_id: str, content: str = "bieg 10 km") -> AIProcessingRequest:
+    return AIProcessingRequest(
+        message_id=message_id,
+        author_id="7",
+        author_display_name="Ola",
+        channel_id="3",
+        content=content,
+        created_at="2026-03-10T17:05:00+00:00",
+        progress=object(),
+    )
+
+
+def test_gateway_requests_are_processed_by_a_pool_of_workers():
+    handled_by: dict[str, str] = {}
+
+    def make_process(name: str):
+        async def process(request: dict) -> dict:
+            assert "progress" not in request
+            await asyncio.sleep(0.05)
+            handled_by[request["message_id"]] = name
+            if request["content"] == "boom":
+                raise RuntimeError("graph failed")
+            return {"status": "processed", "reaction": "✅", "reply_text": f"ok {request['message_id']}"}
+
+        return process
+
+    async def scenario():
+        queue = InMemoryJobQueue()
+        gateway = QueueAIMessageProcessor(queue, result_timeout_seconds=2)
+        workers = [AIJobWorker(queue, make_process(name), concurrency=2, consumer=name) for name in ("a", "b")]
+        await gateway.start()
+        for worker in workers:
+            await worker.start()
+        try:
+            results = await asyncio.gather(*(gateway.process_message(_request(str(index))) for index in range(8)))
+            with pytest.raises(AIJobFailedError, match="graph failed"):
+                await gateway.process_message(_request("99", content="boom"))
+        finally:
+            for worker in workers:
+                await worker.stop()
+            await gateway.stop()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert [result.reply_text for result in results] == [f"ok {index}" for index in range(8)]
+    assert set(handled_by.values()) == {"a", "b"}
+
+
+def test_unacked_job_is_redelivered_and_stored_result_is_not_recomputed():
+    calls: list[str] = []
+
+    async def process(request: dict) -> dict:
+        calls.append(request["message_id"])
+        return {"status": "processed", "reply_text": "raz"}
+
+    async def scenario():
+        queue = InMemoryJobQueue(claim_idle_seconds=0.05)
+        await queue.enqueue(AIJob.from_request(_request("1")))
+
+        lost = await queue.consume("crashed-worker", block_seconds=0)
+        assert await queue.consume("other", block_seconds=0) is None
+        redelivered = await queue.consume("other", block_seconds=0.5)
+        assert redelivered.job.job_id == lost.job.job_id
+        assert redelivered.deliveries == 2
+
+        worker = AIJobWorker(queue, process)
+        await worker.handle(redelivered)
+        # The "crashed" worker comes back and finishes its stale copy: the stored result is replayed.
+        replayed = await worker.handle(lost)
+        return replayed, worker
+
+    replayed, worker = asyncio.run(scenario())
+
+    assert calls == ["1"]
+    assert replayed.reply_text == "raz"
+    assert (worker.processed, worker.replayed) == (1, 1)
+
+
+def test_job_id_is_stable_for_redelivery_but_changes_with_edited_content():
+    original = AIJob.from_request(_request("1"))
+
+    assert AIJob.from_json(original.to_json()).job_id == original.job_id
+    assert original.job_id.startswith("1773162300_1:")
+    assert AIJob.from_request(_request("1", content="bieg 12 km")).job_id != original.job_id
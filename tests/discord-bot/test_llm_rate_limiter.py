@@ -0,0 +1,93 @@
+"""Testy asynchronicznego limitera RPM/TPM dla modeli LLM (ai.rate_limiter)."""
+
+import asyncio
+
+from ai.rate_limiter import (
+    AsyncModelRateLimiter,
+    RequestPriority,
+    _parse_reset_seconds,
+    llm_priority,
+)
+
+
+def test_parse_reset_seconds():
+    assert _parse_reset_seconds("1s") == 1.0
+    assert _parse_reset_seconds("6m0s") == 360.0
+    assert _parse_reset_seconds("120ms") == 0.12
+    assert _parse_reset_seconds(None) is None
+
+
+def test_unlimited_model_does_not_wait():
+    limiter = AsyncModelRateLimiter()
+
+    async def scenario():
+        await asyncio.wait_for(limiter.acquire("gpt-4o-mini"), timeout=0.1)
+
+    asyncio.run(scenario())
+    assert limiter.get_stats()["gpt-4o-mini"]["granted"] == 1
+
+
+def test_live_requests_overtake_backlog():
+    # 1200 RPM = one slot every 50 ms after the initial burst of one.
+    limiter = AsyncModelRateLimiter(rpm_map={"m": 1200})
+    limiter._state("m").requests.available = 0.0
+    order: list[str] = []
+
+    async def call(name: str, priority: RequestPriority):
+        with llm_priority(priority):
+            await limiter.acquire("m")
+        order.append(name)
+
+    async def scenario():
+        backlog = [asyncio.create_task(call(f"backlog-{i}", RequestPriority.BACKLOG)) for i in range(2)]
+        await asyncio.sleep(0)
+        assert limiter.get_stats()["m"]["queue_depth_by_priority"] == {"backlog": 2}
+        live = asyncio.create_task(call("live", RequestPriority.LIVE))
+        await asyncio.gather(*backlog, live)
+
+    asyncio.run(scenario())
+    assert order[0] == "live"
+
+
+def test_headers_tighten_budget():
+    limiter = AsyncModelRateLimiter()
+    limiter.update_from_headers(
+        "gpt-4o-mini",
+        {
+            "x-ratelimit-limit-requests": "500",
+            "x-ratelimit-remaining-requests": "3",
+            "x-ratelimit-reset-requests": "1s",
+        },
+    )
+    stats = limiter.get_stats()["gpt-4o-mini"]
+    assert stats["rpm_limit"] == 500
+    assert limiter._state("gpt-4o-mini").requests.available < 10
+
+
+def test_header_update_releases_waiting_requests():
+    # 1 RPM: without a re-dispatch the waiter would sleep for a full minute.
+    limiter = AsyncModelRateLimiter(rpm_map={"m": 1})
+    limiter._state("m").requests.available = 0.0
+
+    async def scenario():
+        waiter = asyncio.create_task(limiter.acquire("m"))
+        await asyncio.sleep(0)
+        # Provider says the window resets in 100 ms, far sooner than our estimate.
+        limiter.update_from_headers(
+            "m",
+            {
+                "x-ratelimit-limit-requests": "1",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "100ms",
+            },
+        )
+        await asyncio.wait_for(waiter, timeout=1.0)
+
+    asyncio.run(scenario())
+    assert limiter.get_stats()["m"]["granted"] == 1
+
+
+def test_headers_callback_runs_on_the_event_loop():
+    from ai.llm_callbacks import RateLimitHeadersCallback
+
+    assert RateLimitHeadersCallback(AsyncModelRateLimiter(), "m").run_inline
@@ -0,0 +1,42 @@
+"""Testy rejestru metryk Prometheus (utils.metrics)."""
+
+from utils.metrics import MetricsRegistry
+
+
+def test_counter_renders_labels_and_values():
+    registry = MetricsRegistry()
+    messages = registry.counter("bot_test_messages_total", "Test.", ("outcome",))
+    messages.inc(outcome="seen")
+    messages.inc(2, outcome="seen")
+    messages.inc(outcome='dup"ed')
+
+    text = registry.render()
+    assert "# TYPE bot_test_messages_total counter" in text
+    assert 'bot_test_messages_total{outcome="seen"} 3' in text
+    assert 'bot_test_messages_total{outcome="dup\\"ed"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    stages = registry.histogram("bot_test_stage_seconds", "Test.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        stages.observe(value, stage="extract")
+
+    lines = registry.render().splitlines()
+    assert 'bot_test_stage_seconds_bucket{stage="extract",le="0.1"} 1' in lines
+    assert 'bot_test_stage_seconds_bucket{stage="extract",le="1"} 3' in lines
+    assert 'bot_test_stage_seconds_bucket{stage="extract",le="+Inf"} 4' in lines
+    assert 'bot_test_stage_seconds_count{stage="extract"} 4' in lines
+    assert 'bot_test_stage_seconds_sum{stage="extract"} 6.25' in lines
+
+
+def test_timer_and_gauge_callback():
+    registry = MetricsRegistry()
+    stages = registry.histogram("bot_test_timer_seconds", "Test.", ("stage",))
+    with stages.time(stage="handle"):
+        pass
+    registry.gauge_callback("bot_test_queue_depth", "Test.", lambda: [({"priority": "live"}, 2)])
+
+    text = registry.render()
+    assert stages.count(stage="handle") == 1
+    assert 'bot_test_queue_depth{priority="live"} 2' in text
@@ -0,0 +1,88 @@
+"""Testy trybu jednego wywolania LLM (ekstrakcja + komentarz) w grafie aktywnosci."""
+
+import asyncio
+
+import pytest
+
+from ai import graphs
+from ai.cache import ExtractionCache
+from ai.history import HistoryDigestCache
+from ai.schemas import ActivityWithComment
+
+
+@pytest.fixture
+def combined_graph(monkeypatch):
+    calls = {"combined": 0, "comment": 0, "saved": []}
+
+    async def fake_combined(**kwargs):
+        calls["combined"] += 1
+        assert "rower: 6" in kwargs["minimum_distances"]
+        return ActivityWithComment(activity_type="rower", distance_km=kwargs["distance"], comment="Pedaluj, rekrucie!")
+
+    async def fake_comment(**kwargs):
+        calls["comment"] += 1
+        return "Komentarz z osobnego chaina"
+
+    def fail_api_manager():
+        raise RuntimeError("no db-service in tests")
+
+    monkeypatch.setattr(graphs, "APIManager", fail_api_manager)
+    monkeypatch.setattr(graphs, "get_activity_outbox", lambda: None)
+    monkeypatch.setattr(graphs, "get_extraction_cache", ExtractionCache)
+    monkeypatch.setattr(graphs, "get_history_digest_cache", HistoryDigestCache)
+    monkeypatch.setattr(graphs, "get_user_activity_history", lambda discord_id: [])
+    monkeypatch.setattr(graphs, "save_activity", lambda payload: calls["saved"].append(payload) or payload)
+    monkeypatch.setattr(graphs, "generate_activity_comment", fake_comment)
+
+    def run(content: str, distance: float) -> dict:
+        async def combined(**kwargs):
+            return await fake_combined(distance=distance, **kwargs)
+
+        monkeypatch.setattr(graphs, "analyze_activity_with_comment", combined)
+        graph = graphs.build_activity_state_graph("combined")
+        state = {
+            "message_id": "10",
+            "author_id": "7",
+            "author_display_name": "Ola",
+            "channel_id": None,
+            "content": content,
+            "created_at": "2026-03-10T17:05:00+00:00",
+        }
+        return asyncio.run(graph.ainvoke(state))
+
+    return run, calls
+
+
+def test_combined_mode_uses_one_llm_call_and_saves(combined_graph):
+    run, calls = combined_graph
+
+    result = run("dzisiaj rowerem na dzialke i z powrotem", 20.0)
+
+    assert calls["combined"] == 1
+    assert calls["comment"] == 0
+    assert result["comment"] == "Pedaluj, rekrucie!"
+    assert calls["saved"][0].ai_comment == "Pedaluj, rekrucie!"
+
+
+def test_combined_mode_gates_save_on_deterministic_distance_check(combined_graph):
+    run, calls = combined_graph
+
+    result = run("dzisiaj rowerem do sklepu", 2.0)
+
+    assert calls["saved"] == []
+    assert result["comment"].endswith(graphs.BELOW_MINIMUM_DISTANCE_NOTE)
+
+
+def test_combined_mode_fast_path_only_generates_comment(combined_graph):
+    run, calls = combined_graph
+
+    result = run("bieg 10 km 52:30 5:15/km", 0.0)
+
+    assert calls["combined"] == 0
+    assert calls["comment"] == 1
+    assert result["comment"] == "Komentarz z osobnego chaina"
+
+
+def test_unknown_pipeline_mode_falls_back_to_two_call():
+    assert graphs.resolve_pipeline_mode("Combined ") == "combined"
+    assert graphs.resolve_pipeline_mode("three_call") == "two_call"
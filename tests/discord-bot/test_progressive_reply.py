@@ -0,0 +1,88 @@
+"""Testy strumieniowanego komentarza: edytowana odpowiedz Discord i astream w chainach."""
+
+import asyncio
+
+from langchain_core.runnables import RunnableGenerator
+
+from ai import chains
+from bench.fakes import DiscordRestStats, FakeAuthor, FakeChannel, FakeMessage, FakeMessageType
+from bot.progressive_reply import WRITING_MARKER, ProgressiveReply
+
+
+def _message() -> FakeMessage:
+    from datetime import datetime, timezone
+
+    return FakeMessage(
+        id=1,
+        author=FakeAuthor(id=2, display_name="Ola"),
+        channel=FakeChannel(id=3),
+        content="bieg 10 km",
+        created_at=datetime(2026, 3, 10, tzinfo=timezone.utc),
+        attachments=[],
+        type=FakeMessageType(),
+        rest_stats=DiscordRestStats(),
+    )
+
+
+def test_reply_is_posted_on_preview_and_edits_are_throttled():
+    message = _message()
+
+    async def scenario():
+        reply = ProgressiveReply(message, min_edit_interval_seconds=0.05)
+        await reply.preview("🏃 Bieganie: 10 km · 1000 pkt")
+        await asyncio.sleep(0.01)
+        assert message.replies[0].content == f"🏃 Bieganie: 10 km · 1000 pkt {WRITING_MARKER}"
+
+        for index in range(1, 40):
+            await reply.partial("slowo " * index)
+            await asyncio.sleep(0.002)
+        assert await reply.finish("Dobra robota!") is True
+
+    asyncio.run(scenario())
+
+    assert len(message.replies) == 1
+    assert message.replies[0].content == "🏃 Bieganie: 10 km · 1000 pkt\n\nDobra robota!"
+    # ~80 ms of tokens at a 50 ms interval: a couple of edits, not one per token.
+    assert 1 <= message.rest_stats.edits <= 4
+
+
+def test_abort_deletes_partial_reply_and_finish_without_reply_falls_back():
+    message = _message()
+
+    async def scenario():
+        streamed = ProgressiveReply(message, min_edit_interval_seconds=0)
+        await streamed.preview("🚴 Rower: 20 km")
+        await asyncio.sleep(0.01)
+        await streamed.abort()
+
+        silent = ProgressiveReply(message)
+        return await silent.finish("komentarz")
+
+    assert asyncio.run(scenario()) is False
+    assert message.replies == []
+    assert message.rest_stats.deletes == 1
+
+
+def test_streamed_fallback_restarts_partial_text(monkeypatch):
+    partials: list[str] = []
+
+    async def failing(_):
+        yield "Zla "
+        raise RuntimeError("provider dropped the stream")
+
+    async def working(_):
+        for token in ("Dobra ", "robota"):
+            yield token
+
+    models = {"a": RunnableGenerator(failing), "b": RunnableGenerator(working)}
+    monkeypatch.setattr(chains, "get_chat_model", lambda name, temperature=None: models[name])
+
+    async def on_partial(text: str) -> None:
+        partials.append(text)
+
+    result = asyncio.run(
+        chains._ainvoke_with_fallbacks("stream_test", ["a", "b"], lambda llm: llm, {}, on_partial=on_partial)
+    )
+
+    assert result == "Dobra robota"
+    assert partials == ["Zla ", "Dobra ", "Dobra robota"]
@@ -0,0 +1,61 @@
+"""Testy harnessu nagrywania i odtwarzania ruchu (bench)."""
+
+import asyncio
+from pathlib import Path
+
+from bench.fakes import FakeMessage
+from bench.fixtures import RecordedMessage, ReplayFixture, current_message_id
+from bench.recorder import FixtureRecorder
+from bench.replay import ReplayConfig, run_replay
+
+SAMPLE_FIXTURE = (
+    Path(__file__).parent.parent.parent / "services" / "discord-bot-szczypior" / "bench" / "data" / "sample_fixture.json"
+)
+
+
+def test_replay_runs_sample_fixture_through_handler_and_graph():
+    fixture = ReplayFixture.load(str(SAMPLE_FIXTURE))
+
+    report = asyncio.run(run_replay(fixture, ReplayConfig(concurrency=2, repeat=2)))
+
+    assert report["messages"] == 2 * len(fixture.messages)
+    assert report["outcomes"]["failed"] == 0
+    assert report["outcomes"]["processed"] == report["outcomes"]["forwarded"] > 0
+    assert report["saved_activities"] == report["outcomes"]["processed"]
+    assert report["messages_per_second"] > 0
+    assert {"extract_activity", "generate_comment", "queue_wait"} <= set(report["stages"])
+    assert report["memory"]["max_rss_mb"] > 0
+
+
+def test_recorded_message_round_trips_through_fixture_file(tmp_path):
+    recorded = RecordedMessage.from_dict(
+        {
+            "id": 7,
+            "author_id": 1,
+            "author_name": "Ola",
+            "channel_id": 900,
+            "content": "rower",
+            "created_at": "2026-03-10T17:05:00+00:00",
+            "attachments": [{"filename": "a.png", "content_type": "image/png", "width": 10, "height": 20}],
+        }
+    )
+    message = FakeMessage.from_recorded(recorded, attachment_base_url="http://stand-in/attachments")
+    recorder = FixtureRecorder(str(tmp_path / "fixture.json"))
+
+    async def extraction(**kwargs):
+        return {"activity_type": "rower", "distance_km": 12.0}
+
+    async def scenario():
+        token = current_message_id.set("7")
+        try:
+            await recorder._wrap_llm(extraction, "extraction")()
+        finally:
+            current_message_id.reset(token)
+
+    recorder.fixture.messages.append(RecordedMessage.from_discord(message))
+    asyncio.run(scenario())
+    recorder.save()
+
+    loaded = ReplayFixture.load(str(tmp_path / "fixture.json"))
+    assert loaded.messages == [recorded]
+    assert loaded.llm == {"7": {"extraction": {"activity_type": "rower", "distance_km": 12.0}}}
@@ -0,0 +1,144 @@
+"""Testy backoffu, budzetu retry i circuit breakerow (utils.resilience)."""
+
+import asyncio
+
+import pytest
+
+from utils import resilience
+from utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    retry_async,
+    retry_sync,
+)
+
+FAST_POLICY = RetryPolicy(max_attempts=3, base_delay_seconds=0.0, max_delay_seconds=0.0)
+
+
+def test_backoff_delay_is_capped_and_jittered():
+    policy = RetryPolicy(base_delay_seconds=1.0, max_delay_seconds=4.0, multiplier=2.0)
+    delays = [policy.delay_for(attempt) for attempt in range(1, 10) for _ in range(20)]
+    assert all(0.0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_retry_sync_retries_until_success():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("boom")
+        return "ok"
+
+    assert retry_sync(flaky, operation="test", policy=FAST_POLICY) == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_respects_retry_if():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ValueError("4xx")
+
+    with pytest.raises(ValueError):
+        retry_sync(bad_request, operation="test", policy=FAST_POLICY, retry_if=lambda exc: False)
+    assert len(calls) == 1
+
+
+def test_exhausted_budget_stops_retries():
+    budget = RetryBudget(ratio=0.0, min_tokens=1.0)
+    calls = []
+
+    async def always_fails():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(retry_async(always_fails, operation="test", policy=FAST_POLICY, budget=budget))
+    # One token: the first call plus a single retry.
+    assert len(calls) == 2
+    assert budget.exhausted == 1
+
+
+def test_breaker_opens_and_rejects_calls(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout_seconds=30.0)
+
+    def failing():
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            retry_sync(failing, operation="test", policy=RetryPolicy(max_attempts=1), breaker=breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        retry_sync(lambda: "ok", operation="test", breaker=breaker)
+    assert breaker.stats()["rejected"] == 1
+
+    clock[0] += 31.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert retry_sync(lambda: "ok", operation="test", breaker=breaker) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_half_open_probe_reopens_breaker(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout_seconds=10.0)
+    breaker.record_failure()
+    clock[0] = 11.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_count == 2
+
+
+def test_non_failures_do_not_trip_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    def not_found():
+        raise LookupError("404")
+
+    with pytest.raises(LookupError):
+        retry_sync(not_found, operation="test", policy=FAST_POLICY, breaker=breaker, is_failure=lambda exc: False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_half_open_probe_frees_the_breaker(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout_seconds=10.0)
+    breaker.record_failure()
+    clock[0] = 11.0
+
+    async def hangs():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        probe = asyncio.create_task(retry_async(hangs, operation="test", breaker=breaker))
+        await asyncio.sleep(0)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_stale_half_open_probe_expires(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout_seconds=10.0)
+    breaker.record_failure()
+    clock[0] = 11.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    clock[0] = 22.0
+    assert breaker.allow()
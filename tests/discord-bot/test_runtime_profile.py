@@ -0,0 +1,60 @@
+"""Testy profilu niskiej pamieci, zawezenia kanalow i raportu pamieci."""
+
+import tracemalloc
+from types import SimpleNamespace
+
+import discord
+
+from bot.runtime_profile import BotRuntimeProfile, ChannelScope
+from utils.memory import MemoryReporter
+
+
+def test_low_memory_profile_tunes_discord_caches(monkeypatch):
+    monkeypatch.setenv("BOT_MEMORY_PROFILE", "low")
+    profile = BotRuntimeProfile.from_env()
+
+    kwargs = profile.bot_kwargs()
+    intents = profile.apply_intents(discord.Intents.default())
+
+    assert kwargs["max_messages"] == 200
+    assert kwargs["member_cache_flags"].value == discord.MemberCacheFlags.none().value
+    assert kwargs["chunk_guilds_at_startup"] is False
+    assert not intents.typing and not intents.voice_states and intents.messages
+
+    monkeypatch.setenv("BOT_MAX_MESSAGES", "0")
+    assert BotRuntimeProfile.from_env().max_messages is None
+    monkeypatch.setenv("BOT_MEMORY_PROFILE", "default")
+    assert "member_cache_flags" not in BotRuntimeProfile.from_env().bot_kwargs()
+
+
+def test_channel_scope_limits_to_challenge_channels_and_their_threads():
+    assert ChannelScope(enabled=True).allows(SimpleNamespace(id=99))  # nothing configured: no restriction
+    scope = ChannelScope(static_ids={5}, enabled=True)
+    assert scope.needs_refresh
+
+    scope.update_from_challenges([SimpleNamespace(discord_channel_id="10"), SimpleNamespace(discord_channel_id=None)])
+
+    assert not scope.needs_refresh
+    assert scope.allows(SimpleNamespace(id=10))
+    assert scope.allows(SimpleNamespace(id=5))
+    assert scope.allows(SimpleNamespace(id=77, parent_id=10))
+    assert not scope.allows(SimpleNamespace(id=99))
+    scope.mark_stale()
+    assert scope.needs_refresh
+
+
+def test_memory_report_includes_rss_caches_and_top_allocations():
+    reporter = MemoryReporter(top=3, tracemalloc_frames=1)
+    reporter.register_source("discord_messages", lambda: 42)
+    reporter.register_source("broken", lambda: 1 / 0)
+    reporter.start_tracing()
+    try:
+        ballast = [bytearray(1024) for _ in range(1000)]
+        report = reporter.report()
+    finally:
+        tracemalloc.stop()
+
+    assert report["rss_bytes"] > 0
+    assert report["caches"] == {"discord_messages": 42}
+    assert len(report["tracemalloc"]["top"]) == 3
+    assert report["tracemalloc"]["current_bytes"] >= len(ballast) * 1024
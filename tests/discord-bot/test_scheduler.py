@@ -0,0 +1,126 @@
+"""Testy kolejki priorytetowej zadań AI (bot.scheduler)."""
+
+import asyncio
+
+import pytest
+
+from ai.rate_limiter import RequestPriority
+from bot.scheduler import JobDropped, MessageScheduler
+
+
+def test_live_jobs_run_before_backlog_and_edits():
+    order: list[str] = []
+
+    async def scenario():
+        scheduler = MessageScheduler(workers=1, max_queue=10)
+
+        def job(name: str):
+            async def run():
+                order.append(name)
+            return run
+
+        futures = [
+            await scheduler.submit(job("edit"), author_id="a", priority=RequestPriority.EDIT),
+            await scheduler.submit(job("backlog"), author_id="b", priority=RequestPriority.BACKLOG),
+            await scheduler.submit(job("live"), author_id="c", priority=RequestPriority.LIVE),
+        ]
+        await scheduler.start()
+        await asyncio.gather(*futures)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert order == ["live", "backlog", "edit"]
+
+
+def test_jobs_of_one_author_are_serialized():
+    running: set[str] = set()
+    overlaps: list[str] = []
+
+    async def scenario():
+        scheduler = MessageScheduler(workers=4, max_queue=10)
+        await scheduler.start()
+
+        def job(author: str):
+            async def run():
+                if author in running:
+                    overlaps.append(author)
+                running.add(author)
+                await asyncio.sleep(0.01)
+                running.discard(author)
+            return run
+
+        futures = [await scheduler.submit(job("same"), author_id="same") for _ in range(4)]
+        await asyncio.gather(*futures)
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert overlaps == []
+    assert stats["priorities"]["live"]["completed"] == 4
+
+
+def test_full_queue_evicts_lower_priority_then_drops():
+    async def scenario():
+        scheduler = MessageScheduler(workers=1, max_queue=1)
+
+        async def noop():
+            return None
+
+        edit = await scheduler.submit(noop, author_id="a", priority=RequestPriority.EDIT)
+        live = await scheduler.submit(noop, author_id="b", priority=RequestPriority.LIVE)
+        dropped = await scheduler.submit(noop, author_id="c", priority=RequestPriority.LIVE)
+
+        with pytest.raises(JobDropped):
+            await edit
+        assert dropped is None
+
+        await scheduler.start()
+        await live
+        stats = scheduler.get_stats()
+        await scheduler.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["priorities"]["edit"]["dropped"] == 1
+    assert stats["priorities"]["live"]["dropped"] == 1
+    assert stats["priorities"]["live"]["completed"] == 1
+
+
+def test_jobs_waiting_for_busy_author_count_against_the_bound():
+    async def scenario():
+        scheduler = MessageScheduler(workers=2, max_queue=1)
+        release = asyncio.Event()
+
+        async def blocks():
+            await release.wait()
+
+        async def noop():
+            return None
+
+        await scheduler.start()
+        running = await scheduler.submit(blocks, author_id="a")
+        await asyncio.sleep(0.01)
+        # Picked by the idle worker and parked behind the running job of author "a".
+        parked = await scheduler.submit(noop, author_id="a", priority=RequestPriority.EDIT)
+        await asyncio.sleep(0.01)
+        parked_stats = scheduler.get_stats()
+
+        live = await scheduler.submit(noop, author_id="b")
+        with pytest.raises(JobDropped):
+            await parked
+        release.set()
+        await asyncio.gather(running, live)
+        await scheduler.stop()
+        return parked_stats
+
+    parked_stats = asyncio.run(scenario())
+    assert parked_stats["queue_depth"] == 1
+    assert parked_stats["author_pending"] == 1
+    assert parked_stats["priorities"]["edit"]["queued"] == 1
+
+
+def test_priority_parsing_defaults_to_live():
+    assert RequestPriority.parse("backlog") is RequestPriority.BACKLOG
+    assert RequestPriority.parse(None) is RequestPriority.LIVE
+    assert RequestPriority.parse("unknown") is RequestPriority.LIVE
@@ -0,0 +1,61 @@
+"""Testy wspolnej punktacji (libs.shared.scoring) i jej uzycia w bocie."""
+
+import dataclasses
+
+import pytest
+
+import utils.calculations as calculations
+from libs.shared.cache import ACTIVITY_RULES, InMemoryCacheBackend, SharedCache
+from libs.shared.scoring import compile_points_rules
+
+
+def test_compiled_rules_score_with_bonuses_and_aliases():
+    rules = compile_points_rules(
+        {
+            "bieganie_teren": {"base_points": 1000, "min_distance": 1, "bonuses": ["Obciążenie", "przewyzszenie"]},
+            "plywanie": {"base_points": 4000, "bonuses": []},
+        },
+        {"weight_bonus": {"min_weight_kg": "8"}, "elevation_bonus": {"meters_step": 100, "points_per_step": "bad"}},
+    )
+
+    assert rules.get("running_terrain") is rules.get("bieganie_teren")
+    assert rules.score("running_terrain", 10.0, weight_kg=8, elevation_m=250) == {
+        "base_points": 10000,
+        "weight_bonus_points": 5000,
+        "elevation_bonus_points": 1000,  # invalid points_per_step falls back to the default 500
+        "total_points": 16000,
+    }
+    assert rules.score("plywanie", 0.0001)["total_points"] == 1
+    with pytest.raises(ValueError, match="Minimal distance"):
+        rules.score("bieganie_teren", 0.5)
+    with pytest.raises(ValueError, match="Unknown activity type"):
+        rules.score("kajak", 3)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        rules.meters_step = 1
+    with pytest.raises(TypeError):
+        rules.activities["kajak"] = rules.get("plywanie")
+
+
+def test_bot_reuses_compiled_rules_until_invalidated(monkeypatch):
+    cache = SharedCache(InMemoryCacheBackend())
+    monkeypatch.setattr("libs.shared.cache._shared_cache", cache)
+    monkeypatch.setattr(calculations, "_compiled_rules", {})
+    monkeypatch.setattr(calculations, "_compiled_rules_listener_registered", False)
+    fetches = []
+
+    class StubAPIManager:
+        def get_activity_rules(self, challenge_id):
+            fetches.append(challenge_id)
+            return []
+
+        def get_challenge(self, challenge_id):
+            return type("Challenge", (), {"rules": {"points_rules": {"elevation_bonus": {"meters_step": 10}}}})()
+
+    api = StubAPIManager()
+    first = calculations._resolve_points_rules(api, 7)
+
+    assert calculations._resolve_points_rules(api, 7) is first
+    assert first.meters_step == 10
+    cache.invalidate(ACTIVITY_RULES)
+    assert calculations._resolve_points_rules(api, 7) is not first
+    assert fetches == [7, 7]
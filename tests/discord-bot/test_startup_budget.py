@@ -0,0 +1,61 @@
+"""Budzet czasu startu bota (run.py w trybie BOT_STARTUP_DRY_RUN).
+
+Dry run przechodzi cala sciezke startu az do polaczenia z gatewayem Discorda
+(`discord_connect`); od tego momentu czas do `on_ready` zalezy juz tylko od
+sieci, wiec to on jest mierzalnym odpowiednikiem time-to-on_ready.
+Budzety mozna poluzowac na wolnym CI zmiennymi STARTUP_BUDGET_*.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BOT_SERVICE_ROOT = Path(__file__).parent.parent.parent / "services" / "discord-bot-szczypior"
+
+HEALTH_SERVER_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_HEALTH_SECONDS", "1.0"))
+DISCORD_CONNECT_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_CONNECT_SECONDS", "3.0"))
+HEAVY_MODULES = ("langchain_core", "langchain_openai", "langchain_google_genai", "langgraph", "openai", "google.genai")
+
+
+def _run_dry_start(tmp_path, code: str | None = None) -> subprocess.CompletedProcess:
+    env = {
+        **os.environ,
+        "BOT_STARTUP_DRY_RUN": "1",
+        "DISCORD_TOKEN": "dry-run",
+        "PORT": "0",
+        "BOT_OUTBOX_PATH": str(tmp_path / "outbox.sqlite3"),
+    }
+    command = [sys.executable, "run.py"] if code is None else [sys.executable, "-c", code]
+    return subprocess.run(command, cwd=BOT_SERVICE_ROOT, env=env, capture_output=True, text=True, timeout=60)
+
+
+@pytest.fixture(scope="module")
+def startup_marks(tmp_path_factory):
+    completed = _run_dry_start(tmp_path_factory.mktemp("startup"))
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("STARTUP_MARKS ")]
+    assert lines, completed.stdout
+    return json.loads(lines[-1].split(" ", 1)[1])
+
+
+def test_time_to_health_server_within_budget(startup_marks):
+    assert startup_marks["health_server"] <= HEALTH_SERVER_BUDGET_SECONDS, startup_marks
+
+
+def test_time_to_discord_connect_within_budget(startup_marks):
+    assert startup_marks["discord_connect"] <= DISCORD_CONNECT_BUDGET_SECONDS, startup_marks
+
+
+def test_startup_does_not_import_llm_provider_sdks(tmp_path):
+    code = (
+        "import asyncio, sys, run\n"
+        "asyncio.run(run.main_entrypoint())\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    completed = _run_dry_start(tmp_path, code)
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
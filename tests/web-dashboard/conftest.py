@@ -0,0 +1,80 @@
+"""
+conftest.py — Django dashboardu na SQLite w pamięci
+====================================================
+
+Modele dashboardu są `managed = False` (schemat należy do db-service), więc
+tabele tworzymy raz przez schema_editor, a każdy test działa w transakcji
+wycofywanej na końcu. Ustawienia są minimalne: bez Postgresa, Supabase i CORS.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("django")
+pytest.importorskip("rest_framework")
+pytest.importorskip("jwt")
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+DASHBOARD_ROOT = REPO_ROOT / "services" / "web-dashboard"
+
+for _path in (str(DASHBOARD_ROOT), str(REPO_ROOT)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=["django.contrib.contenttypes", "django.contrib.auth", "rest_framework", "dashboard"],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        USE_TZ=True,
+        TIME_ZONE="UTC",
+        SUPABASE_URL="http://supabase.invalid",
+        ACTIVITY_MAP={
+            "bieganie_teren": "running_terrain",
+            "bieganie_bieznia": "running_treadmill",
+            "plywanie": "swimming",
+            "rower": "cycling",
+            "spacer": "walking",
+            "cardio": "other_cardio",
+        },
+    )
+    django.setup()
+
+
+@pytest.fixture(scope="session")
+def tables():
+    from django.db import connection
+
+    from dashboard import models
+
+    with connection.schema_editor() as editor:
+        for model in (
+            models.DiscordUser,
+            models.Challenge,
+            models.ActivityRule,
+            models.SpecialMission,
+            models.Activity,
+        ):
+            editor.create_model(model)
+
+
+@pytest.fixture
+def db(tables):
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    import libs.shared.cache as shared_cache
+
+    cache = shared_cache.SharedCache(shared_cache.InMemoryCacheBackend())
+    monkeypatch.setattr(shared_cache, "_shared_cache", cache)
+    return cache
@@ -0,0 +1,158 @@
+"""
+test_api.py — Testy API dashboardu (widoki wywoływane przez RequestFactory)
+===========================================================================
+
+Scenariusze:
+  1. Paginacja keyset po (created_at, id): kursor w X-Next-Cursor, remisy created_at
+  2. Błędny kursor i nieznane pola w `fields=` → 400, projekcja tylko wybranych pól
+  3. Ranking graczy: miejsce i strata do lidera z funkcji okna
+  4. ETag rankingu: 304 dla niezmienionych danych, 200 po unieważnieniu RANKINGS
+  5. Reguły punktacji challenge'u z activity_rules, cache tokenów z limitem `exp`
+"""
+
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.test import RequestFactory
+
+from dashboard import views
+from dashboard.auth_cache import TokenUserCache
+from dashboard.models import Activity, ActivityRule, Challenge, DiscordUser
+from libs.shared.cache import RANKINGS
+
+NOW = datetime(2026, 5, 10, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def rf():
+    return RequestFactory()
+
+
+def _user(discord_id: str) -> DiscordUser:
+    return DiscordUser.objects.create(
+        discord_id=discord_id, display_name=f"Gracz {discord_id}", created_at=NOW, updated_at=NOW
+    )
+
+
+def _activity(user: DiscordUser, iid: str, created_at: datetime = NOW, **fields) -> Activity:
+    values = {"activity_type": "bieganie_teren", "distance_km": "5.00", "total_points": 100, "ai_comment": "Brawo!"}
+    values.update(fields)
+    return Activity.objects.create(user=user, iid=iid, created_at=created_at, **values)
+
+
+def _get(view, rf, path: str = "/", **headers):
+    response = view(rf.get(path, **headers))
+    body = json.loads(response.content) if response.status_code != 304 else None
+    return response, body
+
+
+def test_cursor_pages_through_ties_on_created_at(db, rf):
+    user = _user("1")
+    # Three activities share a timestamp, so the id decides their order.
+    expected = [
+        _activity(user, "a1", NOW).id,
+        _activity(user, "a2", NOW).id,
+        _activity(user, "a3", NOW).id,
+        _activity(user, "a4", NOW - timedelta(days=1)).id,
+        _activity(user, "a5", NOW - timedelta(days=2)).id,
+    ]
+    expected = expected[2::-1] + expected[3:]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        path = "/?limit=2&fields=id" + (f"&cursor={cursor}" if cursor else "")
+        response, body = _get(views.activities, rf, path)
+        assert response.status_code == 200
+        seen += [row["id"] for row in body]
+        pages += 1
+        cursor = response.get(views.NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert pages == 3
+    assert views._decode_activity_cursor(views._encode_activity_cursor(NOW, 42)) == (NOW, 42)
+
+
+def test_malformed_cursor_and_unknown_fields_are_rejected(db, rf):
+    response, body = _get(views.activities, rf, "/?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert body == {"error": "Invalid cursor"}
+
+    response, body = _get(views.activities, rf, "/?fields=id,secret")
+    assert response.status_code == 400
+    assert "secret" in body["error"]
+
+
+def test_fields_projection_returns_only_requested_fields(db, rf):
+    _activity(_user("1"), "p1", weight_kg="4.50")
+
+    _, body = _get(views.activities, rf, "/?fields=pointsEarned,type,loadKg")
+    assert body == [{"pointsEarned": 100, "type": "running_terrain", "loadKg": 4.5}]
+
+    _, full = _get(views.activities, rf, "/")
+    assert full[0]["ai_comment"] == "Brawo!"
+    assert full[0]["userId"] == "1"
+
+
+def test_players_ranking_window(db, rf):
+    leader, second = _user("10"), _user("20")
+    _user("30")  # no activities, still listed
+    _activity(leader, "r1", total_points=700)
+    _activity(leader, "r2", total_points=300)
+    _activity(second, "r3", total_points=400, activity_type="plywanie")
+
+    _, body = _get(views.players, rf, "/")
+
+    ranking = [(row["id"], row["rank"], row["totalPoints"], row["pointsDiff"]) for row in body]
+    assert ranking == [("10", 1, 1000, 0), ("20", 2, 400, 600), ("30", 3, 0, 1000)]
+    assert body[1]["favoriteActivity"] == "swimming"
+    assert body[2]["totalActivities"] == 0
+
+
+def test_ranking_etag_turns_into_200_after_invalidation(db, rf, cache):
+    _activity(_user("1"), "e1")
+    first, _ = _get(views.ranking, rf, "/")
+    etag = first["ETag"]
+    assert first.status_code == 200
+    assert "max-age" in first["Cache-Control"]
+
+    unchanged, _ = _get(views.ranking, rf, "/", HTTP_IF_NONE_MATCH=etag)
+    assert unchanged.status_code == 304
+
+    cache.invalidate(RANKINGS)
+    changed, body = _get(views.ranking, rf, "/", HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed["ETag"] != etag
+    assert body[0]["id"] == "1"
+
+
+def test_points_rules_use_the_challenges_activity_rules(db):
+    challenge = Challenge.objects.create(
+        name="Rowerowy", start_date=NOW, end_date=NOW + timedelta(days=30), rules=None, created_at=NOW
+    )
+    assert views._effective_points_rules(challenge).get("plywanie") is not None
+
+    ActivityRule.objects.create(
+        challenge=challenge, activity_type="rower", display_name="Rower", base_points=7, min_distance="1.00", bonuses=[]
+    )
+    rules = views._effective_points_rules(challenge)
+
+    assert rules.get("plywanie") is None
+    assert rules.score("rower", 10)["total_points"] == 70
+
+
+def test_token_cache_entries_do_not_outlive_token_exp(monkeypatch):
+    cache = TokenUserCache(max_entries=2, ttl_seconds=60)
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    cache.set("short", "user-a", token_exp=1005)
+    cache.set("long", "user-b", token_exp=5000)
+
+    monkeypatch.setattr(time, "time", lambda: 1006.0)
+    assert cache.get("short") == (False, None)
+    assert cache.get("long") == (True, "user-b")
+
+    monkeypatch.setattr(time, "time", lambda: 1061.0)
+    assert cache.get("long") == (False, None)